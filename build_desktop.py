@@ -64,7 +64,7 @@ def install_dependencies(project_root):
         print("⚠️  requirements.txt not found, installing basic dependencies...")
         subprocess.run([
             sys.executable, "-m", "pip", "install", 
-            "Django>=5.1.7", "pandas>=2.1.0", "openpyxl>=3.1.2", "whitenoise>=6.6.0"
+            "Django>=5.1.7", "pandas>=2.1.0", "openpyxl>=3.1.2", "whitenoise>=6.6.0", "waitress>=3.0.0"
         ], check=True)
 
 def setup_django_desktop(project_root):
@@ -0,0 +1,42 @@
+"""
+Database configuration shared by the settings modules.
+
+``database_config`` reads ``DATABASE_URL`` and adds persistent connections
+and health checks, so a remote PostgreSQL (Neon) connection and its TLS
+handshake are reused across requests instead of being opened per request.
+
+Environment variables:
+
+- ``DB_CONN_MAX_AGE``: seconds a connection is kept (0 = close after each
+  request), default 600.
+- ``DB_CONN_HEALTH_CHECKS``: check a reused connection before the request
+  uses it, default True.
+- ``DB_POOL``: use psycopg 3's connection pool instead of persistent
+  connections (PostgreSQL only, requires ``psycopg[pool]``), default False.
+  ``DB_POOL_MIN_SIZE`` / ``DB_POOL_MAX_SIZE`` / ``DB_POOL_TIMEOUT`` size it.
+"""
+import dj_database_url
+from decouple import config
+from django.core.exceptions import ImproperlyConfigured
+
+
+def database_config(default_url):
+    """``DATABASES['default']`` for ``DATABASE_URL`` (or ``default_url``) with the connection options above."""
+    database = dj_database_url.config(
+        default=config('DATABASE_URL', default=default_url),
+        conn_max_age=config('DB_CONN_MAX_AGE', default=600, cast=int),
+        conn_health_checks=config('DB_CONN_HEALTH_CHECKS', default=True, cast=bool),
+    )
+    if config('DB_POOL', default=False, cast=bool) and 'postgresql' in database['ENGINE']:
+        try:
+            import psycopg_pool  # noqa: F401
+        except ImportError:
+            raise ImproperlyConfigured('DB_POOL=True requires psycopg 3 with its pool: pip install "psycopg[binary,pool]"')
+        database.setdefault('OPTIONS', {})['pool'] = {
+            'min_size': config('DB_POOL_MIN_SIZE', default=2, cast=int),
+            'max_size': config('DB_POOL_MAX_SIZE', default=10, cast=int),
+            'timeout': config('DB_POOL_TIMEOUT', default=10, cast=int),
+        }
+        # Django refuse un pool combiné aux connexions persistantes
+        database['CONN_MAX_AGE'] = 0
+    return database
@@ -60,13 +60,23 @@ TEMPLATES = [
 WSGI_APPLICATION = "gestion_heures.wsgi.application"
 
 # Database - Use DATABASE_URL or SQLite for desktop
-import dj_database_url
-from decouple import config
+from gestion_heures.database import database_config
+from decouple import config, Choices, Csv
 
+# Persistent connections, health checks and optional pool: see gestion_heures/database.py
 DATABASES = {
-    'default': dj_database_url.config(
-        default=config('DATABASE_URL', default='sqlite:///' + str(BASE_DIR / 'gestion_heures.db'))
-    )
+    'default': database_config('sqlite:///' + str(BASE_DIR / 'gestion_heures.db')),
+}
+
+# SQLite tuning applied to every new connection (pointage/sqlite.py);
+# ANALYZE/VACUUM: python manage.py optimize_sqlite [--vacuum]
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',         # imports no longer block dashboard reads
+    'synchronous': 'NORMAL',       # crash-safe with WAL, far fewer fsyncs
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,      # in KiB when negative: 64 MB page cache
+    'busy_timeout': 5000,          # ms to wait for a lock instead of failing
+    'temp_store': 'MEMORY',
 }
 
 # Password validation
@@ -112,9 +122,45 @@ FILE_UPLOAD_PERMISSIONS = 0o644
 FILE_UPLOAD_DIRECTORY_PERMISSIONS = 0o755
 
 # Allowed file types for Excel uploads
-ALLOWED_EXCEL_EXTENSIONS = ['.xlsx', '.xls']
+ALLOWED_EXCEL_EXTENSIONS = ['.xlsx', '.xls', '.csv', '.parquet', '.arrow', '.feather']
 MAX_UPLOAD_SIZE = 10 * 1024 * 1024  # 10MB
 
+# Reference list of department names (comma separated): rows of an imported file
+# with another department are reported; when empty only rows without one are
+POINTAGE_DEPARTMENTS = config('POINTAGE_DEPARTMENTS', default='', cast=Csv())
+
+# Fastest Excel reader per format, written by "manage.py calibrate_readers"
+EXCEL_READER_CALIBRATION_FILE = BASE_DIR / 'reader_calibration.json'
+
+# Overtime caps used by the alerts page (hours of overtime)
+OVERTIME_WEEKLY_CAP = config('OVERTIME_WEEKLY_CAP', default=13, cast=int)
+OVERTIME_ROLLING_WEEKS = config('OVERTIME_ROLLING_WEEKS', default=4, cast=int)
+OVERTIME_ROLLING_CAP = config('OVERTIME_ROLLING_CAP', default=36, cast=int)
+
+# Cached statistics payloads (seconds); entries are also dropped on import/delete
+STATISTIQUE_CACHE_TIMEOUT = config('STATISTIQUE_CACHE_TIMEOUT', default=300, cast=int)
+
+# Local-memory cache; culls the oldest entries once MAX_ENTRIES is reached
+# (single process: every request sees the same cache, see CACHE_SHARED)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'gestion-heures',
+        'TIMEOUT': 300,
+        'OPTIONS': {'MAX_ENTRIES': 1000},
+    }
+}
+# Whether every process serving requests sees the same cache: the
+# authenticated-user snapshot is only cached across requests when it does
+CACHE_SHARED = True
+
+# Embedded server started by run_desktop.py: 'waitress' (multi-threaded WSGI
+# server, no autoreloader) or 'runserver' (Django development server)
+DESKTOP_SERVER = config('DESKTOP_SERVER', default='waitress', cast=Choices(['waitress', 'runserver']))
+DESKTOP_SERVER_THREADS = config('DESKTOP_SERVER_THREADS', default=8, cast=int)
+# Rescanning static files on every request is only useful with runserver
+WHITENOISE_AUTOREFRESH = DEBUG and DESKTOP_SERVER == 'runserver'
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
@@ -125,10 +171,22 @@ LOGOUT_REDIRECT_URL = '/accounts/login/'
 
 # Authentication backends
 AUTHENTICATION_BACKENDS = [
+    # Subclass of ModelBackend (permissions included); a second backend would hash failed passwords twice
     'pointage.backends.ManagerAuthenticationBackend',
-    'django.contrib.auth.backends.ModelBackend',
 ]
 
+# Seconds the authenticated user + profile snapshot stays cached
+AUTH_USER_CACHE_TIMEOUT = config('AUTH_USER_CACHE_TIMEOUT', default=300, cast=int)
+
+# Sessions: 'cached_db' (read from the cache, written through to the database;
+# default when the cache is shared), 'db' (default otherwise: a per-process
+# cache would serve other workers' stale sessions), 'cache' or 'signed_cookies'
+SESSION_BACKEND = config('SESSION_BACKEND', default='cached_db' if CACHE_SHARED else 'db', cast=Choices(['db', 'cached_db', 'cache', 'signed_cookies']))
+SESSION_ENGINE = f'django.contrib.sessions.backends.{SESSION_BACKEND}'
+SESSION_CACHE_ALIAS = 'default'
+# Flash messages travel in a cookie instead of being written to the session
+MESSAGE_STORAGE = 'django.contrib.messages.storage.cookie.CookieStorage'
+
 # Disable HTTPS for desktop (local development)
 SECURE_SSL_REDIRECT = False
 SESSION_COOKIE_SECURE = False
@@ -5,22 +5,103 @@ import multiprocessing
 bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
 backlog = 2048
 
-# Worker processes
-workers = multiprocessing.cpu_count() * 2 + 1
-worker_class = 'sync'
+
+# Worker sizing -----------------------------------------------------------
+# Each worker holds the Django app plus the DataFrames of the files it is
+# parsing, so the worker count is derived from the memory available rather
+# than from the CPU count alone:
+#
+#   per-worker budget = GUNICORN_WORKER_BASE_MB
+#                       + GUNICORN_PARSE_MB * parses running at once in a worker
+#   workers           = (memory - GUNICORN_MEMORY_RESERVE_MB) / budget,
+#                       between 1 and cpu_count * 2 + 1
+#
+# GUNICORN_WORKERS / GUNICORN_THREADS override the computed values.
+
+def _env_int(name, default):
+    value = os.environ.get(name, '')
+    return int(value) if value.strip() else default
+
+
+def _available_memory_mb():
+    """Memory limit of the container (cgroup v2/v1), else physical memory, in MB."""
+    if os.environ.get('GUNICORN_MEMORY_MB'):
+        return int(os.environ['GUNICORN_MEMORY_MB'])
+    for path in ('/sys/fs/cgroup/memory.max', '/sys/fs/cgroup/memory/memory.limit_in_bytes'):
+        try:
+            with open(path) as f:
+                value = f.read().strip()
+        except OSError:
+            continue
+        if value.isdigit() and int(value) < 1 << 60:  # "max" / très grande valeur = pas de limite
+            return int(value) // (1024 * 1024)
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES') // (1024 * 1024)
+    except (ValueError, OSError, AttributeError):
+        return 1024
+
+
+def _rss_mb():
+    """Current resident memory of this process in MB (Linux), or 0 when unknown."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') // (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+threads = _env_int('GUNICORN_THREADS', 4 if worker_class == 'gthread' else 1)
+
+WORKER_BASE_MB = _env_int('GUNICORN_WORKER_BASE_MB', 150)
+PARSE_MB = _env_int('GUNICORN_PARSE_MB', 250)
+MEMORY_RESERVE_MB = _env_int('GUNICORN_MEMORY_RESERVE_MB', 128)
+# Threads of one worker rarely all parse a workbook at the same time
+PARSES_PER_WORKER = min(threads, _env_int('GUNICORN_PARSES_PER_WORKER', 2))
+WORKER_BUDGET_MB = WORKER_BASE_MB + PARSE_MB * PARSES_PER_WORKER
+
+workers = _env_int('GUNICORN_WORKERS', max(1, min(
+    (_available_memory_mb() - MEMORY_RESERVE_MB) // WORKER_BUDGET_MB,
+    multiprocessing.cpu_count() * 2 + 1,
+)))
 worker_connections = 1000
-max_requests = 1000
-max_requests_jitter = 50
 preload_app = True
 
-# Timeout
-timeout = 30
+# Timeout (parsing a large workbook can take more than 30 s)
+timeout = _env_int('GUNICORN_TIMEOUT', 120)
+graceful_timeout = 30
 keepalive = 2
 
 # Restart workers after this many requests, to help prevent memory leaks
 max_requests = 1000
 max_requests_jitter = 50
 
+# ...and as soon as a worker's RSS exceeds its budget: pandas/glibc rarely
+# give the memory of a large parse back to the system
+MAX_WORKER_RSS_MB = _env_int('GUNICORN_MAX_WORKER_RSS_MB', WORKER_BUDGET_MB)
+
+
+def on_starting(server):
+    # Import pandas once in the master: forked workers share its pages
+    if preload_app:
+        import numpy  # noqa: F401
+        import pandas  # noqa: F401
+
+
+def when_ready(server):
+    server.log.info(
+        'Worker sizing: %s %s worker(s) x %s thread(s), budget %s MB each, recycled above %s MB RSS',
+        workers, worker_class, threads, WORKER_BUDGET_MB, MAX_WORKER_RSS_MB,
+    )
+
+
+def post_request(worker, req, environ, resp):
+    rss = _rss_mb()
+    if MAX_WORKER_RSS_MB and rss > MAX_WORKER_RSS_MB:
+        worker.log.info('Worker %s uses %s MB (> %s MB), recycling after this request', worker.pid, rss, MAX_WORKER_RSS_MB)
+        worker.alive = False
+
+
 # Logging
 accesslog = '-'
 errorlog = '-'
@@ -47,4 +128,4 @@ limit_request_fields = 100
 limit_request_field_size = 8190
 
 # Performance
-worker_tmp_dir = '/dev/shm' 
\ No newline at end of file
+worker_tmp_dir = '/dev/shm'
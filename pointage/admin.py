@@ -1,4 +1,6 @@
 from django.contrib import admin
-from .models import UploadedExcel
+from .models import UploadedExcel, Employee, Department
 
 admin.site.register(UploadedExcel)
+admin.site.register(Employee)
+admin.site.register(Department)
@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class PointageConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "pointage"
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from .sqlite import apply_pragmas
+        connection_created.connect(apply_pragmas, dispatch_uid='pointage_sqlite_pragmas')
@@ -1,29 +1,125 @@
 from django.contrib.auth.backends import ModelBackend
 from django.contrib.auth.models import User
-from django.core.exceptions import ObjectDoesNotExist
+import logging
+
+from django.core.cache import cache
+from .cache import auth_user_key, auth_user_timeout, cache_is_shared
 from .models import ManagerProfile
 
+logger = logging.getLogger(__name__)
+
+# Champs mis en cache : jamais le hash du mot de passe
+USER_SNAPSHOT_FIELDS = (
+    'id', 'username', 'first_name', 'last_name', 'email',
+    'is_active', 'is_staff', 'is_superuser', 'last_login', 'date_joined',
+)
+PROFILE_SNAPSHOT_FIELDS = ('id', 'user_id', 'phone', 'department', 'is_active')
+
+
+def _attnames(model, fields):
+    # Ordre des champs concrets, attendu par Model.from_db
+    return [field.attname for field in model._meta.concrete_fields if field.attname in fields]
+
+
+def user_snapshot(user):
+    """
+    Cacheable snapshot of ``user`` and its profile: the fields the app reads
+    and the session hashes derived from the password, not the password hash.
+    """
+    profile = getattr(user, 'managerprofile', None)
+    return {
+        'user': [getattr(user, name) for name in _attnames(User, USER_SNAPSHOT_FIELDS)],
+        'profile': None if profile is None else [
+            getattr(profile, name) for name in _attnames(ManagerProfile, PROFILE_SNAPSHOT_FIELDS)
+        ],
+        'session_hash': user.get_session_auth_hash(),
+        'session_fallback_hashes': list(user.get_session_auth_fallback_hash()),
+    }
+
+
+def user_from_snapshot(snapshot):
+    """
+    Unsaved-looking ``User`` rebuilt from a snapshot. The other fields
+    (password) are deferred: they are loaded on first access, and ``save()``
+    only writes the loaded ones.
+    """
+    db = User.objects.db
+    user = User.from_db(db, _attnames(User, USER_SNAPSHOT_FIELDS), snapshot['user'])
+    profile = None
+    if snapshot['profile'] is not None:
+        profile = ManagerProfile.from_db(db, _attnames(ManagerProfile, PROFILE_SNAPSHOT_FIELDS), snapshot['profile'])
+        ManagerProfile.user.field.set_cached_value(profile, user)
+    User.managerprofile.related.set_cached_value(user, profile)
+
+    # Vérification de session sans charger le mot de passe, tant qu'il n'a pas été lu (changement de mot de passe)
+    def get_session_auth_hash():
+        if 'password' in user.__dict__:
+            return User.get_session_auth_hash(user)
+        return snapshot['session_hash']
+
+    def get_session_auth_fallback_hash():
+        if 'password' in user.__dict__:
+            return User.get_session_auth_fallback_hash(user)
+        return iter(snapshot['session_fallback_hashes'])
+
+    user.get_session_auth_hash = get_session_auth_hash
+    user.get_session_auth_fallback_hash = get_session_auth_fallback_hash
+    return user
+
 class ManagerAuthenticationBackend(ModelBackend):
+    """
+    Username/password authentication that refuses managers whose profile is
+    inactive. Users without a profile (admins) log in normally.
+
+    ``get_user`` runs on every authenticated request: the user and its
+    profile are read with one query and a snapshot of them (without the
+    password hash, see ``user_snapshot``) is kept in the cache until the
+    user or the profile changes (see the receivers in ``models.py``). With
+    a per-process cache (``CACHE_SHARED`` off) or when the cache fails, the
+    user is read from the database on every request, as ``ModelBackend`` does.
+    """
+
+    def _fetch(self, **lookup):
+        # The profile comes with the same query; a missing profile is cached as None
+        return User.objects.select_related('managerprofile').get(**lookup)
+
+    def _is_allowed(self, user):
+        profile = getattr(user, 'managerprofile', None)
+        return self.user_can_authenticate(user) and (profile is None or profile.is_active)
+
     def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(User.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
         try:
-            user = User.objects.get(username=username)
-            if user.check_password(password):
-                # Check if user has a manager profile and is active
-                if hasattr(user, 'managerprofile'):
-                    if user.managerprofile.is_active:
-                        return user
-                    else:
-                        return None  # Manager is inactive
-                else:
-                    # User exists but no manager profile - allow login (could be admin)
-                    return user
-        except ObjectDoesNotExist:
+            user = self._fetch(username=username)
+        except User.DoesNotExist:
+            # Hash once anyway so the response time doesn't reveal unknown usernames
+            User().set_password(password)
             return None
-        
+        if user.check_password(password) and self._is_allowed(user):
+            return user
         return None
 
     def get_user(self, user_id):
+        key = auth_user_key(user_id)
+        snapshot = self._cache_call(cache.get, key) if cache_is_shared() else None
+        if snapshot is None:
+            try:
+                user = self._fetch(pk=user_id)
+            except User.DoesNotExist:
+                return None
+            if cache_is_shared():
+                self._cache_call(cache.set, key, user_snapshot(user), auth_user_timeout())
+        else:
+            user = user_from_snapshot(snapshot)
+        return user if self._is_allowed(user) else None
+
+    def _cache_call(self, method, *args):
         try:
-            return User.objects.get(pk=user_id)
-        except ObjectDoesNotExist:
-            return None 
\ No newline at end of file
+            return method(*args)
+        except Exception as e:
+            # Cache indisponible : lecture en base, comme ModelBackend
+            logger.warning('Authentication cache unavailable: %s', e)
+            return None
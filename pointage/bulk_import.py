@@ -0,0 +1,154 @@
+"""
+Bulk import of pointage workbooks from the filesystem.
+
+Used by the ``import_timesheets`` command. Hashing, validation and parsing - the CPU
+bound part - run in a process pool; the parent process only writes to the
+database, a batch of files per transaction. Files whose content hash is
+already known (imported earlier, or twice in the same run) are skipped.
+"""
+import glob
+import os
+from concurrent.futures import FIRST_COMPLETED, wait
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.db import transaction
+
+from .validators import sanitize_filename, validate_excel_file
+
+DEFAULT_EXTENSIONS = ('.xlsx', '.xls', '.csv', '.parquet', '.arrow', '.feather')
+
+
+def import_extensions():
+    return tuple(getattr(settings, 'ALLOWED_EXCEL_EXTENSIONS', DEFAULT_EXTENSIONS))
+
+
+def discover_files(sources, extensions=None):
+    """
+    Files matching ``sources`` (directories, walked recursively, or glob
+    patterns such as ``exports/**/*.xlsx``), sorted and without duplicates.
+    """
+    extensions = tuple(ext.lower() for ext in (extensions or import_extensions()))
+    found = set()
+    for source in sources:
+        if os.path.isdir(source):
+            for root, _, files in os.walk(source):
+                found.update(os.path.join(root, name) for name in files)
+        else:
+            found.update(path for path in glob.glob(source, recursive=True) if os.path.isfile(path))
+    return sorted(
+        os.path.abspath(path) for path in found
+        if os.path.splitext(path)[1].lower() in extensions and not os.path.basename(path).startswith('~$')
+    )
+
+
+def find_uploader(username=None):
+    """User recorded as uploader: ``username``, else the first superuser; None when there is none."""
+    from django.contrib.auth.models import User
+
+    if username:
+        return User.objects.filter(username=username).first()
+    return User.objects.filter(is_superuser=True).order_by('id').first()
+
+
+def init_worker():
+    """Process pool initializer: spawned workers (Windows, macOS) start without Django."""
+    import django
+    django.setup()
+
+
+def hash_file(path):
+    # Imports locaux : avec spawn, ce module est chargé avant init_worker()
+    from .ingestion import content_hash
+    return path, content_hash(path)
+
+
+def try_hash_file(path):
+    """``hash_file`` returning ``(path, digest, error)``: a file removed or unreadable since discovery gets an error."""
+    try:
+        return (*hash_file(path), None)
+    except OSError as e:
+        return path, None, f'unreadable file: {e}'
+
+
+def parse_file(path):
+    """
+    Read one workbook and compute its overtime frame. Returns ``(path,
+    frame, error)``; ``error`` is a message and ``frame`` None when the file
+    cannot be used.
+    """
+    from .overtime import parse_overtime_file
+
+    try:
+        frame = parse_overtime_file(path)
+    except Exception as e:
+        return path, None, f'unreadable file: {e}'
+    missing = frame.attrs['quality'].get('missing_columns')
+    if missing:
+        return path, None, f'missing column(s): {", ".join(missing)}'
+    return path, frame, None
+
+
+def validate_and_parse(path, check_size=True):
+    """
+    ``parse_file`` preceded by the checks applied to a browser upload (size,
+    type, structure); ``check_size=False`` waives the upload size limit.
+    """
+    try:
+        with open(path, 'rb') as source:
+            validate_excel_file(File(source, name=os.path.basename(path)), check_size=check_size)
+    except ValidationError as e:
+        return path, None, ' '.join(e.messages)
+    except OSError as e:
+        return path, None, f'unreadable file: {e}'
+    return parse_file(path)
+
+
+def store_parsed(batch, user):
+    """
+    Store ``(path, digest, frame)`` items in one transaction: an
+    ``UploadedExcel`` with a copy of the file, then its entries. Returns
+    the number of rows stored. When the transaction fails, the copies
+    already written are deleted before the error propagates.
+    """
+    from .ingestion import ingest_frame
+    from .models import UploadedExcel
+
+    field = UploadedExcel._meta.get_field('file')
+    stored, rows = [], 0
+    try:
+        with transaction.atomic():
+            for path, digest, frame in batch:
+                name = field.generate_filename(None, sanitize_filename(os.path.basename(path)))
+                with open(path, 'rb') as source:
+                    stored.append(field.storage.save(name, File(source), max_length=field.max_length))
+                uploaded = UploadedExcel.objects.create(file=stored[-1], uploaded_by=user, content_hash=digest)
+                rows += ingest_frame(uploaded, frame)
+    except Exception:
+        # Lot annulé : aucune ligne ne référence plus ces copies
+        for name in stored:
+            field.storage.delete(name)
+        raise
+    return rows
+
+
+def imap_bounded(pool, fn, items, max_pending):
+    """
+    Like ``pool.map`` but yields results as they complete and keeps at most
+    ``max_pending`` tasks submitted, so parsed frames never pile up faster
+    than the caller consumes them.
+    """
+    items = iter(items)
+    pending = set()
+    while True:
+        while len(pending) < max_pending:
+            try:
+                pending.add(pool.submit(fn, next(items)))
+            except StopIteration:
+                break
+        if not pending:
+            return
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            yield future.result()
@@ -0,0 +1,78 @@
+"""
+Cache helpers: statistics payloads and authenticated users.
+
+Cached payloads are keyed by the user's scope, the current dataset version
+and the request filters. The dataset version is read from the database,
+so every worker sees the same one even with a per-process cache: it
+changes whenever a file is imported, re-ingested or deleted, which makes
+every older entry unreachable; the configured cache backend then evicts
+them (LRU culling for the local-memory cache, TTL everywhere).
+"""
+import hashlib
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max
+
+logger = logging.getLogger(__name__)
+
+
+def dataset_version():
+    """
+    Current dataset version: file count, last file id and last ingestion
+    time. An import adds a higher id, a deletion lowers the count and an
+    (re-)ingestion moves the last ingestion time forward.
+    """
+    # Import local : models importe ce module
+    from .models import UploadedExcel
+
+    stats = UploadedExcel.objects.aggregate(count=Count('id'), last=Max('id'), ingested=Max('ingested_at'))
+    ingested = stats['ingested'].timestamp() if stats['ingested'] else 0
+    return f'{stats["count"]}-{stats["last"] or 0}-{ingested}'
+
+
+def user_scope(user):
+    """Admins share one cache scope, managers each have their own."""
+    if user.is_superuser or user.groups.filter(name='Admin').exists():
+        return 'all'
+    return f'user-{user.pk}'
+
+
+def fragment_key(name, scope, *parts):
+    """Cache key for fragment ``name`` of ``scope`` under the current dataset version."""
+    digest = hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()
+    return f'pointage:{name}:{scope}:{dataset_version()}:{digest}'
+
+
+def fragment_timeout():
+    return getattr(settings, 'STATISTIQUE_CACHE_TIMEOUT', 300)
+
+
+def auth_user_key(user_id):
+    return f'pointage:auth-user:{user_id}'
+
+
+def auth_user_timeout():
+    return getattr(settings, 'AUTH_USER_CACHE_TIMEOUT', 300)
+
+
+def cache_is_shared():
+    """Whether every process serving requests sees the same cache (``CACHE_SHARED``)."""
+    return getattr(settings, 'CACHE_SHARED', True)
+
+
+def invalidate_auth_user(user_id):
+    """Drop the cached user + profile snapshot used by the authentication backend."""
+    invalidate_auth_users([user_id])
+
+
+def invalidate_auth_users(user_ids):
+    """Same as ``invalidate_auth_user`` for queryset updates, which send no signals."""
+    if not cache_is_shared():
+        return  # Rien n'est mis en cache (voir ManagerAuthenticationBackend.get_user)
+    try:
+        cache.delete_many([auth_user_key(user_id) for user_id in user_ids])
+    except Exception as e:
+        # Cache indisponible : l'enregistrement ne doit pas échouer, l'entrée expire seule
+        logger.warning('Cached users not invalidated: %s', e)
@@ -0,0 +1,209 @@
+"""
+Ingestion of uploaded pointage files into the database.
+
+Each valid in/out pair becomes a ``TimeEntry`` pointing to ``Employee`` and
+``Department`` rows. People and departments are matched on a normalized
+key so that "DUPONT Jean" and "Dupont  jean" resolve to the same employee.
+"""
+import hashlib
+import logging
+import math
+import unicodedata
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import QuerySet
+from django.utils import timezone
+
+from .models import Department, Employee, TimeEntry
+
+logger = logging.getLogger(__name__)
+
+LOOKUP_CHUNK_SIZE = 500
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def normalize_key(value):
+    """Fold case, accents and whitespace: ``'  Élodie   MARTIN '`` -> ``'elodie martin'``."""
+    text = unicodedata.normalize('NFKD', str(value))
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return ' '.join(text.casefold().split())
+
+
+def content_hash(file):
+    """SHA-256 hex digest of a path or of a binary file object (read from the start, then rewound)."""
+    digest = hashlib.sha256()
+    if isinstance(file, (str, bytes)) or hasattr(file, '__fspath__'):
+        with open(file, 'rb') as handle:
+            for chunk in iter(lambda: handle.read(HASH_CHUNK_SIZE), b''):
+                digest.update(chunk)
+    else:
+        file.seek(0)
+        for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+        file.seek(0)
+    return digest.hexdigest()
+
+
+def _resolve(model, labels):
+    """
+    Map each distinct label to the id of its dimension row, creating the
+    missing rows in bulk. The first label seen for a key becomes its name.
+    """
+    keys = {}
+    for label in labels.unique():
+        keys[label] = normalize_key(label)[:model._meta.get_field('key').max_length]
+
+    wanted = list(set(keys.values()))
+    ids = {}
+    for start in range(0, len(wanted), LOOKUP_CHUNK_SIZE):
+        chunk = wanted[start:start + LOOKUP_CHUNK_SIZE]
+        ids.update(model.objects.filter(key__in=chunk).values_list('key', 'id'))
+
+    missing = {}
+    for label, key in keys.items():
+        if key not in ids and key not in missing:
+            missing[key] = model(key=key, name=str(label).strip()[:model._meta.get_field('name').max_length])
+    if missing:
+        model.objects.bulk_create(missing.values(), ignore_conflicts=True)
+        created = list(missing)
+        for start in range(0, len(created), LOOKUP_CHUNK_SIZE):
+            chunk = created[start:start + LOOKUP_CHUNK_SIZE]
+            ids.update(model.objects.filter(key__in=chunk).values_list('key', 'id'))
+
+    return {label: ids[key] for label, key in keys.items()}
+
+
+def entry_rows(frame):
+    """
+    (employee_id, department_id, date, minute_in, minute_out, heures_sup)
+    tuples for the rows of an overtime frame, creating missing employees
+    and departments.
+    """
+    if frame.empty:
+        return []
+    employee_ids = frame['nom'].map(_resolve(Employee, frame['nom']))
+    departments = frame['department'].dropna()
+    department_ids = frame['department'].map(_resolve(Department, departments)) if not departments.empty else None
+    return [
+        (
+            employee_id,
+            None if department_id is None or math.isnan(department_id) else int(department_id),
+            day,
+            minute_in,
+            minute_out,
+            heures_sup,
+        )
+        for employee_id, department_id, day, minute_in, minute_out, heures_sup in zip(
+            employee_ids.tolist(),
+            department_ids.tolist() if department_ids is not None else [None] * len(frame),
+            frame['date'].dt.date.tolist(),
+            frame['minute_in'].tolist(),
+            frame['minute_out'].tolist(),
+            frame['heures_sup'].tolist(),
+        )
+    ]
+
+
+def frame_summary(frame):
+    """Row, employee and overtime counts, departments and date range of an overtime frame."""
+    employees = {normalize_key(label) for label in frame['nom'].unique()}
+    departments = {}
+    for label in frame['department'].dropna().unique():
+        departments.setdefault(normalize_key(label), str(label).strip())
+    return {
+        'row_count': len(frame),
+        'employee_count': len(employees),
+        'departments': sorted(departments.values(), key=normalize_key),
+        'date_min': frame['date'].min().date() if not frame.empty else None,
+        'date_max': frame['date'].max().date() if not frame.empty else None,
+        'overtime_total': int(frame['heures_sup'].sum()),
+    }
+
+
+def file_metadata(frame):
+    """
+    ``UploadedExcel`` fields derived from an overtime frame: summary, parse
+    duration, schema fingerprint, data-quality report and preview. The report
+    only depends on the file and ``settings.POINTAGE_DEPARTMENTS``, never on
+    the departments already stored, so re-ingesting a file gives the same one.
+    """
+    from .quality import add_department_check
+
+    metadata = frame_summary(frame)
+    if frame.attrs.get('parse_seconds') is not None:
+        metadata['parse_seconds'] = frame.attrs['parse_seconds']
+    if frame.attrs.get('schema'):
+        metadata['schema'] = frame.attrs['schema']
+    if frame.attrs.get('quality'):
+        known = {normalize_key(name) for name in getattr(settings, 'POINTAGE_DEPARTMENTS', ())}
+        metadata['quality'] = add_department_check(frame.attrs['quality'], frame, known)
+    if frame.attrs.get('preview'):
+        metadata['preview'] = frame.attrs['preview']
+    return metadata
+
+
+def ingest_frame(uploaded_file, frame):
+    """
+    Replace the stored entries of ``uploaded_file`` with the rows of an
+    overtime frame, and record the ``file_metadata`` and size of the file.
+    """
+    with transaction.atomic():
+        TimeEntry.objects.filter(uploaded_file=uploaded_file).delete()
+        metadata = file_metadata(frame)
+        try:
+            metadata['file_size'] = uploaded_file.file.size
+        except (OSError, ValueError):
+            pass
+        entries = (
+            TimeEntry(
+                uploaded_file=uploaded_file,
+                employee_id=employee_id,
+                department_id=department_id,
+                date=day,
+                minute_in=minute_in,
+                minute_out=minute_out,
+                heures_sup=heures_sup,
+            )
+            for employee_id, department_id, day, minute_in, minute_out, heures_sup in entry_rows(frame)
+        )
+        TimeEntry.objects.bulk_create(entries, batch_size=1000)
+        uploaded_file.ingested_at = timezone.now()
+        for field, value in metadata.items():
+            setattr(uploaded_file, field, value)
+        uploaded_file.save(update_fields=['ingested_at', *metadata])
+    return len(frame)
+
+
+def ingest_uploaded_file(uploaded_file):
+    """
+    Parse an uploaded workbook and store its rows. Returns the number of
+    rows stored; a file that cannot be read raises and stays not ingested.
+    """
+    # Import à la demande : pandas n'est chargé qu'au premier fichier lu
+    from .overtime import read_overtime_frame
+
+    return ingest_frame(uploaded_file, read_overtime_frame(uploaded_file))
+
+
+def ensure_ingested(uploaded_files):
+    """
+    Ingest the files of the queryset/list that were uploaded before ingestion
+    existed. Returns the number of files ingested; files that cannot be read
+    are logged and left pending.
+    """
+    if isinstance(uploaded_files, QuerySet):
+        # Seuls les fichiers en attente sont chargés (pas les aperçus et rapports des autres)
+        pending = uploaded_files.filter(ingested_at__isnull=True)
+    else:
+        pending = [uploaded_file for uploaded_file in uploaded_files if uploaded_file.ingested_at is None]
+    ingested = 0
+    for uploaded_file in pending:
+        try:
+            ingest_uploaded_file(uploaded_file)
+        except Exception:
+            # Un fichier illisible ne doit pas rendre les pages de statistiques inaccessibles
+            logger.warning('Cannot ingest %s', uploaded_file.file.name, exc_info=True)
+            continue
+        ingested += 1
+    return ingested
@@ -0,0 +1,54 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from pointage.bulk_import import discover_files
+from pointage.readers import EXCEL_EXTENSIONS, benchmark, save_calibration
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark the installed Excel reader backends (openpyxl, calamine, xlrd) on uploaded workbooks '
+        'and record the fastest one per format; backends parsing any value differently are rejected.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('sources', nargs='*', help='Directories or glob patterns (default: MEDIA_ROOT)')
+        parser.add_argument('--samples', type=int, default=5, help='Largest workbooks benchmarked per format')
+        parser.add_argument('--repeat', type=int, default=3, help='Reads per file and backend (best one kept)')
+        parser.add_argument('--dry-run', action='store_true', help='Report without writing the calibration file')
+
+    def handle(self, *args, **options):
+        sources = options['sources'] or [str(settings.MEDIA_ROOT)]
+        paths = discover_files(sources, EXCEL_EXTENSIONS)
+        formats = {}
+        for extension in EXCEL_EXTENSIONS:
+            samples = sorted(
+                (path for path in paths if os.path.splitext(path)[1].lower() == extension),
+                key=os.path.getsize, reverse=True,
+            )[:max(1, options['samples'])]
+            if not samples:
+                continue
+            timings = benchmark(samples, extension, repeat=max(1, options['repeat']))
+            ranked = sorted((seconds, backend) for backend, seconds in timings.items() if seconds is not None)
+            if not ranked:
+                continue
+            self.stdout.write(f'{extension} ({len(samples)} file(s)):')
+            for backend, seconds in timings.items():
+                result = f'{seconds:.3f}s' if seconds is not None else 'rejected (error or different values)'
+                self.stdout.write(f'  {backend:<10} {result}')
+            formats[extension] = {
+                'backend': ranked[0][1],
+                'timings': {backend: seconds and round(seconds, 4) for backend, seconds in timings.items()},
+                'files': len(samples),
+            }
+
+        if not formats:
+            raise CommandError(f'No readable workbook found in {", ".join(sources)}.')
+        summary = ', '.join(f'{extension}: {result["backend"]}' for extension, result in formats.items())
+        if options['dry_run']:
+            self.stdout.write(f'Fastest readers: {summary} (not saved).')
+            return
+        path = save_calibration(formats)
+        self.stdout.write(self.style.SUCCESS(f'Fastest readers: {summary}; saved to {path}.'))
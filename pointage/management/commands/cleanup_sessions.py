@@ -0,0 +1,41 @@
+import time
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = (
+        'Delete expired sessions from the database in small batches, so the '
+        'session table is never locked for long (unlike a single clearsessions DELETE).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Sessions deleted per statement')
+        parser.add_argument('--pause', type=float, default=0.0, help='Seconds to wait between batches')
+
+    def handle(self, *args, **options):
+        engine = settings.SESSION_ENGINE.rsplit('.', 1)[-1]
+        if engine in ('cache', 'signed_cookies'):
+            # Rien en base : le cache expire ses entrées, les cookies signés portent leur date
+            self.stdout.write(f'SESSION_ENGINE "{engine}" stores no sessions in the database, nothing to do.')
+            return
+
+        batch_size = max(1, options['batch_size'])
+        now = timezone.now()
+        deleted = 0
+        started = time.perf_counter()
+        while True:
+            keys = list(
+                Session.objects.filter(expire_date__lt=now).values_list('session_key', flat=True)[:batch_size]
+            )
+            if not keys:
+                break
+            deleted += Session.objects.filter(session_key__in=keys).delete()[0]
+            if options['pause']:
+                time.sleep(options['pause'])
+        self.stdout.write(self.style.SUCCESS(
+            f'{deleted} expired session(s) deleted in {time.perf_counter() - started:.1f}s.'
+        ))
@@ -0,0 +1,33 @@
+import time
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from pointage.provisioning import HASH_WORKERS, provision_managers, read_manager_csv
+
+
+class Command(BaseCommand):
+    help = 'Create manager accounts (user + profile) in bulk from a CSV file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_file', help='CSV with username, email, first_name, last_name, phone, department, password columns')
+        parser.add_argument('--workers', type=int, default=HASH_WORKERS, help='Threads used to hash passwords')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        try:
+            with open(options['csv_file'], encoding='utf-8-sig', newline='') as file:
+                rows = read_manager_csv(file)
+        except OSError as e:
+            raise CommandError(f'Cannot read {options["csv_file"]}: {e}')
+        except ValidationError as e:
+            raise CommandError(' '.join(e.messages))
+
+        result = provision_managers(rows, workers=max(1, options['workers']))
+        for line, message in result['errors']:
+            self.stderr.write(f'Line {line}: {message}')
+        if result['skipped']:
+            self.stdout.write(f'{len(result["skipped"])} existing username(s) skipped.')
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(result["created"])} manager(s) created in {time.perf_counter() - started:.1f}s.'
+        ))
@@ -0,0 +1,109 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from django.core.management.base import BaseCommand, CommandError
+
+from pointage.bulk_import import discover_files, find_uploader, imap_bounded, init_worker, store_parsed, try_hash_file, validate_and_parse
+from pointage.models import UploadedExcel
+
+
+class Command(BaseCommand):
+    help = (
+        'Import pointage workbooks in bulk: discover files in directories or glob patterns, '
+        'validate (type and structure, as a browser upload, without the size limit) and parse them '
+        'in a process pool, skip already imported content and store the rows in batches.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('sources', nargs='+', help='Directories (walked recursively) or glob patterns')
+        parser.add_argument('--user', help='Username recorded as uploader (default: first superuser)')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Parsing processes')
+        parser.add_argument('--batch-size', type=int, default=20, help='Files stored per transaction')
+        parser.add_argument('--dry-run', action='store_true', help='Parse and report without writing anything')
+
+    def handle(self, *args, **options):
+        user = self._uploader(options['user'])
+        paths = discover_files(options['sources'])
+        if not paths:
+            raise CommandError('No workbook found.')
+        started = time.perf_counter()
+        workers = max(1, options['workers'])
+        self.stdout.write(f'{len(paths)} file(s) found, {workers} worker(s).')
+
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as pool:
+            # Phase 1 : empreintes, pour ne pas relire un fichier déjà importé
+            hashes, unreadable = {}, 0
+            for path, digest, error in pool.map(try_hash_file, paths, chunksize=8):
+                if error:
+                    # Supprimé ou devenu illisible depuis la découverte
+                    unreadable += 1
+                    self.stderr.write(f'{path}: {error}')
+                else:
+                    hashes[path] = digest
+            known = set(UploadedExcel.objects.filter(
+                content_hash__in=set(hashes.values())
+            ).values_list('content_hash', flat=True))
+            todo, seen, duplicates = [], set(), 0
+            for path, digest in hashes.items():
+                if digest in known or digest in seen:
+                    duplicates += 1
+                    continue
+                seen.add(digest)
+                todo.append(path)
+            if duplicates:
+                self.stdout.write(f'{duplicates} file(s) already imported or duplicated, skipped.')
+
+            # Phase 2 : validation et lecture en parallèle, écriture par lots dans le processus principal
+            stats = {'files': 0, 'rows': 0, 'errors': 0}
+            batch = []
+            # Fichiers déposés sur le serveur : pas de limite de taille d'upload
+            results = imap_bounded(pool, partial(validate_and_parse, check_size=False), todo, max_pending=workers * 2)
+            for done, (path, frame, error) in enumerate(results, start=1):
+                if error:
+                    stats['errors'] += 1
+                    self.stderr.write(f'\n{path}: {error}')
+                else:
+                    batch.append((path, hashes[path], frame))
+                if len(batch) >= options['batch_size']:
+                    self._store(batch, user, stats, options['dry_run'])
+                    batch = []
+                self._progress(done, len(todo), stats, started)
+            self._store(batch, user, stats, options['dry_run'])
+            self._progress(len(todo), len(todo), stats, started)
+
+        elapsed = max(time.perf_counter() - started, 1e-6)
+        self.stderr.write('')
+        self.stdout.write(self.style.SUCCESS(
+            f'{stats["files"]} file(s), {stats["rows"]} row(s) imported in {elapsed:.1f}s '
+            f'({stats["rows"] / elapsed:.0f} rows/s, {stats["files"] / elapsed:.2f} files/s); '
+            f'{duplicates} skipped, {stats["errors"]} error(s), {unreadable} unreadable.'
+        ))
+
+    def _uploader(self, username):
+        user = find_uploader(username)
+        if user is None:
+            raise CommandError(f'Unknown user "{username}".' if username else 'No superuser found, pass --user.')
+        return user
+
+    def _store(self, batch, user, stats, dry_run):
+        if not batch:
+            return
+        if dry_run:
+            stats['files'] += len(batch)
+            stats['rows'] += sum(len(frame) for _, _, frame in batch)
+            return
+        stats['rows'] += store_parsed(batch, user)
+        stats['files'] += len(batch)
+
+    def _progress(self, done, total, stats, started):
+        width = 30
+        filled = width * done // total if total else width
+        elapsed = max(time.perf_counter() - started, 1e-6)
+        self.stderr.write(
+            f'\r[{"#" * filled}{"." * (width - filled)}] {done}/{total} files, '
+            f'{stats["rows"]} rows, {stats["rows"] / elapsed:.0f} rows/s',
+            ending='',
+        )
+        self.stderr.flush()
@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from pointage.sqlite import optimize
+
+
+class Command(BaseCommand):
+    help = 'Refresh SQLite planner statistics (ANALYZE) and optionally compact the database (VACUUM).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--vacuum', action='store_true', help='Also checkpoint the WAL and VACUUM the file')
+        parser.add_argument('--database', default='default', help='Database alias')
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        if connection.vendor != 'sqlite':
+            raise CommandError(f'Database "{options["database"]}" is not SQLite ({connection.vendor}).')
+        started = time.perf_counter()
+        for statement in optimize(connection, vacuum=options['vacuum']):
+            self.stdout.write(f'{statement}')
+        self.stdout.write(self.style.SUCCESS(f'SQLite optimized in {time.perf_counter() - started:.1f}s.'))
@@ -0,0 +1,78 @@
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+from django.core.management.base import BaseCommand
+
+from pointage.bulk_import import imap_bounded, init_worker, parse_file
+from pointage.ingestion import entry_rows, file_metadata
+from pointage.models import UploadedExcel
+from pointage.rebuild import create_shadow_table, drop_shadow_table, shadow_model, source_path, stage_rows, swap_in
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute every stored time entry from the uploaded workbooks: parse them in a process pool, '
+        'write the rows to a shadow table and swap them in atomically, so the dashboards keep serving '
+        'the previous numbers until the rebuild is complete.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Parsing processes')
+
+    def handle(self, *args, **options):
+        workers = max(1, options['workers'])
+        timings = {}
+
+        with self._phase(timings, 'discover'):
+            paths = defaultdict(list)
+            kept = 0
+            for uploaded in UploadedExcel.objects.only('id', 'file').order_by('id').iterator():
+                path = source_path(uploaded)
+                if path:
+                    paths[path].append(uploaded.id)
+                else:
+                    kept += 1
+        self.stdout.write(f'{sum(map(len, paths.values()))} file(s) to rebuild, {kept} without source kept as stored, {workers} worker(s).')
+
+        model = shadow_model()
+        rebuilt, metadata, rows, errors = [], {}, 0, 0
+        try:
+            with self._phase(timings, 'parse+stage'):
+                create_shadow_table(model)
+                with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as pool:
+                    for path, frame, error in imap_bounded(pool, parse_file, paths, max_pending=workers * 2):
+                        if error:
+                            # Les lignes actuelles du fichier sont conservées
+                            errors += 1
+                            self.stderr.write(f'{path}: {error}')
+                            continue
+                        file_fields = dict(file_metadata(frame), file_size=os.path.getsize(path))
+                        file_rows = entry_rows(frame)
+                        for uploaded_id in paths[path]:
+                            rows += stage_rows(model, uploaded_id, file_rows)
+                            rebuilt.append(uploaded_id)
+                            metadata[uploaded_id] = file_fields
+
+            with self._phase(timings, 'swap'):
+                swapped = swap_in(rebuilt, metadata)
+        finally:
+            with self._phase(timings, 'cleanup'):
+                drop_shadow_table(model)
+
+        total = max(sum(timings.values()), 1e-6)
+        self.stdout.write('  '.join(f'{name} {seconds:.2f}s' for name, seconds in timings.items()))
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(rebuilt)} file(s), {swapped} row(s) rebuilt in {total:.1f}s '
+            f'({rows / total:.0f} rows/s); {kept} kept, {errors} error(s).'
+        ))
+
+    @contextmanager
+    def _phase(self, timings, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            timings[name] = time.perf_counter() - started
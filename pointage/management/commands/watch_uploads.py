@@ -0,0 +1,110 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from pointage.bulk_import import find_uploader, hash_file, imap_bounded, import_extensions, init_worker, store_parsed, validate_and_parse
+from pointage.models import UploadedExcel
+from pointage.watcher import SettleTracker, make_watcher, scan
+
+# Avec --once, un lot en erreur est retenté quelques fois avant d'abandonner
+ONCE_RETRIES = 3
+
+
+class Command(BaseCommand):
+    help = (
+        'Watch a directory and import the pointage workbooks dropped into it: files are taken once '
+        'fully written, validated and parsed in a bounded process pool, then stored in batches.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory', help='Drop-box directory (not walked recursively)')
+        parser.add_argument('--user', help='Username recorded as uploader (default: first superuser)')
+        parser.add_argument('--workers', type=int, default=min(4, os.cpu_count() or 1), help='Parsing processes')
+        parser.add_argument('--batch-size', type=int, default=20, help='Files taken per cycle and stored per transaction')
+        parser.add_argument('--settle', type=float, default=2.0, help='Seconds a file must stay unchanged before it is read')
+        parser.add_argument('--interval', type=float, default=2.0, help='Seconds between two checks')
+        parser.add_argument('--polling', action='store_true', help='Rescan the directory instead of using inotify')
+        parser.add_argument('--once', action='store_true', help='Import the files present, then exit')
+
+    def handle(self, *args, **options):
+        directory = os.path.abspath(options['directory'])
+        if not os.path.isdir(directory):
+            raise CommandError(f'"{directory}" is not a directory.')
+        user = find_uploader(options['user'])
+        if user is None:
+            raise CommandError(f'Unknown user "{options["user"]}".' if options['user'] else 'No superuser found, pass --user.')
+        workers = max(1, options['workers'])
+        batch_size = max(1, options['batch_size'])
+
+        watcher = make_watcher(directory, options['interval'], options['polling'])
+        tracker = SettleTracker(options['settle'])
+        # Fichiers déposés pendant que le service était arrêté
+        tracker.add(scan(directory, import_extensions()))
+        self._log(f'Watching {directory} ({watcher.name}, {workers} worker(s)).')
+
+        busy, failures = False, 0
+        try:
+            with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as pool:
+                while True:
+                    # Processus de longue durée : ne pas garder une connexion fermée par le serveur
+                    close_old_connections()
+                    # Back-pressure : on ne prend qu'un lot à la fois, le reste attend dans la file
+                    paths = tracker.ready(limit=batch_size)
+                    if paths:
+                        try:
+                            self._ingest(pool, paths, user, workers)
+                        except Exception as e:
+                            # Base indisponible... : le service survit, le lot sera retenté
+                            failures += 1
+                            if options['once'] and failures > ONCE_RETRIES:
+                                raise CommandError(f'Batch of {len(paths)} file(s) failed: {e}')
+                            self.stderr.write(f'Batch of {len(paths)} file(s) failed, will retry: {e}')
+                            tracker.requeue(paths)
+                    elif options['once'] and not len(tracker):
+                        break
+                    busy = bool(paths)
+                    tracker.add(watcher.wait(timeout=0 if busy else None))
+        except KeyboardInterrupt:
+            self._log('Stopped.')
+        finally:
+            watcher.close()
+
+    def _ingest(self, pool, paths, user, workers):
+        started = time.perf_counter()
+        digests, vanished = {}, 0
+        for path, future in [(path, pool.submit(hash_file, path)) for path in paths]:
+            try:
+                digests[path] = future.result()[1]
+            except OSError as e:
+                # Supprimé ou renommé depuis qu'il a été jugé complet
+                vanished += 1
+                self.stderr.write(f'{os.path.basename(path)}: skipped, {e}')
+        paths = list(digests)
+        known = set(UploadedExcel.objects.filter(
+            content_hash__in=set(digests.values())
+        ).values_list('content_hash', flat=True))
+        todo, seen = [], set(known)
+        for path in paths:
+            if digests[path] not in seen:
+                seen.add(digests[path])
+                todo.append(path)
+
+        batch, rejected = [], 0
+        for path, frame, error in imap_bounded(pool, validate_and_parse, todo, max_pending=workers * 2):
+            if error:
+                rejected += 1
+                self.stderr.write(f'{os.path.basename(path)}: {error}')
+            else:
+                batch.append((path, digests[path], frame))
+        # Une erreur d'écriture remonte à handle(), qui remet le lot en file
+        rows = store_parsed(batch, user) if batch else 0
+        self._log(
+            f'{len(batch)} file(s), {rows} row(s) imported in {time.perf_counter() - started:.1f}s; '
+            f'{len(paths) - len(todo)} already imported, {rejected} rejected, {vanished} vanished.'
+        )
+
+    def _log(self, message):
+        self.stdout.write(f'[{time.strftime("%Y-%m-%d %H:%M:%S")}] {message}')
@@ -0,0 +1,51 @@
+# Generated by Django 5.1.15 on 2026-10-19 11:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pointage', '0002_managerprofile'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Department',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('key', models.CharField(max_length=100, unique=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Employee',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=150)),
+                ('key', models.CharField(max_length=150, unique=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='uploadedexcel',
+            name='ingested_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='TimeEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('minute_in', models.SmallIntegerField()),
+                ('minute_out', models.SmallIntegerField()),
+                ('heures_sup', models.SmallIntegerField()),
+                ('department', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='entries', to='pointage.department')),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='entries', to='pointage.employee')),
+                ('uploaded_file', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='entries', to='pointage.uploadedexcel')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['employee', 'date'], name='pointage_ti_employe_9cc7b5_idx'), models.Index(fields=['department', 'date'], name='pointage_ti_departm_c54824_idx')],
+            },
+        ),
+    ]
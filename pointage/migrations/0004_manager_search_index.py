@@ -0,0 +1,97 @@
+from django.db import migrations
+
+# Champs cherchés par la liste des managers (voir search.search_managers)
+USER_COLUMNS = ('username', 'first_name', 'last_name', 'email')
+
+SQLITE_TABLE = 'pointage_manager_search'
+
+# Une ligne FTS5 par utilisateur (rowid = id), tenue à jour par des triggers,
+# y compris pour les bulk_create / update() qui n'envoient pas de signaux.
+SQLITE_REFRESH = f"""
+    DELETE FROM {SQLITE_TABLE} WHERE rowid = {{user_id}};
+    INSERT INTO {SQLITE_TABLE} (rowid, username, first_name, last_name, email, department)
+    SELECT u.id, u.username, u.first_name, u.last_name, u.email, COALESCE(p.department, '')
+    FROM auth_user u LEFT JOIN pointage_managerprofile p ON p.user_id = u.id
+    WHERE u.id = {{user_id}};
+"""
+
+SQLITE_FORWARD = [
+    f"""CREATE VIRTUAL TABLE {SQLITE_TABLE} USING fts5(
+        username, first_name, last_name, email, department, tokenize='trigram'
+    )""",
+    f"""INSERT INTO {SQLITE_TABLE} (rowid, username, first_name, last_name, email, department)
+        SELECT u.id, u.username, u.first_name, u.last_name, u.email, COALESCE(p.department, '')
+        FROM auth_user u LEFT JOIN pointage_managerprofile p ON p.user_id = u.id""",
+    f"""CREATE TRIGGER pointage_manager_search_user_ins AFTER INSERT ON auth_user BEGIN
+        {SQLITE_REFRESH.format(user_id='NEW.id')}
+    END""",
+    f"""CREATE TRIGGER pointage_manager_search_user_upd AFTER UPDATE OF username, first_name, last_name, email ON auth_user BEGIN
+        {SQLITE_REFRESH.format(user_id='NEW.id')}
+    END""",
+    f"""CREATE TRIGGER pointage_manager_search_user_del AFTER DELETE ON auth_user BEGIN
+        DELETE FROM {SQLITE_TABLE} WHERE rowid = OLD.id;
+    END""",
+    f"""CREATE TRIGGER pointage_manager_search_profile_ins AFTER INSERT ON pointage_managerprofile BEGIN
+        {SQLITE_REFRESH.format(user_id='NEW.user_id')}
+    END""",
+    f"""CREATE TRIGGER pointage_manager_search_profile_upd AFTER UPDATE OF department ON pointage_managerprofile BEGIN
+        {SQLITE_REFRESH.format(user_id='NEW.user_id')}
+    END""",
+    f"""CREATE TRIGGER pointage_manager_search_profile_del AFTER DELETE ON pointage_managerprofile BEGIN
+        {SQLITE_REFRESH.format(user_id='OLD.user_id')}
+    END""",
+]
+
+SQLITE_BACKWARD = [
+    'DROP TRIGGER IF EXISTS pointage_manager_search_user_ins',
+    'DROP TRIGGER IF EXISTS pointage_manager_search_user_upd',
+    'DROP TRIGGER IF EXISTS pointage_manager_search_user_del',
+    'DROP TRIGGER IF EXISTS pointage_manager_search_profile_ins',
+    'DROP TRIGGER IF EXISTS pointage_manager_search_profile_upd',
+    'DROP TRIGGER IF EXISTS pointage_manager_search_profile_del',
+    f'DROP TABLE IF EXISTS {SQLITE_TABLE}',
+]
+
+# icontains s'écrit UPPER(col::text) LIKE UPPER(...) sous PostgreSQL : index trigramme sur cette expression
+POSTGRES_FORWARD = ['CREATE EXTENSION IF NOT EXISTS pg_trgm'] + [
+    f'CREATE INDEX IF NOT EXISTS auth_user_{column}_trgm ON auth_user USING gin (UPPER({column}::text) gin_trgm_ops)'
+    for column in USER_COLUMNS
+] + [
+    'CREATE INDEX IF NOT EXISTS pointage_managerprofile_department_trgm '
+    'ON pointage_managerprofile USING gin (UPPER(department::text) gin_trgm_ops)',
+]
+
+POSTGRES_BACKWARD = [
+    f'DROP INDEX IF EXISTS auth_user_{column}_trgm' for column in USER_COLUMNS
+] + ['DROP INDEX IF EXISTS pointage_managerprofile_department_trgm']
+
+
+def _sqlite_has_trigram():
+    # Tokenizer trigram : SQLite 3.34+
+    import sqlite3
+    return sqlite3.sqlite_version_info >= (3, 34, 0)
+
+
+def _run(statements_by_vendor):
+    def run(apps, schema_editor):
+        connection = schema_editor.connection
+        if connection.vendor == 'sqlite' and not _sqlite_has_trigram():
+            return  # recherche par icontains
+        for statement in statements_by_vendor.get(connection.vendor, []):
+            schema_editor.execute(statement, params=None)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('pointage', '0003_employee_department_timeentry'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            _run({'sqlite': SQLITE_FORWARD, 'postgresql': POSTGRES_FORWARD}),
+            _run({'sqlite': SQLITE_BACKWARD, 'postgresql': POSTGRES_BACKWARD}),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.15 on 2026-10-19 11:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pointage', '0004_manager_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uploadedexcel',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.15 on 2026-10-19 12:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pointage', '0005_uploadedexcel_content_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uploadedexcel',
+            name='schema',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
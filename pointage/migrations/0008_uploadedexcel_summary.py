@@ -0,0 +1,86 @@
+# Generated by Django 5.1.15 on 2026-10-19 12:14
+
+from django.db import migrations, models
+from django.db.models import Count, Max, Min, Sum
+
+
+def backfill_summaries(apps, schema_editor):
+    """Fill the summary of the files ingested earlier from their stored entries (no workbook is read)."""
+    UploadedExcel = apps.get_model('pointage', 'UploadedExcel')
+    TimeEntry = apps.get_model('pointage', 'TimeEntry')
+    totals = TimeEntry.objects.values('uploaded_file_id').annotate(
+        rows=Count('id'), employees=Count('employee_id', distinct=True),
+        first=Min('date'), last=Max('date'), overtime=Sum('heures_sup'),
+    )
+    totals = {row['uploaded_file_id']: row for row in totals}
+    departments = {}
+    for file_id, name in TimeEntry.objects.filter(department__isnull=False).values_list(
+        'uploaded_file_id', 'department__name',
+    ).distinct():
+        departments.setdefault(file_id, []).append(name)
+
+    for uploaded in UploadedExcel.objects.filter(ingested_at__isnull=False).iterator():
+        row = totals.get(uploaded.id, {})
+        uploaded.row_count = row.get('rows', 0)
+        uploaded.employee_count = row.get('employees', 0)
+        uploaded.date_min, uploaded.date_max = row.get('first'), row.get('last')
+        uploaded.overtime_total = row.get('overtime') or 0
+        uploaded.departments = sorted(departments.get(uploaded.id, []), key=str.casefold)
+        try:
+            uploaded.file_size = uploaded.file.size
+        except (OSError, ValueError):
+            pass
+        uploaded.save(update_fields=[
+            'row_count', 'employee_count', 'date_min', 'date_max', 'overtime_total', 'departments', 'file_size',
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pointage', '0007_uploadedexcel_quality'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uploadedexcel',
+            name='date_max',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='uploadedexcel',
+            name='date_min',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='uploadedexcel',
+            name='departments',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='uploadedexcel',
+            name='employee_count',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='uploadedexcel',
+            name='file_size',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='uploadedexcel',
+            name='overtime_total',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='uploadedexcel',
+            name='parse_seconds',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='uploadedexcel',
+            name='row_count',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_summaries, migrations.RunPython.noop),
+    ]
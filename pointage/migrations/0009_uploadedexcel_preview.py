@@ -0,0 +1,18 @@
+# Generated by Django 5.1.15 on 2026-10-19 12:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pointage', '0008_uploadedexcel_summary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uploadedexcel',
+            name='preview',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
@@ -1,8 +1,10 @@
 from django.db import models
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
+from .cache import invalidate_auth_user
+
 class ManagerProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     phone = models.CharField(max_length=20, blank=True, null=True)
@@ -19,16 +21,92 @@ class ManagerProfile(models.Model):
     def __str__(self):
         return f"{self.user.get_full_name() or self.user.username}"
 
+# Champs de User enregistrés sans rapport avec le profil (mise à jour de last_login à la connexion)
+PROFILE_UNRELATED_FIELDS = frozenset({'last_login'})
+
 @receiver(post_save, sender=User)
-def create_or_update_manager_profile(sender, instance, created, **kwargs):
-    if created or not hasattr(instance, 'managerprofile'):
+def create_or_update_manager_profile(sender, instance, created, update_fields=None, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
         ManagerProfile.objects.create(user=instance)
-    instance.managerprofile.save()
+        return
+    if update_fields is not None and PROFILE_UNRELATED_FIELDS.issuperset(update_fields):
+        return
+    # Comptes créés avant l'existence des profils
+    ManagerProfile.objects.get_or_create(user=instance)
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    invalidate_auth_user(instance.pk)
+
+@receiver(post_save, sender=ManagerProfile)
+@receiver(post_delete, sender=ManagerProfile)
+def invalidate_cached_profile_user(sender, instance, **kwargs):
+    invalidate_auth_user(instance.user_id)
 
 class UploadedExcel(models.Model):
     file = models.FileField(upload_to='uploads/')
     uploaded_at = models.DateTimeField(auto_now_add=True)
     uploaded_by = models.ForeignKey(User, on_delete=models.CASCADE)
+    ingested_at = models.DateTimeField(blank=True, null=True)
+    # SHA-256 du contenu, pour ignorer un fichier déjà importé
+    content_hash = models.CharField(max_length=64, blank=True, db_index=True)
+    # Colonnes et formats date/heure détectés à l'import, voir schema.inspect_schema
+    schema = models.JSONField(blank=True, null=True)
+    # Rapport qualité des lignes (pointages manquants, doublons...), voir quality.py
+    quality = models.JSONField(blank=True, null=True)
+    # Résumé calculé à l'ingestion : la liste des fichiers ne relit jamais un classeur
+    row_count = models.PositiveIntegerField(blank=True, null=True)
+    employee_count = models.PositiveIntegerField(blank=True, null=True)
+    departments = models.JSONField(blank=True, default=list)
+    date_min = models.DateField(blank=True, null=True)
+    date_max = models.DateField(blank=True, null=True)
+    overtime_total = models.PositiveIntegerField(blank=True, null=True)
+    parse_seconds = models.FloatField(blank=True, null=True)
+    file_size = models.BigIntegerField(blank=True, null=True)
+    # Premières lignes des colonnes détectées, voir preview.build_preview
+    preview = models.JSONField(blank=True, null=True)
+
+    @property
+    def quality_issues(self):
+        from .quality import issue_list
+        return issue_list(self.quality)
 
     def __str__(self):
         return self.file.name
+
+class Department(models.Model):
+    name = models.CharField(max_length=100)
+    # Nom normalisé (casse, accents et espaces repliés), voir ingestion.normalize_key
+    key = models.CharField(max_length=100, unique=True)
+
+    def __str__(self):
+        return self.name
+
+class Employee(models.Model):
+    name = models.CharField(max_length=150)
+    key = models.CharField(max_length=150, unique=True)
+
+    def __str__(self):
+        return self.name
+
+class TimeEntry(models.Model):
+    """One valid in/out pair read from an uploaded file."""
+    uploaded_file = models.ForeignKey(UploadedExcel, on_delete=models.CASCADE, related_name='entries')
+    employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='entries')
+    department = models.ForeignKey(Department, on_delete=models.SET_NULL, blank=True, null=True, related_name='entries')
+    date = models.DateField()
+    minute_in = models.SmallIntegerField()
+    minute_out = models.SmallIntegerField()
+    heures_sup = models.SmallIntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['employee', 'date']),
+            models.Index(fields=['department', 'date']),
+        ]
+
+    def __str__(self):
+        return f"{self.employee} {self.date}"
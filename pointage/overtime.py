@@ -0,0 +1,280 @@
+"""
+Vectorized overtime computation shared by the pointage views.
+
+Overtime is judged per employee and work-day: the in/out pairs of a day
+are added up (overlapping time counted once), the daily total is rounded
+up to the next hour, weekend days count entirely as overtime and weekdays
+count everything above ``REGULAR_DAY_HOURS``. A pair starting shortly
+after midnight that resumes a shift stopped at midnight, or that overlaps
+the previous day's last pair, belongs to that shift's work-day.
+"""
+import time
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+
+from .preview import build_preview
+from .quality import missing_columns_report, row_report
+from .readers import read_table
+from .schema import inspect_schema, parse_dates, parse_times, schema_columns
+
+WEEKEND_DAYS = (5, 6)  # 5=Samedi, 6=Dimanche
+REGULAR_DAY_HOURS = 8
+# Pause maximale entre deux pointages d'un même poste de nuit
+SHIFT_GAP_SECONDS = 3600
+
+FRAME_COLUMNS = [
+    'nom', 'department', 'date', 'in', 'out', 'minute_in', 'minute_out',
+    'heures_travaillees', 'heures_sup', 'weekend',
+]
+
+
+def consolidate_days(names, dates, seconds_in, durations):
+    """
+    Work-day and overtime of each in/out pair, computed on the daily totals.
+
+    ``names``, ``dates`` (midnight), ``seconds_in`` and ``durations``
+    (seconds) are aligned Series. Returns ``(workday, seconds_worked,
+    heures_sup)`` aligned on the same index: ``seconds_worked`` excludes
+    the time already covered by an earlier pair of the day, and the
+    ``heures_sup`` of the pairs of a day add up to the overtime of its
+    rounded total (each pair gets what its hours add to the running total).
+    """
+    # Import local : ingestion charge les modèles
+    from .ingestion import normalize_key
+
+    if names.empty:
+        empty = pd.Series(index=names.index, dtype=float)
+        return empty.astype('datetime64[ns]'), empty, empty.astype(np.int64)
+
+    codes, labels = pd.factorize(names)
+    employee = pd.factorize(pd.Index([normalize_key(label) for label in labels]))[0][codes]
+    day = dates.to_numpy(dtype='datetime64[s]').astype(np.int64)
+    start = day + seconds_in.to_numpy(dtype=np.int64)
+    end = start + durations.to_numpy(dtype=np.int64)
+
+    # Tri (employé, début) sur une seule clé entière : plus rapide que np.lexsort
+    first = start.min()
+    order = np.argsort(employee * (int(start.max() - first) + 1) + (start - first))
+    employee, day, start, end = employee[order], day[order], start[order], end[order]
+    same_employee = np.r_[False, employee[1:] == employee[:-1]]
+
+    # Poste de nuit : paire du jour suivant qui reprend, après une pause courte, une paire
+    # arrêtée à minuit au plus tard, ou qui chevauche la paire précédente
+    previous_end = np.r_[end[:1], end[:-1]]
+    resumed = (previous_end <= day) & (start - previous_end <= SHIFT_GAP_SECONDS)
+    continued = same_employee & (day > np.r_[day[:1], day[:-1]]) & (resumed | (previous_end >= start))
+    shift = np.cumsum(~continued) - 1
+    workday = day[~continued][shift]
+
+    new_day = ~same_employee | (workday != np.r_[workday[:1], workday[:-1]])
+    group = np.cumsum(new_day) - 1
+    # Fin la plus tardive des paires précédentes du jour (cummax par groupe, via un décalage par groupe)
+    offset = group * (int(end.max() - end.min()) + 1) - end.min()
+    covered_until = np.maximum.accumulate(end + offset) - offset
+    covered_until = np.where(new_day, start, np.r_[start[:1], covered_until[:-1]])
+    worked = np.clip(end - np.maximum(start, covered_until), 0, None)
+
+    running = np.cumsum(worked)
+    running = running - (running - worked)[new_day][group]
+    hours = np.ceil(running / 3600)
+    weekend = np.isin((workday // 86400 + 3) % 7, WEEKEND_DAYS)  # 1970-01-01 était un jeudi
+    overtime = np.where(weekend, hours, np.clip(hours - REGULAR_DAY_HOURS, 0, None))
+    heures_sup = overtime - np.where(new_day, 0, np.r_[0, overtime[:-1]])
+
+    def restore(values, dtype=None):
+        result = np.empty_like(values, dtype=dtype)
+        result[order] = values
+        return pd.Series(result, index=names.index)
+
+    workday = restore(workday.astype('datetime64[s]').astype('datetime64[ns]'))
+    return workday, restore(worked, float), restore(heures_sup, np.int64)
+
+
+def compute_overtime_frame(df, schema=None):
+    """
+    Turn a raw pointage DataFrame into one row per valid in/out pair,
+    with the overtime of each work-day spread over its pairs.
+
+    ``schema`` is the fingerprint stored for the file; it is inspected
+    again when missing or outdated. Returns a DataFrame with
+    ``FRAME_COLUMNS``, the fingerprint in ``attrs['schema']`` and the
+    data-quality report of the rows in ``attrs['quality']``; rows with
+    missing or unparseable punches or dates are dropped. An empty frame
+    is returned when the required columns are absent.
+    """
+    cols = schema_columns(df, schema)
+    if cols is None:
+        schema = inspect_schema(df)
+        cols = schema_columns(df, schema)
+    if not all([cols['name'], cols['in'], cols['out'], cols['date']]):
+        frame = pd.DataFrame(columns=FRAME_COLUMNS)
+        frame.attrs['schema'] = schema
+        frame.attrs['quality'] = missing_columns_report(df, cols)
+        return frame
+
+    heure_in = df[cols['in']].astype(str).str.strip()
+    heure_out = df[cols['out']].astype(str).str.strip()
+    seconds_in = parse_times(df[cols['in']], schema.get('in'))
+    seconds_out = parse_times(df[cols['out']], schema.get('out'))
+    dates = parse_dates(df[cols['date']], schema.get('date'))
+    quality = row_report(df, cols, seconds_in, seconds_out, dates)
+
+    valid = seconds_in.notna() & seconds_out.notna() & dates.notna()
+    duree = (seconds_out - seconds_in)[valid]
+    duree = duree.where(duree >= 0, duree + 86400)
+    noms = df.loc[valid, cols['name']].astype(str).str.strip()
+    dates, seconds, heures_sup = consolidate_days(noms, dates[valid].dt.normalize(), seconds_in[valid], duree)
+    heures_travaillees = seconds / 3600
+    weekend = dates.dt.weekday.isin(WEEKEND_DAYS)
+
+    if cols['department']:
+        dept = df.loc[valid, cols['department']]
+        department = dept.astype(str).astype(object).where(dept.notna(), None)
+    else:
+        department = pd.Series(None, index=dates.index, dtype=object)
+
+    frame = pd.DataFrame({
+        'nom': noms,
+        'department': department,
+        'date': dates,
+        'in': heure_in[valid],
+        'out': heure_out[valid],
+        'minute_in': (seconds_in[valid] // 60).astype(int),
+        'minute_out': (seconds_out[valid] // 60).astype(int),
+        'heures_travaillees': heures_travaillees,
+        'heures_sup': heures_sup,
+        'weekend': weekend,
+    }, columns=FRAME_COLUMNS)
+    frame.attrs['schema'] = schema
+    frame.attrs['quality'] = quality
+    return frame
+
+
+def parse_overtime_file(file, name=None, schema=None):
+    """
+    Read a pointage file (path or file object) and compute its overtime
+    frame, timed in ``attrs['parse_seconds']``, with the first rows of the
+    file in ``attrs['preview']``.
+    """
+    started = time.perf_counter()
+    df = read_table(file, name=name)
+    frame = compute_overtime_frame(df, schema)
+    frame.attrs['parse_seconds'] = round(time.perf_counter() - started, 3)
+    frame.attrs['preview'] = build_preview(df, schema_columns(df, frame.attrs['schema']))
+    return frame
+
+
+def read_overtime_frame(uploaded_file):
+    """Overtime frame of one uploaded file, using its stored fingerprint; read errors propagate."""
+    with uploaded_file.file.open('rb') as file:
+        return parse_overtime_file(file, name=uploaded_file.file.name, schema=uploaded_file.schema)
+
+
+def weekly_overtime_totals(frame):
+    """
+    Overtime per employee and ISO week (weeks start on Monday).
+
+    Returns a DataFrame sorted by (employee, week_start) with columns
+    ``emp`` (integer employee code), ``nom``, ``department``, ``week_start``
+    and ``heures_sup``. Grouping is done on integer codes rather than on
+    the name strings.
+    """
+    overtime = frame[frame['heures_sup'] > 0]
+    if overtime.empty:
+        return pd.DataFrame(columns=['emp', 'nom', 'department', 'week_start', 'heures_sup'])
+    days = overtime['date'].to_numpy(dtype='datetime64[D]').astype(np.int64)
+    emp_codes, names = pd.factorize(overtime['nom'])
+    dept_codes, departments = pd.factorize(overtime['department'])
+    weekly = (
+        pd.DataFrame({
+            'emp': emp_codes,
+            'week': days - (days + 3) % 7,  # 1970-01-01 était un jeudi
+            'heures_sup': overtime['heures_sup'].to_numpy(),
+            'dept': dept_codes,
+        })
+        .groupby(['emp', 'week'], sort=True)
+        .agg(heures_sup=('heures_sup', 'sum'), dept=('dept', 'max'))
+        .reset_index()
+    )
+    # Le code -1 (département manquant) pointe sur le None final
+    dept_labels = np.append(np.asarray(departments, dtype=object), None)
+    return pd.DataFrame({
+        'emp': weekly['emp'],
+        'nom': names.take(weekly['emp'].to_numpy()),
+        'department': dept_labels[weekly['dept'].to_numpy()],
+        'week_start': weekly['week'].to_numpy().astype('datetime64[D]').astype('datetime64[ns]'),
+        'heures_sup': weekly['heures_sup'],
+    })
+
+
+def rolling_overtime_totals(weekly, weeks=4):
+    """
+    Sum weekly overtime over a rolling window of ``weeks`` calendar weeks.
+
+    Weeks without overtime are simply absent from ``weekly``: the window is
+    time-based, so gaps are handled without reindexing.
+    """
+    if weekly.empty:
+        return weekly.assign(heures_sup_glissantes=pd.Series(dtype=int))
+    rolled = (
+        weekly.set_index('week_start')
+        .groupby('emp', sort=False)['heures_sup']
+        .rolling(f'{weeks * 7}D')
+        .sum()
+    )
+    return weekly.assign(heures_sup_glissantes=rolled.to_numpy().astype(int))
+
+
+def overtime_caps():
+    """Configured overtime limits: weekly cap, rolling window length (weeks) and rolling cap."""
+    return (
+        getattr(settings, 'OVERTIME_WEEKLY_CAP', 13),
+        getattr(settings, 'OVERTIME_ROLLING_WEEKS', 4),
+        getattr(settings, 'OVERTIME_ROLLING_CAP', 36),
+    )
+
+
+def overtime_cap_alerts(frame, weekly_cap, rolling_cap, rolling_weeks=4):
+    """
+    List employees whose weekly or rolling overtime exceeds the caps.
+
+    Each alert is a dict with the employee name, department, worst week,
+    worst rolling window and the number of weeks above the weekly cap.
+    Alerts are sorted by rolling total, highest first.
+    """
+    weekly = rolling_overtime_totals(weekly_overtime_totals(frame), rolling_weeks)
+    if weekly.empty:
+        return []
+
+    weekly['over_weekly'] = weekly['heures_sup'] > weekly_cap
+    weekly['over_rolling'] = weekly['heures_sup_glissantes'] > rolling_cap
+    per_employee = weekly.groupby('emp', sort=True)
+    worst_week = weekly.loc[per_employee['heures_sup'].idxmax()].set_index('emp')
+    worst_window = weekly.loc[per_employee['heures_sup_glissantes'].idxmax()].set_index('emp')
+    summary = pd.DataFrame({
+        'nom': worst_week['nom'],
+        'department': per_employee['department'].last(),
+        'max_semaine': worst_week['heures_sup'],
+        'semaine_max': worst_week['week_start'],
+        'max_glissant': worst_window['heures_sup_glissantes'],
+        'fin_glissant_max': worst_window['week_start'],
+        'semaines_depassement': per_employee['over_weekly'].sum(),
+        'depassement_glissant': per_employee['over_rolling'].any(),
+    })
+    summary = summary[(summary['semaines_depassement'] > 0) | summary['depassement_glissant']]
+    summary = summary.sort_values('max_glissant', ascending=False)
+    return [
+        {
+            'nom': alert['nom'],
+            'department': alert['department'] if isinstance(alert['department'], str) else None,
+            'max_semaine': int(alert['max_semaine']),
+            'semaine_max': alert['semaine_max'].date(),
+            'max_glissant': int(alert['max_glissant']),
+            'fin_glissant_max': alert['fin_glissant_max'].date(),
+            'semaines_depassement': int(alert['semaines_depassement']),
+            'depassement_glissant': bool(alert['depassement_glissant']),
+        }
+        for alert in summary.to_dict('records')
+    ]
@@ -0,0 +1,53 @@
+"""
+First rows of a pointage file, for display.
+
+The preview (first ``PREVIEW_ROWS`` rows of the detected columns, cells
+as text) is built at parse time and stored on ``UploadedExcel.preview``:
+the post-upload page and the hover previews of the file list are served
+from it without reopening the workbook. The full viewer reads the file
+again and shows it one window of ``VIEWER_ROWS`` rows at a time.
+"""
+import pandas as pd
+
+PREVIEW_ROWS = 200
+VIEWER_ROWS = 200
+# Ordre d'affichage des colonnes détectées, voir schema.inspect_schema
+PREVIEW_FIELDS = ('date', 'name', 'department', 'in', 'out')
+
+
+def detected_columns(cols):
+    """Source columns of ``cols`` (``schema_columns`` result) in display order."""
+    return [cols[field] for field in PREVIEW_FIELDS if (cols or {}).get(field) is not None]
+
+
+def _text(series):
+    if pd.api.types.is_datetime64_any_dtype(series):
+        # Dates seules quand aucune cellule n'a d'heure, comme DataFrame.to_html
+        has_time = (series.dropna() != series.dropna().dt.normalize()).any()
+        text = series.dt.strftime('%Y-%m-%d %H:%M:%S' if has_time else '%Y-%m-%d')
+    else:
+        text = series.astype(object).map(str)
+    return text.where(series.notna(), '')
+
+
+def table_rows(df, columns):
+    """Cells of ``columns`` of ``df`` as text (empty for missing values), one list per row."""
+    if not columns or df.empty:
+        return []
+    text = pd.DataFrame({i: _text(df[col]) for i, col in enumerate(columns)})
+    return text.to_numpy().tolist()
+
+
+def build_preview(df, cols, rows=PREVIEW_ROWS):
+    """
+    JSON-serializable preview of a raw pointage DataFrame: the detected
+    ``columns``, their first ``rows`` rows, the ``total`` row count and
+    every column read from the file (``read_columns``).
+    """
+    columns = detected_columns(cols)
+    return {
+        'columns': [str(col) for col in columns],
+        'rows': table_rows(df.head(rows), columns),
+        'total': int(len(df)),
+        'read_columns': [str(col) for col in df.columns],
+    }
@@ -0,0 +1,167 @@
+"""
+Bulk administration of manager accounts: creation from a CSV file and
+actions applied to many accounts at once.
+
+Users and their profiles are inserted with ``bulk_create`` (no per-user
+``post_save``), and password hashing - the expensive part - runs in a
+thread pool: the PBKDF2 hasher releases the GIL.
+
+Expected columns: ``username`` (required), ``email``, ``first_name``,
+``last_name``, ``phone``, ``department``, ``password``. Rows without a
+password get an unusable one; an admin sets it later.
+"""
+import csv
+import io
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+from django.utils import timezone
+
+from .cache import invalidate_auth_users
+from .models import ManagerProfile, UploadedExcel
+
+CSV_COLUMNS = ('username', 'email', 'first_name', 'last_name', 'phone', 'department', 'password')
+HASH_WORKERS = 4
+BATCH_SIZE = 500
+
+
+def read_manager_csv(file):
+    """Rows of a manager CSV (text or binary file object) as dicts keyed by ``CSV_COLUMNS``."""
+    content = file.read()
+    if isinstance(content, bytes):
+        content = content.decode('utf-8-sig')
+    sample = content[:2048]
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=',;\t')
+    except csv.Error:
+        dialect = csv.excel
+    reader = csv.DictReader(io.StringIO(content), dialect=dialect)
+    if not reader.fieldnames or 'username' not in [name.strip().lower() for name in reader.fieldnames]:
+        raise ValidationError('Le fichier CSV doit contenir une colonne "username".')
+    rows = []
+    for row in reader:
+        row = {(key or '').strip().lower(): (value or '').strip() for key, value in row.items()}
+        rows.append({column: row.get(column, '') for column in CSV_COLUMNS})
+    return rows
+
+
+def _validate(rows):
+    """Split rows into valid ones and (line, message) errors; line 2 is the first data row."""
+    valid, errors, seen = [], [], set()
+    max_username = User._meta.get_field('username').max_length
+    for line, row in enumerate(rows, start=2):
+        username = row['username']
+        if not username:
+            errors.append((line, "Nom d'utilisateur manquant."))
+            continue
+        if len(username) > max_username or username in seen:
+            errors.append((line, f'Nom d\'utilisateur invalide ou en double : "{username}".'))
+            continue
+        if row['email']:
+            try:
+                validate_email(row['email'])
+            except ValidationError:
+                errors.append((line, f'Adresse email invalide : "{row["email"]}".'))
+                continue
+        seen.add(username)
+        valid.append(row)
+    return valid, errors
+
+
+def _hash_passwords(passwords, workers=HASH_WORKERS):
+    """Hash the given raw passwords in parallel; empty ones become unusable passwords."""
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(lambda raw: make_password(raw or None), passwords))
+
+
+def provision_managers(rows, workers=HASH_WORKERS):
+    """
+    Create the managers described by ``rows`` (dicts as returned by
+    ``read_manager_csv``). Existing usernames are skipped. Returns a dict
+    with ``created`` (usernames), ``skipped`` (usernames) and ``errors``
+    ((line, message) pairs).
+    """
+    valid, errors = _validate(rows)
+    usernames = [row['username'] for row in valid]
+    existing = set()
+    for start in range(0, len(usernames), BATCH_SIZE):
+        existing.update(User.objects.filter(username__in=usernames[start:start + BATCH_SIZE]).values_list('username', flat=True))
+    new_rows = [row for row in valid if row['username'] not in existing]
+
+    passwords = _hash_passwords([row['password'] for row in new_rows], workers)
+    users = [
+        User(
+            username=row['username'],
+            email=row['email'],
+            first_name=row['first_name'][:150],
+            last_name=row['last_name'][:150],
+            password=password,
+        )
+        for row, password in zip(new_rows, passwords)
+    ]
+    with transaction.atomic():
+        User.objects.bulk_create(users, batch_size=BATCH_SIZE)
+        if users and users[0].pk is None:
+            # Bases sans RETURNING : relire les identifiants
+            ids = dict(User.objects.filter(username__in=[user.username for user in users]).values_list('username', 'id'))
+            for user in users:
+                user.pk = ids[user.username]
+        ManagerProfile.objects.bulk_create(
+            [
+                ManagerProfile(user_id=user.pk, phone=row['phone'][:20] or None, department=row['department'][:100] or None)
+                for user, row in zip(users, new_rows)
+            ],
+            batch_size=BATCH_SIZE,
+        )
+    return {
+        'created': [user.username for user in users],
+        'skipped': [row['username'] for row in valid if row['username'] in existing],
+        'errors': errors,
+    }
+
+
+BULK_ACTIONS = ('activate', 'deactivate', 'delete', 'department')
+
+
+def _delete_stored_files(uploads):
+    for upload in uploads:
+        upload.file.delete(save=False)
+
+
+def bulk_manager_action(action, user_ids, acting_user, department=''):
+    """
+    Apply ``action`` (one of ``BULK_ACTIONS``) to the given users in one
+    transaction, one UPDATE/DELETE per table. The acting user is never
+    deactivated or deleted, and only a superuser can act on superuser or
+    staff accounts. Deleting a user also removes the stored files of their
+    uploads. Returns the number of accounts affected.
+    """
+    if action not in BULK_ACTIONS:
+        raise ValidationError(f'Action inconnue : "{action}".')
+    ids = set(int(user_id) for user_id in user_ids)
+    if action in ('deactivate', 'delete'):
+        ids.discard(acting_user.pk)
+    if ids and not acting_user.is_superuser:
+        ids = set(User.objects.filter(id__in=ids, is_superuser=False, is_staff=False).values_list('id', flat=True))
+    if not ids:
+        return 0
+    with transaction.atomic():
+        if action == 'delete':
+            # La cascade supprime les fichiers importés de la base, pas leur contenu stocké
+            uploads = list(UploadedExcel.objects.filter(uploaded_by_id__in=ids).only('id', 'file'))
+            _, deleted = User.objects.filter(id__in=ids).delete()
+            affected = deleted.get(User._meta.label, 0)
+            transaction.on_commit(lambda: _delete_stored_files(uploads))
+        else:
+            profiles = ManagerProfile.objects.filter(user_id__in=ids)
+            if action == 'department':
+                affected = profiles.update(department=department.strip()[:100] or None, updated_at=timezone.now())
+            else:
+                affected = profiles.update(is_active=(action == 'activate'), updated_at=timezone.now())
+        # update() n'envoie pas de post_save : invalidation explicite du cache d'authentification
+        transaction.on_commit(lambda: invalidate_auth_users(ids))
+    return affected
@@ -0,0 +1,101 @@
+"""
+Data-quality report of a pointage file.
+
+Built once at ingestion from vectorized masks over the raw rows, stored
+on ``UploadedExcel.quality`` and shown on the file list, so bad source
+rows are reported to the uploader instead of being silently skipped on
+every request.
+"""
+import numpy as np
+import pandas as pd
+
+LONG_SHIFT_SECONDS = 16 * 3600
+SAMPLE_LINES = 20
+
+QUALITY_CHECKS = {
+    'missing_punch': 'Pointage manquant',
+    'unparseable_time': 'Heure illisible',
+    'invalid_date': 'Date absente ou illisible',
+    'out_before_in': 'Sortie avant entrée (poste de nuit ?)',
+    'duplicate': 'Ligne en double',
+    'long_shift': 'Poste de plus de 16 h',
+    'unknown_department': 'Département absent ou inconnu',
+}
+
+
+def _blank(series):
+    return series.isna() | series.astype(str).str.strip().isin(['', 'nan', 'NaT', 'None'])
+
+
+def _issue(mask):
+    """Count and first spreadsheet line numbers (header = line 1) of the rows in ``mask``."""
+    positions = mask.to_numpy().nonzero()[0]
+    return {'count': int(len(positions)), 'lines': [int(p) + 2 for p in positions[:SAMPLE_LINES]]}
+
+
+def row_report(df, cols, seconds_in, seconds_out, dates):
+    """
+    Report of the checks that only need the rows themselves; ``seconds_in``,
+    ``seconds_out`` and ``dates`` are the parsed columns (NaN/NaT when invalid).
+    """
+    missing_in, missing_out = _blank(df[cols['in']]), _blank(df[cols['out']])
+    valid = seconds_in.notna() & seconds_out.notna() & dates.notna()
+    duration = (seconds_out - seconds_in).where(seconds_out >= seconds_in, seconds_out - seconds_in + 86400)
+    keys = [cols[field] for field in ('name', 'date', 'in', 'out')]
+    issues = {
+        'missing_punch': _issue(missing_in | missing_out),
+        'unparseable_time': _issue((~missing_in & seconds_in.isna()) | (~missing_out & seconds_out.isna())),
+        'invalid_date': _issue(dates.isna()),
+        'out_before_in': _issue(valid & (seconds_out < seconds_in)),
+        'duplicate': _issue(df.duplicated(subset=keys, keep='first') & valid),
+        'long_shift': _issue(valid & (duration > LONG_SHIFT_SECONDS)),
+    }
+    return {
+        'rows': int(len(df)),
+        'valid': int(valid.sum()),
+        'has_department': cols['department'] is not None,
+        'issues': issues,
+    }
+
+
+def missing_columns_report(df, cols):
+    """Report of a file lacking some of the required columns: none of its rows is usable."""
+    missing = [field for field in ('date', 'name', 'in', 'out') if cols.get(field) is None]
+    return {'rows': int(len(df)), 'valid': 0, 'has_department': False, 'missing_columns': missing, 'issues': {}}
+
+
+def add_department_check(report, frame, known_keys=None):
+    """
+    Add the ``unknown_department`` check to ``report``: rows of the overtime
+    ``frame`` without department, or with one not in ``known_keys``
+    (normalized names of the declared reference list - usually a typo).
+    Without reference list only rows without department are reported.
+    Files without a department column are not checked.
+    """
+    from .ingestion import normalize_key
+
+    if not report.get('has_department'):
+        return report
+    codes, labels = pd.factorize(frame['department'])
+    # Une valeur par libellé distinct, plus True en dernier pour le code -1 (département vide)
+    unknown = np.array([bool(known_keys) and normalize_key(label) not in known_keys for label in labels] + [True])
+    positions = frame.index.to_numpy()[unknown[codes]]
+    report = dict(report, issues=dict(report['issues']))
+    report['issues']['unknown_department'] = {
+        'count': int(len(positions)),
+        'lines': [int(p) + 2 for p in positions[:SAMPLE_LINES]],
+    }
+    return report
+
+
+def issue_list(report):
+    """``[(label, count, lines)]`` of the failed checks, for display."""
+    if not report:
+        return []
+    if report.get('missing_columns'):
+        return [('Colonnes manquantes : ' + ', '.join(report['missing_columns']), report['rows'], [])]
+    return [
+        (label, report['issues'][check]['count'], report['issues'][check]['lines'])
+        for check, label in QUALITY_CHECKS.items()
+        if report['issues'].get(check, {}).get('count')
+    ]
@@ -0,0 +1,219 @@
+"""
+Reading of the pointage files into DataFrames, whatever their format.
+
+Excel workbooks are read by one of the ``EXCEL_BACKENDS`` (pandas
+engines): openpyxl (opened read-only, rows streamed), xlrd for legacy
+``.xls`` and, when ``python-calamine`` is installed, the Rust calamine
+reader for both. ``manage.py calibrate_readers`` benchmarks them on real
+uploads and records the fastest per format in
+``EXCEL_READER_CALIBRATION_FILE``; without calibration the pandas
+defaults are used.
+
+CSV exports of the clock system are read with pandas' pyarrow engine
+(multithreaded) when pyarrow is installed, with the C engine otherwise;
+Parquet and Arrow/Feather files require pyarrow. CSV columns are kept as text, which is what the
+column detection and ``compute_overtime_frame`` expect, so a CSV export
+gives the same overtime as the workbook it was made from.
+"""
+import codecs
+import csv
+import importlib.util
+import json
+import os
+import time
+from functools import lru_cache
+
+import pandas as pd
+from django.conf import settings
+
+# Try to import pyarrow, but make it optional
+try:
+    import pyarrow  # noqa: F401
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+EXCEL_EXTENSIONS = ('.xlsx', '.xls')
+CSV_EXTENSIONS = ('.csv',)
+ARROW_EXTENSIONS = ('.parquet', '.arrow', '.feather')
+SUPPORTED_EXTENSIONS = EXCEL_EXTENSIONS + CSV_EXTENSIONS + ARROW_EXTENSIONS
+CSV_SAMPLE_SIZE = 64 * 1024
+CSV_DELIMITERS = ',;\t|'
+
+EXCEL_BACKENDS = {
+    # moteur pandas: (extensions lues, module requis)
+    'calamine': (('.xlsx', '.xls'), 'python_calamine'),
+    'openpyxl': (('.xlsx',), 'openpyxl'),
+    'xlrd': (('.xls',), 'xlrd'),
+}
+DEFAULT_EXCEL_BACKENDS = {'.xlsx': 'openpyxl', '.xls': 'xlrd'}
+
+
+def file_extension(file, name=None):
+    """Lower-case extension of ``name``, else of the path or of the file object's ``name``."""
+    name = name or (os.fspath(file) if isinstance(file, (str, os.PathLike)) else getattr(file, 'name', ''))
+    return os.path.splitext(str(name))[1].lower()
+
+
+def _sample(file):
+    if isinstance(file, (str, os.PathLike)):
+        with open(file, 'rb') as handle:
+            return handle.read(CSV_SAMPLE_SIZE)
+    file.seek(0)
+    sample = file.read(CSV_SAMPLE_SIZE)
+    file.seek(0)
+    return sample
+
+
+def csv_dialect(file):
+    """``(separator, encoding)`` of a CSV export: UTF-8 (with or without BOM) else cp1252."""
+    sample = _sample(file)
+    try:
+        # Décodage incrémental : l'échantillon peut couper un caractère multi-octets
+        text = codecs.getincrementaldecoder('utf-8-sig')().decode(sample, final=False)
+        encoding = 'utf-8'
+    except UnicodeDecodeError:
+        text = sample.decode('cp1252', errors='replace')
+        encoding = 'cp1252'
+    try:
+        separator = csv.Sniffer().sniff(text.split('\n', 1)[0], delimiters=CSV_DELIMITERS).delimiter
+    except csv.Error:
+        separator = ','
+    return separator, encoding
+
+
+def read_csv(file, nrows=None):
+    separator, encoding = csv_dialect(file)
+    options = {'sep': separator, 'encoding': encoding, 'dtype': str}
+    # Le moteur pyarrow ne sait pas s'arrêter après nrows lignes
+    if PYARROW_AVAILABLE and nrows is None:
+        options['engine'] = 'pyarrow'
+    else:
+        options['nrows'] = nrows
+    return pd.read_csv(file, **options)
+
+
+@lru_cache(maxsize=None)
+def _backend_installed(name):
+    if name == 'calamine' and tuple(int(part) for part in pd.__version__.split('.')[:2]) < (2, 2):
+        return False  # moteur calamine ajouté dans pandas 2.2
+    return importlib.util.find_spec(EXCEL_BACKENDS[name][1]) is not None
+
+
+def available_backends(extension):
+    """Installed backends able to read ``extension``."""
+    return [
+        name for name, (extensions, _) in EXCEL_BACKENDS.items()
+        if extension in extensions and _backend_installed(name)
+    ]
+
+
+def calibration_file():
+    return getattr(settings, 'EXCEL_READER_CALIBRATION_FILE', os.path.join(settings.BASE_DIR, 'reader_calibration.json'))
+
+
+_calibration = {'mtime': None, 'data': {}}
+
+
+def calibration():
+    """Content of the calibration file, reloaded when the file changes; {} when there is none."""
+    path = calibration_file()
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return {}
+    if mtime != _calibration['mtime']:
+        try:
+            with open(path, encoding='utf-8') as f:
+                _calibration['data'] = json.load(f)
+        except (OSError, ValueError):
+            _calibration['data'] = {}
+        _calibration['mtime'] = mtime
+    return _calibration['data']
+
+
+def excel_backend(extension):
+    """Calibrated backend for ``extension`` when still installed, else the pandas default."""
+    chosen = calibration().get('formats', {}).get(extension, {}).get('backend')
+    if chosen in available_backends(extension):
+        return chosen
+    return DEFAULT_EXCEL_BACKENDS.get(extension)
+
+
+def read_excel(file, extension, nrows=None):
+    backend = excel_backend(extension)
+    try:
+        return pd.read_excel(file, engine=backend, nrows=nrows)
+    except Exception:
+        default = DEFAULT_EXCEL_BACKENDS.get(extension)
+        if backend == default:
+            raise
+        # Classeur que le moteur calibré ne sait pas lire : repli sur le moteur par défaut
+        if hasattr(file, 'seek'):
+            file.seek(0)
+        return pd.read_excel(file, engine=default, nrows=nrows)
+
+
+def benchmark(paths, extension, repeat=3):
+    """
+    Time every installed backend on ``paths`` (best of ``repeat`` reads per
+    file). Returns ``{backend: seconds or None}``; None marks a backend that
+    failed or parsed a value differently from the default backend. Files
+    the default backend cannot read are ignored.
+    """
+    default = DEFAULT_EXCEL_BACKENDS[extension]
+    references = {}
+    for path in paths:
+        try:
+            references[path] = pd.read_excel(path, engine=default)
+        except Exception:
+            continue  # fichier illisible : il ne départage rien
+    timings = {}
+    for backend in available_backends(extension):
+        total = 0.0
+        for path in references:
+            best = None
+            for _ in range(repeat):
+                started = time.perf_counter()
+                try:
+                    df = pd.read_excel(path, engine=backend)
+                except Exception:
+                    df = None
+                    break
+                elapsed = time.perf_counter() - started
+                best = elapsed if best is None else min(best, elapsed)
+            if df is None or not df.equals(references[path]):
+                total = None
+                break
+            total += best
+        timings[backend] = total
+    return timings
+
+
+def save_calibration(formats):
+    """Write ``{extension: {'backend': ..., 'timings': ..., 'files': ...}}`` to the calibration file."""
+    path = calibration_file()
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'calibrated_at': time.strftime('%Y-%m-%dT%H:%M:%S'), 'formats': formats}, f, indent=2)
+    return path
+
+
+def read_table(file, name=None, nrows=None):
+    """
+    Read a pointage file (path or binary file object) into a DataFrame,
+    the format being given by the extension of ``name`` or of the file.
+    Raises ``ValueError`` for an unsupported format.
+    """
+    extension = file_extension(file, name)
+    if extension in CSV_EXTENSIONS:
+        return read_csv(file, nrows=nrows)
+    if extension in ARROW_EXTENSIONS:
+        if not PYARROW_AVAILABLE:
+            raise ValueError(f'Reading {extension} files requires pyarrow: pip install pyarrow')
+        df = pd.read_parquet(file) if extension == '.parquet' else pd.read_feather(file)
+        return df if nrows is None else df.head(nrows)
+    if extension in EXCEL_EXTENSIONS:
+        return read_excel(file, extension, nrows=nrows)
+    if not extension:
+        return pd.read_excel(file, nrows=nrows)
+    raise ValueError(f'Unsupported file format "{extension}".')
@@ -0,0 +1,116 @@
+"""
+Full rebuild of the stored time entries from the uploaded workbooks.
+
+Used by the ``rebuild_overtime`` command. Workbooks are parsed in a
+process pool and their rows written to a shadow table, outside of any
+transaction, while the dashboards keep reading ``pointage_timeentry``.
+The shadow rows then replace the live ones in one short transaction
+(``DELETE`` + ``INSERT ... SELECT``), so readers see either the old or the
+new numbers, never a half-rebuilt dataset.
+
+Stored rows only keep the punches to the minute, which is not enough to
+recompute overtime the way a parse does (seconds count in the rounding):
+files whose workbook is no longer on disk keep their rows unchanged.
+"""
+import os
+
+from django.apps.registry import Apps
+from django.db import connection, models, transaction
+from django.utils import timezone
+
+from .models import TimeEntry, UploadedExcel
+
+SHADOW_TABLE = 'pointage_timeentry_shadow'
+ENTRY_COLUMNS = ('uploaded_file_id', 'employee_id', 'department_id', 'date', 'minute_in', 'minute_out', 'heures_sup')
+STAGE_BATCH_SIZE = 2000
+DELETE_CHUNK_SIZE = 500
+
+
+def shadow_model():
+    """Unmanaged copy of ``TimeEntry`` without foreign keys nor indexes, in its own app registry."""
+    class Meta:
+        app_label = 'pointage'
+        db_table = SHADOW_TABLE
+        apps = Apps()
+
+    return type('TimeEntryShadow', (models.Model,), {
+        '__module__': __name__,
+        'Meta': Meta,
+        'uploaded_file_id': models.BigIntegerField(),
+        'employee_id': models.BigIntegerField(),
+        'department_id': models.BigIntegerField(null=True),
+        'date': models.DateField(),
+        'minute_in': models.SmallIntegerField(),
+        'minute_out': models.SmallIntegerField(),
+        'heures_sup': models.SmallIntegerField(),
+    })
+
+
+def source_path(uploaded_file):
+    """Path of the workbook of ``uploaded_file`` when it is still on disk, else None."""
+    try:
+        path = uploaded_file.file.path
+    except (ValueError, NotImplementedError):
+        return None
+    return path if os.path.isfile(path) else None
+
+
+def create_shadow_table(model):
+    """(Re)create the shadow table; a leftover of an interrupted rebuild is dropped first."""
+    drop_shadow_table(model)
+    with connection.schema_editor() as editor:
+        editor.create_model(model)
+
+
+def drop_shadow_table(model):
+    if SHADOW_TABLE in connection.introspection.table_names():
+        with connection.schema_editor() as editor:
+            editor.delete_model(model)
+
+
+def stage_rows(model, uploaded_file_id, rows):
+    """Write the ``entry_rows`` of one file to the shadow table; returns the row count."""
+    objects = (
+        model(
+            uploaded_file_id=uploaded_file_id,
+            employee_id=employee_id,
+            department_id=department_id,
+            date=day,
+            minute_in=minute_in,
+            minute_out=minute_out,
+            heures_sup=heures_sup,
+        )
+        for employee_id, department_id, day, minute_in, minute_out, heures_sup in rows
+    )
+    return len(model.objects.bulk_create(objects, batch_size=STAGE_BATCH_SIZE))
+
+
+def swap_in(file_ids, metadata=None):
+    """
+    Replace the live entries of ``file_ids`` with the shadow rows in one
+    transaction, record the ``file_metadata`` of each file (``{file id:
+    {field: value}}``); the new ``ingested_at`` changes the dataset version
+    of the cached statistics. Returns the number of rows swapped in.
+    """
+    quote = connection.ops.quote_name
+    columns = ', '.join(quote(column) for column in ENTRY_COLUMNS)
+    file_ids = list(file_ids)
+    with transaction.atomic():
+        for start in range(0, len(file_ids), DELETE_CHUNK_SIZE):
+            TimeEntry.objects.filter(uploaded_file_id__in=file_ids[start:start + DELETE_CHUNK_SIZE]).delete()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {quote(TimeEntry._meta.db_table)} ({columns}) '
+                f'SELECT {columns} FROM {quote(SHADOW_TABLE)} ORDER BY {quote("id")}'
+            )
+            swapped = cursor.rowcount
+        now = timezone.now()
+        for start in range(0, len(file_ids), DELETE_CHUNK_SIZE):
+            UploadedExcel.objects.filter(id__in=file_ids[start:start + DELETE_CHUNK_SIZE]).update(ingested_at=now)
+        by_fields = {}
+        for file_id, values in (metadata or {}).items():
+            by_fields.setdefault(tuple(sorted(values)), []).append(UploadedExcel(id=file_id, **values))
+        for fields, objects in by_fields.items():
+            if fields:
+                UploadedExcel.objects.bulk_update(objects, fields, batch_size=DELETE_CHUNK_SIZE)
+    return swapped
@@ -0,0 +1,214 @@
+"""
+Compact in-memory store for overtime rows.
+
+Stored ``TimeEntry`` rows with overtime are kept in a NumPy structured
+array: employee and department are integer codes into shared label arrays
+(which also carry the database ids), days are counted from 1970-01-01 and
+punch times are minutes since midnight. Filtering and aggregation run on
+the arrays; the templates iterate over lightweight ``OvertimeRecord``
+objects built on demand.
+"""
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from .overtime import WEEKEND_DAYS
+
+ROW_DTYPE = np.dtype([
+    ('emp', np.int32),         # index dans OvertimeStore.names
+    ('dept', np.int32),        # index dans OvertimeStore.departments, -1 si inconnu
+    ('day', np.int32),         # jours depuis 1970-01-01
+    ('minute_in', np.int16),   # minutes depuis minuit
+    ('minute_out', np.int16),
+    ('heures_sup', np.int16),
+])
+
+EPOCH = date(1970, 1, 1)
+UNKNOWN_DEPARTMENT = 'Non spécifié'
+
+
+def _format_minutes(minutes):
+    return f'{minutes // 60:02d}:{minutes % 60:02d}'
+
+
+class OvertimeRecord:
+    """One overtime row as seen by the templates."""
+    __slots__ = ('nom', 'department', 'date', 'heure_in', 'heure_out', 'heures_sup')
+
+    def __init__(self, nom, department, date, heure_in, heure_out, heures_sup):
+        self.nom = nom
+        self.department = department
+        self.date = date
+        self.heure_in = heure_in
+        self.heure_out = heure_out
+        self.heures_sup = heures_sup
+
+    @property
+    def weekend(self):
+        return self.date.weekday() in WEEKEND_DAYS
+
+
+class OvertimeStore:
+    """
+    Overtime rows held in a structured array plus the label tables for
+    employee and department codes. ``employee_ids`` / ``department_ids``
+    give the database id of each code. ``filter`` returns a new store
+    sharing the same label tables.
+    """
+    __slots__ = ('rows', 'names', 'departments', 'employee_ids', 'department_ids')
+
+    def __init__(self, rows=None, names=None, departments=None, employee_ids=None, department_ids=None):
+        self.rows = rows if rows is not None else np.empty(0, dtype=ROW_DTYPE)
+        self.names = names if names is not None else np.empty(0, dtype=object)
+        self.departments = departments if departments is not None else np.empty(0, dtype=object)
+        self.employee_ids = employee_ids if employee_ids is not None else np.empty(0, dtype=np.int64)
+        self.department_ids = department_ids if department_ids is not None else np.empty(0, dtype=np.int64)
+
+    @classmethod
+    def from_entries(cls, entries):
+        """Build a store from the overtime rows of a ``TimeEntry`` queryset."""
+        entries = entries.filter(heures_sup__gt=0)
+        values = list(entries.order_by('id').values_list(
+            'employee_id', 'department_id', 'date', 'minute_in', 'minute_out', 'heures_sup',
+        ))
+        if not values:
+            return cls()
+        emp_ids, dept_ids, dates, minute_in, minute_out, heures_sup = zip(*values)
+
+        employee_ids, emp_codes = np.unique(np.array(emp_ids, dtype=np.int64), return_inverse=True)
+        dept_ids = np.array([-1 if dept is None else dept for dept in dept_ids], dtype=np.int64)
+        department_ids, dept_codes = np.unique(dept_ids, return_inverse=True)
+        if len(department_ids) and department_ids[0] == -1:
+            department_ids, dept_codes = department_ids[1:], dept_codes - 1
+
+        employee_names = dict(entries.values_list('employee_id', 'employee__name').distinct())
+        department_names = dict(entries.filter(department__isnull=False).values_list('department_id', 'department__name').distinct())
+
+        rows = np.empty(len(values), dtype=ROW_DTYPE)
+        rows['emp'] = emp_codes
+        rows['dept'] = dept_codes
+        rows['day'] = np.array(dates, dtype='datetime64[D]').astype(np.int64)
+        rows['minute_in'] = minute_in
+        rows['minute_out'] = minute_out
+        rows['heures_sup'] = heures_sup
+        return cls(
+            rows,
+            np.array([employee_names[i] for i in employee_ids.tolist()], dtype=object),
+            np.array([department_names[i] for i in department_ids.tolist()], dtype=object),
+            employee_ids,
+            department_ids,
+        )
+
+    def _with_rows(self, rows):
+        return OvertimeStore(rows, self.names, self.departments, self.employee_ids, self.department_ids)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __iter__(self):
+        names, departments = self.names, self.departments
+        for emp, dept, day, minute_in, minute_out, heures_sup in self.rows.tolist():
+            yield OvertimeRecord(
+                names[emp],
+                departments[dept] if dept >= 0 else None,
+                EPOCH + timedelta(days=day),
+                _format_minutes(minute_in),
+                _format_minutes(minute_out),
+                heures_sup,
+            )
+
+    @staticmethod
+    def _code(ids, wanted):
+        """Code of database id ``wanted`` in the sorted ``ids`` table, -2 if absent (matches no row)."""
+        position = int(np.searchsorted(ids, wanted))
+        return position if position < len(ids) and ids[position] == wanted else -2
+
+    def _months(self):
+        return self.rows['day'].astype('datetime64[D]').astype('datetime64[M]')
+
+    def filter(self, employee=None, department=None, year=None, month=None):
+        """Return the rows matching every given criterion; ``employee``/``department`` are ids."""
+        mask = np.ones(len(self.rows), dtype=bool)
+        if employee is not None:
+            mask &= self.rows['emp'] == self._code(self.employee_ids, employee)
+        if department is not None:
+            mask &= self.rows['dept'] == self._code(self.department_ids, department)
+        if year is not None and month is not None:
+            mask &= self._months() == np.datetime64(f'{year:04d}-{month:02d}', 'M')
+        return self._with_rows(self.rows[mask])
+
+    def to_frame(self):
+        """Columns ``nom``, ``department``, ``date`` and ``heures_sup``, as used by the cap alerts."""
+        dept_labels = np.append(self.departments, None)  # le code -1 pointe sur None
+        return pd.DataFrame({
+            'nom': self.names[self.rows['emp']],
+            'department': dept_labels[self.rows['dept']],
+            'date': self.rows['day'].astype('datetime64[D]').astype('datetime64[ns]'),
+            'heures_sup': self.rows['heures_sup'].astype(int),
+        })
+
+    def total_heures_sup(self):
+        return int(self.rows['heures_sup'].sum(dtype=np.int64))
+
+    def department_choices(self):
+        """(id, name) of the known departments present in the store, sorted by name."""
+        codes = np.unique(self.rows['dept'])
+        codes = codes[codes >= 0]
+        return sorted(zip(self.department_ids[codes].tolist(), self.departments[codes].tolist()), key=lambda item: item[1])
+
+    def available_months(self):
+        """(year, month) pairs present in the store, most recent first."""
+        months = np.unique(self._months())[::-1]
+        return [(int(str(m)[:4]), int(str(m)[5:7])) for m in months]
+
+    def totals_by_employee(self):
+        """
+        Per-employee totals as a list of dicts (nom, total_heures_sup,
+        nb_jours, department), in order of first appearance. ``nb_jours``
+        counts distinct work-days; the department is the one of the
+        employee's first row.
+        """
+        emp = self.rows['emp']
+        codes, first_index = np.unique(emp, return_index=True)
+        order = np.argsort(first_index, kind='stable')
+        codes, first_index = codes[order], first_index[order]
+        hours = np.bincount(emp, weights=self.rows['heures_sup'], minlength=len(self.names))
+        # Une journée peut s'étaler sur plusieurs paires : compter les couples (employé, jour) distincts
+        day = self.rows['day'].astype(np.int64)
+        if len(day):
+            day = day - day.min()
+            pairs = np.unique(emp.astype(np.int64) * (int(day.max()) + 1) + day)
+            days = np.bincount(pairs // (int(day.max()) + 1), minlength=len(self.names))
+        else:
+            days = np.zeros(len(self.names), dtype=np.int64)
+        first_dept = self.rows['dept'][first_index]
+        return [
+            {
+                'nom': self.names[code],
+                'total_heures_sup': int(hours[code]),
+                'nb_jours': int(days[code]),
+                'department': self.departments[dept] if dept >= 0 else UNKNOWN_DEPARTMENT,
+            }
+            for code, dept in zip(codes.tolist(), first_dept.tolist())
+        ]
+
+    def totals_by_department(self):
+        """Overtime per department (unknown ones grouped), highest first."""
+        dept = self.rows['dept']
+        hours = np.bincount(dept + 1, weights=self.rows['heures_sup'], minlength=len(self.departments) + 1)
+        present = np.bincount(dept + 1, minlength=len(self.departments) + 1) > 0
+        labels = [UNKNOWN_DEPARTMENT] + self.departments.tolist()
+        totals = {}
+        for code in np.flatnonzero(present).tolist():
+            totals[labels[code]] = totals.get(labels[code], 0) + int(hours[code])
+        return dict(sorted(totals.items(), key=lambda item: item[1], reverse=True))
+
+    def totals_by_day(self):
+        """(YYYY-MM-DD, hours) pairs sorted by date."""
+        days, inverse = np.unique(self.rows['day'], return_inverse=True)
+        hours = np.bincount(inverse, weights=self.rows['heures_sup'], minlength=len(days))
+        return [
+            ((EPOCH + timedelta(days=day)).strftime('%Y-%m-%d'), int(total))
+            for day, total in zip(days.tolist(), hours.tolist())
+        ]
@@ -0,0 +1,168 @@
+"""
+Schema fingerprint of a pointage file.
+
+A clock export uses the same columns and the same date/time format for
+all of its rows. ``inspect_schema`` samples the DataFrame once to find
+them; the fingerprint (JSON, stored on ``UploadedExcel.schema``) then
+drives one vectorized conversion per column. Cells the fingerprint does
+not cover - a file mixing several formats - go through the historical
+format-by-format fallback, on those cells only.
+"""
+from datetime import datetime, time, timedelta
+
+import numpy as np
+import pandas as pd
+
+SCHEMA_VERSION = 1
+SAMPLE_SIZE = 200
+DATE_FORMATS = ("%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y", "%Y/%m/%d", "%m/%d/%Y", "%Y-%m-%d %H:%M:%S")
+TIME_FORMATS = ("%H:%M:%S", "%H:%M", "%H:%M:%S.%f")
+SECONDS_PER_DAY = 86400
+
+
+def detect_columns(df):
+    """Return the source column for each logical field (or None when missing)."""
+    mapping = {str(col).lower().strip(): col for col in df.columns}
+    return {
+        'name': mapping.get('name'),
+        'in': mapping.get('in'),
+        'out': mapping.get('out'),
+        'date': mapping.get('date'),
+        'department': mapping.get('département') or mapping.get('department'),
+    }
+
+
+def _value_kind(value):
+    # pd.Timestamp / pd.Timedelta héritent de datetime / timedelta
+    if isinstance(value, datetime):
+        return 'datetime'
+    if isinstance(value, time):
+        return 'time'
+    if isinstance(value, timedelta):
+        return 'timedelta'
+    if isinstance(value, str):
+        return 'text'
+    return 'other'
+
+
+def _infer_format(text, formats):
+    """First format parsing every sampled value, else the one parsing most of them (None if none does)."""
+    best, best_count = None, 0
+    for fmt in formats:
+        count = int(pd.to_datetime(text, format=fmt, errors='coerce').notna().sum())
+        if count == len(text):
+            return fmt
+        if count > best_count:
+            best, best_count = fmt, count
+    return best
+
+
+def inspect_column(series, formats):
+    """``{'kind': ..., 'format': ...}`` for a column, from its first ``SAMPLE_SIZE`` non-empty cells."""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return {'kind': 'datetime', 'format': None}
+    if pd.api.types.is_timedelta64_dtype(series):
+        return {'kind': 'timedelta', 'format': None}
+    sample = series.dropna().head(SAMPLE_SIZE)
+    if sample.empty:
+        return {'kind': None, 'format': None}
+    kinds = set(sample.map(_value_kind))
+    kind = kinds.pop() if len(kinds) == 1 else 'mixed'
+    if kind != 'text':
+        return {'kind': kind, 'format': None}
+    return {'kind': kind, 'format': _infer_format(sample.str.strip(), formats)}
+
+
+def inspect_schema(df):
+    """Column mapping and date/time formats of a raw pointage DataFrame, as a JSON-serializable dict."""
+    columns = detect_columns(df)
+    schema = {
+        'version': SCHEMA_VERSION,
+        'columns': {field: None if col is None else str(col) for field, col in columns.items()},
+    }
+    if columns['date'] is not None:
+        schema['date'] = inspect_column(df[columns['date']], DATE_FORMATS)
+    for field in ('in', 'out'):
+        if columns[field] is not None:
+            schema[field] = inspect_column(df[columns[field]], TIME_FORMATS)
+    return schema
+
+
+def schema_columns(df, schema):
+    """
+    Source columns of ``df`` for each field of ``schema``, or None when the
+    fingerprint is outdated or does not describe ``df``.
+    """
+    if not schema or schema.get('version') != SCHEMA_VERSION:
+        return None
+    by_name = {str(col): col for col in df.columns}
+    columns = {}
+    for field, name in schema.get('columns', {}).items():
+        if name is not None and name not in by_name:
+            return None
+        columns[field] = None if name is None else by_name[name]
+    return columns
+
+
+def _clock_seconds(parsed):
+    return parsed.dt.hour * 3600 + parsed.dt.minute * 60 + parsed.dt.second
+
+
+def _fallback_times(text):
+    """``HH:MM`` / ``HH:MM:SS`` strings, fractions of a second ignored, tried row by row length."""
+    text = text.str.replace(r'^(\d{1,2}:\d{2}:\d{2})\.\d+$', r'\1', regex=True)
+    short = text.str.len() <= 5
+    parsed = pd.Series(pd.NaT, index=text.index, dtype='datetime64[ns]')
+    if short.any():
+        parsed[short] = pd.to_datetime(text[short], format='%H:%M', errors='coerce')
+    if (~short).any():
+        parsed[~short] = pd.to_datetime(text[~short], format='%H:%M:%S', errors='coerce')
+    return _clock_seconds(parsed)
+
+
+def parse_times(series, spec=None):
+    """Seconds since midnight of each cell (NaN if invalid), converted as described by ``spec``."""
+    kind, fmt = (spec or {}).get('kind'), (spec or {}).get('format')
+    if kind in ('time', 'timedelta'):
+        # str(time) donne "HH:MM:SS" ou "HH:MM:SS.ffffff" ; les fractions sont tronquées
+        values = series if kind == 'timedelta' else series.astype(str).where(series.notna())
+        seconds = np.floor(pd.to_timedelta(values, errors='coerce').dt.total_seconds())
+        seconds = seconds.where(seconds < SECONDS_PER_DAY)
+    elif kind == 'datetime':
+        seconds = _clock_seconds(pd.to_datetime(series, errors='coerce'))
+    elif kind == 'text' and fmt:
+        seconds = _clock_seconds(pd.to_datetime(series.astype(str).str.strip(), format=fmt, errors='coerce'))
+    else:
+        return _fallback_times(series.astype(str).str.strip())
+    seconds = seconds.astype(float)
+    left = seconds.isna() & series.notna()
+    if left.any():
+        seconds[left] = _fallback_times(series[left].astype(str).str.strip())
+    return seconds
+
+
+def _fallback_dates(series):
+    """Datetime cells are kept as-is, anything else is tried against ``DATE_FORMATS`` in order."""
+    is_datetime = series.map(lambda value: isinstance(value, datetime)).astype(bool)
+    parsed = pd.to_datetime(series.where(is_datetime), errors='coerce')
+    text = series.astype(str)
+    for fmt in DATE_FORMATS:
+        missing = parsed.isna() & ~is_datetime
+        if not missing.any():
+            break
+        parsed[missing] = pd.to_datetime(text[missing], format=fmt, errors='coerce')
+    return parsed
+
+
+def parse_dates(series, spec=None):
+    """Dates of each cell (NaT if invalid), converted with the single format of ``spec`` when known."""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return pd.to_datetime(series)
+    kind, fmt = (spec or {}).get('kind'), (spec or {}).get('format')
+    if kind != 'text' or not fmt:
+        return _fallback_dates(series)
+    parsed = pd.to_datetime(series.astype(str).str.strip(), format=fmt, errors='coerce')
+    left = parsed.isna() & series.notna()
+    if left.any():
+        parsed[left] = _fallback_dates(series[left])
+    return parsed
@@ -0,0 +1,144 @@
+"""
+Prefix search over the employee dimension, used by the typeahead filters,
+and the indexed search of the manager list.
+
+The index is a sorted list of normalized search keys held in process
+memory; a lookup is two ``bisect`` calls. Every word of a name is indexed,
+so "jean" finds "DUPONT Jean". The index is rebuilt when the employee
+table changes (new ids or a different row count).
+"""
+from bisect import bisect_left
+from itertools import islice
+from threading import Lock
+
+from django.db import connections
+from django.db.models import Count, Max, Q
+from django.db.models.expressions import RawSQL
+
+from .ingestion import normalize_key
+from .models import Employee, TimeEntry
+
+DEFAULT_LIMIT = 10
+# Candidats examinés par requête de filtrage sur le périmètre utilisateur
+CANDIDATES_CHUNK = 200
+
+
+class EmployeeIndex:
+    """Sorted (key, name, id) entries with one entry per word of each name."""
+
+    def __init__(self, employees):
+        entries = []
+        for employee_id, name, key in employees:
+            words = key.split(' ')
+            for position in range(len(words)):
+                entries.append((' '.join(words[position:]), name, employee_id))
+        entries.sort()
+        self.keys = [entry[0] for entry in entries]
+        self.entries = entries
+
+    def matches(self, query):
+        """Yield the (id, name) pairs whose name has a word starting with ``query``, in key order."""
+        prefix = normalize_key(query)
+        if not prefix:
+            return
+        seen = set()
+        position = bisect_left(self.keys, prefix)
+        while position < len(self.keys) and self.keys[position].startswith(prefix):
+            _, name, employee_id = self.entries[position]
+            if employee_id not in seen:
+                seen.add(employee_id)
+                yield employee_id, name
+            position += 1
+
+    def search(self, query, limit=DEFAULT_LIMIT):
+        """Return up to ``limit`` (id, name) pairs whose name has a word starting with ``query``."""
+        return list(islice(self.matches(query), limit))
+
+
+_index = None
+_index_signature = None
+_index_lock = Lock()
+
+
+def _signature():
+    return tuple(Employee.objects.aggregate(count=Count('id'), last=Max('id')).values())
+
+
+def employee_index():
+    """Process-wide index, rebuilt when employees were added or removed."""
+    global _index, _index_signature
+    signature = _signature()
+    if _index is None or signature != _index_signature:
+        with _index_lock:
+            if _index is None or signature != _index_signature:
+                _index = EmployeeIndex(Employee.objects.values_list('id', 'name', 'key').iterator())
+                _index_signature = signature
+    return _index
+
+
+def search_employees(query, limit=DEFAULT_LIMIT, visible_files=None):
+    """
+    Typeahead lookup. When ``visible_files`` (a queryset of UploadedExcel)
+    is given, only employees appearing in those files are returned.
+    """
+    if visible_files is None:
+        return employee_index().search(query, limit)
+    # Candidats filtrés par paquets jusqu'à avoir ``limit`` employés visibles
+    matches = employee_index().matches(query)
+    results = []
+    while len(results) < limit:
+        candidates = list(islice(matches, CANDIDATES_CHUNK))
+        if not candidates:
+            break
+        visible = set(
+            TimeEntry.objects.filter(
+                uploaded_file__in=visible_files,
+                employee_id__in=[employee_id for employee_id, _ in candidates],
+            ).values_list('employee_id', flat=True).distinct()
+        )
+        results.extend(candidate for candidate in candidates if candidate[0] in visible)
+    return results[:limit]
+
+
+# Recherche dans la liste des managers -------------------------------------
+
+MANAGER_SEARCH_TABLE = 'pointage_manager_search'
+# Le tokenizer trigram ne sait pas chercher moins de trois caractères
+MIN_TRIGRAM_LENGTH = 3
+
+_fts_available = {}
+
+
+def _manager_fts_available(connection):
+    """Whether the SQLite FTS5 table of migration 0004 exists on ``connection``."""
+    if connection.vendor != 'sqlite':
+        return False
+    if connection.alias not in _fts_available:
+        _fts_available[connection.alias] = MANAGER_SEARCH_TABLE in connection.introspection.table_names()
+    return _fts_available[connection.alias]
+
+
+def search_managers(users, query):
+    """
+    Filter a ``User`` queryset on username, names, email and profile
+    department. Uses the FTS5 trigram table on SQLite; elsewhere the
+    ``icontains`` lookups are served by the pg_trgm indexes (PostgreSQL).
+    """
+    terms = query.split()
+    if not terms:
+        return users
+    connection = connections[users.db]
+    if _manager_fts_available(connection) and all(len(term) >= MIN_TRIGRAM_LENGTH for term in terms):
+        match = ' AND '.join('"{}"'.format(term.replace('"', '""')) for term in terms)
+        return users.filter(id__in=RawSQL(
+            f'SELECT rowid FROM {MANAGER_SEARCH_TABLE} WHERE {MANAGER_SEARCH_TABLE} MATCH %s', [match],
+        ))
+    for term in terms:
+        users = users.filter(
+            Q(username__icontains=term) |
+            Q(first_name__icontains=term) |
+            Q(last_name__icontains=term) |
+            Q(email__icontains=term) |
+            Q(managerprofile__department__icontains=term)
+        )
+    return users
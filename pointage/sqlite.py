@@ -0,0 +1,36 @@
+"""
+SQLite performance profile.
+
+``apply_pragmas`` is connected to ``connection_created`` (see ``apps.py``)
+and runs the ``SQLITE_PRAGMAS`` setting on every new SQLite connection.
+WAL lets dashboard reads proceed while an import writes; the other pragmas
+trade a little durability (``synchronous=NORMAL`` is still crash-safe with
+WAL) and memory for fewer fsyncs and disk reads.
+"""
+from django.conf import settings
+
+# Pragmas acceptées, pour ne jamais formater autre chose qu'un nom connu dans le SQL
+KNOWN_PRAGMAS = ('journal_mode', 'synchronous', 'mmap_size', 'cache_size', 'busy_timeout', 'temp_store', 'wal_autocheckpoint')
+
+
+def apply_pragmas(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', None) or {}
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            if name not in KNOWN_PRAGMAS:
+                raise ValueError(f'Unsupported SQLite pragma in SQLITE_PRAGMAS: {name}')
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def optimize(connection, vacuum=False):
+    """Refresh the query planner statistics, optionally rebuild the file. Returns the statements run."""
+    statements = ['PRAGMA optimize', 'ANALYZE']
+    if vacuum:
+        # VACUUM ne peut pas s'exécuter dans une transaction ; le checkpoint vide le WAL avant
+        statements += ['PRAGMA wal_checkpoint(TRUNCATE)', 'VACUUM']
+    with connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+    return statements
@@ -0,0 +1,73 @@
+// Champ de recherche d'employé avec suggestions (API /api/employees/search/).
+// Le champ visible contient le nom, le champ caché l'identifiant envoyé au serveur.
+function initEmployeeTypeahead(input, hidden, url, onSelect) {
+    if (!input || !hidden) {
+        return;
+    }
+    const menu = document.createElement('div');
+    menu.className = 'dropdown-menu w-100';
+    menu.style.maxHeight = '260px';
+    menu.style.overflowY = 'auto';
+    input.parentNode.style.position = 'relative';
+    input.parentNode.appendChild(menu);
+    input.setAttribute('autocomplete', 'off');
+
+    let timer = null;
+    let controller = null;
+
+    function choose(id, name) {
+        input.value = name;
+        hidden.value = id;
+        menu.classList.remove('show');
+        if (onSelect) {
+            onSelect(id, name);
+        }
+    }
+
+    function render(results) {
+        menu.innerHTML = '';
+        results.forEach(function(result) {
+            const item = document.createElement('button');
+            item.type = 'button';
+            item.className = 'dropdown-item';
+            item.textContent = result.name;
+            item.addEventListener('mousedown', function(event) {
+                event.preventDefault();
+                choose(result.id, result.name);
+            });
+            menu.appendChild(item);
+        });
+        menu.classList.toggle('show', results.length > 0);
+    }
+
+    input.addEventListener('input', function() {
+        hidden.value = '';
+        clearTimeout(timer);
+        const query = input.value.trim();
+        if (!query) {
+            render([]);
+            if (onSelect) {
+                onSelect('', '');
+            }
+            return;
+        }
+        timer = setTimeout(function() {
+            if (controller) {
+                controller.abort();
+            }
+            controller = new AbortController();
+            fetch(url + '?q=' + encodeURIComponent(query), {signal: controller.signal})
+                .then(response => response.json())
+                .then(data => render(data.results || []))
+                .catch(function(error) {
+                    if (error.name !== 'AbortError') {
+                        console.error('Erreur de recherche employé:', error);
+                    }
+                });
+        }, 150);
+    });
+
+    input.addEventListener('blur', function() {
+        menu.classList.remove('show');
+    });
+}
@@ -1,8 +1,57 @@
-from django.test import TestCase
-from django.contrib.auth.models import User
+import json
+import os
+import shutil
+import tempfile
+from datetime import date, datetime, time, timedelta
+from io import BytesIO, StringIO
+from unittest import mock
+
+import pandas as pd
 from django.contrib.auth import authenticate
-from .models import ManagerProfile, UploadedExcel
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from . import readers
 from .backends import ManagerAuthenticationBackend
+from .bulk_import import store_parsed
+from .cache import auth_user_key, dataset_version
+from .ingestion import ingest_frame, normalize_key
+from .models import Department, Employee, ManagerProfile, TimeEntry, UploadedExcel
+from .overtime import compute_overtime_frame
+from .rowstore import OvertimeStore
+
+# Tests run without the production Redis server
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+# Colonnes d'un export de pointeuse
+POINTAGE_COLUMNS = ['Date', 'Name', 'Department', 'In', 'Out']
+
+
+def temp_dir(test):
+    """Temporary directory removed when ``test`` ends."""
+    path = tempfile.mkdtemp()
+    test.addCleanup(shutil.rmtree, path, True)
+    return path
+
+
+def use_temp_media(test):
+    """Point MEDIA_ROOT to a temporary directory until ``test`` ends; returns the directory."""
+    media_root = temp_dir(test)
+    media = override_settings(MEDIA_ROOT=media_root)
+    media.enable()
+    test.addCleanup(media.disable)
+    return media_root
+
+
+def workbook(name, rows, columns=POINTAGE_COLUMNS):
+    """Uploaded .xlsx file holding ``rows`` under a ``columns`` header."""
+    buffer = BytesIO()
+    pd.DataFrame(rows, columns=columns).to_excel(buffer, index=False)
+    return SimpleUploadedFile(name, buffer.getvalue())
 
 class ManagerAuthenticationTest(TestCase):
     def setUp(self):
@@ -58,6 +107,13 @@ class ManagerAuthenticationTest(TestCase):
         
         user = authenticate(username='testmanager', password='wrongpassword')
         self.assertIsNone(user)
+
+    def test_unknown_user_hashes_once(self):
+        """Test that an unknown username costs a single password hash"""
+        with mock.patch('django.contrib.auth.hashers.PBKDF2PasswordHasher.encode', autospec=True,
+                        return_value='pbkdf2_sha256$1$salt$hash') as encode:
+            self.assertIsNone(authenticate(username='nobody', password='whatever123'))
+        self.assertEqual(encode.call_count, 1)
     
     def test_nonexistent_user_fails(self):
         """Test that nonexistent user fails authentication"""
@@ -131,3 +187,864 @@ class FileAccessTest(TestCase):
         # Admin should see all files
         all_files = UploadedExcel.objects.all()
         self.assertEqual(all_files.count(), 2)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class AuthUserCacheTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testmanager', email='test@example.com', password='testpass123',
+        )
+        self.manager_profile = ManagerProfile.objects.get(user=self.user)
+
+    def test_get_user_is_cached_until_profile_changes(self):
+        """Test that the session user is served from the cache and refreshed on change"""
+        cache.clear()
+        backend = ManagerAuthenticationBackend()
+        with self.assertNumQueries(1):
+            backend.get_user(self.user.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(backend.get_user(self.user.pk).managerprofile.department, None)
+
+        self.manager_profile.is_active = False
+        self.manager_profile.save()
+        self.assertIsNone(backend.get_user(self.user.pk))
+
+    def test_cached_user_has_no_password_hash(self):
+        """Test that the cache holds a snapshot without the password hash, and sessions still work"""
+        cache.clear()
+        self.client.login(username='testmanager', password='testpass123')
+        self.assertEqual(self.client.get('/settings/').status_code, 200)
+        snapshot = cache.get(auth_user_key(self.user.pk))
+        self.assertNotIn(self.user.password, repr(snapshot))
+        self.assertIn('testmanager', snapshot['user'])
+
+        # Servi depuis le cache ; le changement de mot de passe garde la session
+        response = self.client.post('/settings/', {
+            'change_password': '1', 'old_password': 'testpass123',
+            'new_password1': 'Nouveau-mot-2-passe', 'new_password2': 'Nouveau-mot-2-passe',
+        })
+        self.assertRedirects(response, '/settings/', fetch_redirect_response=False)
+        self.assertEqual(self.client.get('/settings/').context['user'].username, 'testmanager')
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password('Nouveau-mot-2-passe'))
+        self.assertEqual(self.user.email, 'test@example.com')
+
+    def test_cache_errors_fall_back_to_the_database(self):
+        """Test that a failing cache does not break authentication nor user saves"""
+        backend = ManagerAuthenticationBackend()
+        with mock.patch('pointage.backends.cache.get', side_effect=ConnectionError('cache down')), \
+                mock.patch('pointage.cache.cache.delete_many', side_effect=ConnectionError('cache down')):
+            self.assertEqual(backend.get_user(self.user.pk), self.user)
+            self.user.first_name = 'Test'
+            self.user.save()
+
+    @override_settings(CACHE_SHARED=False)
+    def test_per_process_cache_is_not_used(self):
+        """Test that a cache not shared between workers never serves the session user"""
+        cache.clear()
+        ManagerAuthenticationBackend().get_user(self.user.pk)
+        self.assertIsNone(cache.get(auth_user_key(self.user.pk)))
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class OvertimeCapAlertsTest(TestCase):
+    def _frame(self, rows):
+        return compute_overtime_frame(pd.DataFrame(rows, columns=POINTAGE_COLUMNS))
+
+    def test_frame_matches_row_rules(self):
+        """Weekday overtime is rounded-up hours above 8, weekend counts entirely"""
+        frame = self._frame([
+            (datetime(2025, 2, 3), 'DUPONT Jean', 'Admin', '08:00', '17:30'),  # lundi, 9h30 -> 2h
+            (datetime(2025, 2, 1), 'DUPONT Jean', 'Admin', '08:00:00', '12:10:00'),  # samedi -> 5h
+            (datetime(2025, 2, 4), 'DUPONT Jean', 'Admin', '-', '-'),
+            ('04/02/2025', 'MARTIN Paul', None, '22:00', '07:00'),  # nuit -> 9h -> 1h
+        ])
+        self.assertEqual(list(frame['heures_sup']), [2, 5, 1])
+        self.assertEqual(list(frame['weekend']), [False, True, False])
+        self.assertIsNone(frame['department'].iloc[2])
+
+    def test_weekly_and_rolling_caps(self):
+        """Only employees above a weekly or rolling cap are reported"""
+        from .overtime import overtime_cap_alerts
+        rows = []
+        monday = datetime(2025, 3, 3)
+        for week in range(4):
+            for day in range(5):
+                date = monday + timedelta(weeks=week, days=day)
+                rows.append((date, 'DUPONT Jean', 'Admin', '08:00', '19:00'))  # 3h/jour
+                rows.append((date, 'MARTIN Paul', 'Ventes', '08:00', '17:00'))  # 1h/jour
+        alertes = overtime_cap_alerts(self._frame(rows), weekly_cap=13, rolling_cap=50, rolling_weeks=4)
+        self.assertEqual(len(alertes), 1)
+        alerte = alertes[0]
+        self.assertEqual(alerte['nom'], 'DUPONT Jean')
+        self.assertEqual(alerte['department'], 'Admin')
+        self.assertEqual(alerte['max_semaine'], 15)
+        self.assertEqual(alerte['semaines_depassement'], 4)
+        self.assertEqual(alerte['max_glissant'], 60)
+        self.assertTrue(alerte['depassement_glissant'])
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class OvertimeStoreTest(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(username='storeuser', password='storepass123')
+        self.uploaded = UploadedExcel.objects.create(file='uploads/store.xlsx', uploaded_by=user)
+        ingest_frame(self.uploaded, compute_overtime_frame(pd.DataFrame([
+            (datetime(2025, 2, 3), 'DUPONT Jean', 'Admin', '08:00', '19:00'),  # 3h
+            (datetime(2025, 2, 4), 'Dupont  jean', 'Admin', '08:00', '16:00'),  # 0h
+            (datetime(2025, 2, 8), 'MARTIN Paul', None, '08:00', '12:30'),  # samedi, 5h
+            (datetime(2025, 3, 3), 'Martin Paul', 'Ventes', '07:00', '17:00'),  # 2h
+        ], columns=POINTAGE_COLUMNS)))
+        self.store = OvertimeStore.from_entries(TimeEntry.objects.all())
+
+    def test_names_are_normalized_at_ingestion(self):
+        self.assertEqual(normalize_key('  Élodie   MARTIN '), 'elodie martin')
+        self.assertEqual(Employee.objects.count(), 2)
+        self.assertEqual(TimeEntry.objects.filter(uploaded_file=self.uploaded).count(), 4)
+        self.assertIsNotNone(UploadedExcel.objects.get(pk=self.uploaded.pk).ingested_at)
+
+    def test_only_overtime_rows_are_kept(self):
+        self.assertEqual(len(self.store), 3)
+        self.assertEqual(self.store.total_heures_sup(), 10)
+        self.assertEqual(self.store.rows.dtype['minute_in'].itemsize, 2)
+
+    def test_filters_and_aggregates(self):
+        martin = Employee.objects.get(key='martin paul')
+        fevrier = self.store.filter(year=2025, month=2)
+        self.assertEqual(fevrier.total_heures_sup(), 8)
+        self.assertEqual(self.store.filter(employee=martin.id).total_heures_sup(), 7)
+        self.assertEqual(len(self.store.filter(employee=martin.id + 1000)), 0)
+        self.assertEqual(self.store.available_months(), [(2025, 3), (2025, 2)])
+        self.assertEqual(self.store.totals_by_department(), {'Non spécifié': 5, 'Admin': 3, 'Ventes': 2})
+        self.assertEqual(
+            [(s['nom'], s['total_heures_sup'], s['nb_jours']) for s in self.store.totals_by_employee()],
+            [('DUPONT Jean', 3, 1), ('MARTIN Paul', 7, 2)],
+        )
+        record = next(iter(fevrier.filter(employee=martin.id)))
+        self.assertEqual((record.heure_in, record.heure_out, record.weekend), ('08:00', '12:30', True))
+
+    def test_days_count_work_days_not_pairs(self):
+        split = UploadedExcel.objects.create(file='uploads/split.xlsx', uploaded_by=self.uploaded.uploaded_by)
+        # Mercredi 5 en trois paires de 5 h : 15 h -> 7 h sup réparties sur deux paires
+        ingest_frame(split, compute_overtime_frame(pd.DataFrame([
+            (datetime(2025, 2, 5), 'DURAND Marie', '06:00', '11:00'),
+            (datetime(2025, 2, 5), 'DURAND Marie', '11:00', '16:00'),
+            (datetime(2025, 2, 5), 'DURAND Marie', '16:00', '21:00'),
+        ], columns=['Date', 'Name', 'In', 'Out'])))
+        store = OvertimeStore.from_entries(TimeEntry.objects.filter(uploaded_file=split))
+        self.assertEqual(len(store), 2)
+        self.assertEqual(
+            [(s['nom'], s['total_heures_sup'], s['nb_jours']) for s in store.totals_by_employee()],
+            [('DURAND Marie', 7, 1)],
+        )
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class OvertimeViewsTest(TestCase):
+    def setUp(self):
+        use_temp_media(self)
+
+        self.user = User.objects.create_user(username='viewer', password='viewerpass123')
+        self.uploaded = UploadedExcel.objects.create(
+            file=workbook('pointage.xlsx', [
+                (datetime(2025, 2, 3), 'DUPONT Jean', 'Admin', '08:00:00', '19:00:00'),
+                (datetime(2025, 2, 8), 'MARTIN Paul', 'Ventes', '08:00:00', '12:30:00'),
+            ]),
+            uploaded_by=self.user,
+        )
+        self.client.force_login(self.user)
+
+    def test_heures_supplementaires_page(self):
+        # Files without stored rows are ingested on first use
+        self.assertEqual(self.client.get('/heures-supplementaires/').status_code, 200)
+        dupont = Employee.objects.get(key='dupont jean')
+        response = self.client.get('/heures-supplementaires/', {'filter_employee': dupont.id})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['total_heures_sup'], 3)
+        self.assertEqual(response.context['filter_employee_name'], 'DUPONT Jean')
+        self.assertContains(response, '19:00')
+
+    def test_statistique_and_apis(self):
+        response = self.client.get('/statistique/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['chart_data']['heuresData'], [3, 5])
+        self.assertEqual(response.context['months'], [('2025-02', 'Février 2025')])
+
+        data = self.client.get('/api/person-hours/', {'person': 'dupont jean'}).json()
+        self.assertEqual(data['dates'], ['2025-02-03'])
+        self.assertEqual(data['hours'], [3])
+        data = self.client.get('/api/pie-chart/', {'month': '2025-02'}).json()
+        self.assertEqual(data, {'labels': ['Ventes', 'Admin'], 'data': [5, 3]})
+
+    def test_employee_search(self):
+        self.client.get('/heures-supplementaires/')
+        data = self.client.get('/api/employees/search/', {'q': 'jéan'}).json()
+        self.assertEqual([r['name'] for r in data['results']], ['DUPONT Jean'])
+        self.assertEqual(self.client.get('/api/employees/search/', {'q': 'ma'}).json()['results'][0]['name'], 'MARTIN Paul')
+
+        # Other managers only see employees of their own files
+        other = User.objects.create_user(username='other', password='otherpass123')
+        self.client.force_login(other)
+        self.assertEqual(self.client.get('/api/employees/search/', {'q': 'dupont'}).json(), {'results': []})
+
+    def test_employee_scope_of_filters(self):
+        self.client.get('/heures-supplementaires/')
+        other = User.objects.create_user(username='other', password='otherpass123')
+        hidden = UploadedExcel.objects.create(file='uploads/autre.xlsx', uploaded_by=other)
+        ingest_frame(hidden, compute_overtime_frame(pd.DataFrame([
+            (datetime(2025, 2, 3), 'DUBOIS Anne', '08:00', '19:00'),
+        ], columns=['Date', 'Name', 'In', 'Out'])))
+        dubois = Employee.objects.get(key='dubois anne')
+
+        # Le candidat hors périmètre trié en premier n'épuise pas la recherche
+        with mock.patch('pointage.search.CANDIDATES_CHUNK', 1):
+            data = self.client.get('/api/employees/search/', {'q': 'du'}).json()
+        self.assertEqual([r['name'] for r in data['results']], ['DUPONT Jean'])
+
+        # Un identifiant hors périmètre ne révèle pas le nom de l'employé
+        response = self.client.get('/statistique/', {'filter_employee': dubois.id})
+        self.assertEqual(response.context['filter_employee_name'], '')
+        response = self.client.get('/heures-supplementaires/', {'filter_employee': dubois.id})
+        self.assertEqual(response.context['filter_employee_name'], '')
+
+    def test_unreadable_upload_is_reported(self):
+        from django.conf import settings
+
+        with self.uploaded.file.open('rb') as source:
+            content = source.read()
+        # Le classeur passe la validation mais sa lecture échoue
+        with mock.patch('pointage.overtime.read_table', side_effect=ValueError('feuille illisible')):
+            response = self.client.post('/import/', {'excel_file': SimpleUploadedFile('corrompu.xlsx', content)})
+        self.assertIn('Error reading file: feuille illisible', [str(m) for m in response.context['messages']])
+        self.assertFalse(UploadedExcel.objects.filter(file__endswith='corrompu.xlsx').exists())
+        self.assertFalse(any(name.startswith('corrompu') for name in os.listdir(os.path.join(settings.MEDIA_ROOT, 'uploads'))))
+
+        # Un ancien fichier illisible est ignoré sans bloquer les statistiques
+        UploadedExcel.objects.create(
+            file=SimpleUploadedFile('ancien.xlsx', b'PK\x03\x04 not a workbook'),
+            uploaded_by=self.user,
+        )
+        response = self.client.get('/statistique/')
+        self.assertEqual(response.context['chart_data']['heuresData'], [3, 5])
+        self.assertIsNone(UploadedExcel.objects.get(file__endswith='ancien.xlsx').ingested_at)
+
+    def test_statistique_cache_invalidated_on_import_and_delete(self):
+        from .views import _statistique_payload
+
+        with mock.patch('pointage.views._statistique_payload', wraps=_statistique_payload) as payload:
+            self.client.get('/statistique/')
+            # Un succès de cache ne lit pas la liste des fichiers
+            with mock.patch('pointage.views.ensure_ingested') as ensure:
+                response = self.client.get('/statistique/', {'page': 2})
+            ensure.assert_not_called()
+            self.assertEqual(payload.call_count, 1)
+            self.assertEqual(response.context['chart_data']['heuresData'], [3, 5])
+
+            extra = UploadedExcel.objects.create(
+                file=workbook('mars.xlsx', [(datetime(2025, 3, 4), 'DUPONT Jean', 'Admin', '08:00:00', '18:00:00')]),
+                uploaded_by=self.user,
+            )
+            response = self.client.get('/statistique/')
+            self.assertEqual(response.context['chart_data']['heuresData'], [5, 5])
+
+            extra.delete()
+            response = self.client.get('/statistique/')
+            self.assertEqual(response.context['chart_data']['heuresData'], [3, 5])
+            # Retour à l'état initial : même version, l'entrée d'origine resert
+            self.assertEqual(payload.call_count, 2)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ManagerProvisioningTest(TestCase):
+    def test_login_does_not_touch_profile(self):
+        user = User.objects.create_user(username='quick', password='quickpass123')
+        self.assertTrue(ManagerProfile.objects.filter(user=user).exists())
+        with self.assertNumQueries(1):
+            user.save(update_fields=['last_login'])
+
+    def test_bulk_import_from_csv(self):
+        User.objects.create_user(username='existing', password='existingpass123')
+        content = (
+            'username;email;first_name;last_name;department;password\n'
+            'alice;alice@example.com;Alice;Durand;Ventes;alicepass123\n'
+            'bob;;Bob;Petit;;\n'
+            'existing;;;;;\n'
+            ';nobody@example.com;;;;\n'
+            'carol;not-an-email;;;;\n'
+        )
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False, encoding='utf-8') as file:
+            file.write(content)
+        self.addCleanup(os.remove, file.name)
+        out, err = StringIO(), StringIO()
+        call_command('import_managers', file.name, stdout=out, stderr=err)
+
+        self.assertIn('2 manager(s) created', out.getvalue())
+        self.assertIn('1 existing username(s) skipped', out.getvalue())
+        self.assertEqual(err.getvalue().count('Line'), 2)
+        alice = User.objects.get(username='alice')
+        self.assertTrue(alice.check_password('alicepass123'))
+        self.assertEqual(alice.managerprofile.department, 'Ventes')
+        self.assertFalse(User.objects.get(username='bob').has_usable_password())
+        self.assertIsNone(ManagerProfile.objects.get(user__username='bob').department)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ManagerListTest(TestCase):
+    def setUp(self):
+        from django.contrib.auth.models import Permission
+        self.admin = User.objects.create_user(username='boss', password='bosspass123')
+        self.admin.user_permissions.add(Permission.objects.get(codename='can_manage_managers'))
+        for i in range(30):
+            user = User.objects.create_user(username=f'manager{i:02d}', email=f'm{i}@example.com')
+            ManagerProfile.objects.filter(user=user).update(department='Logistique' if i % 2 else 'Ventes')
+        self.client.force_login(self.admin)
+
+    def test_list_is_paginated_without_per_row_queries(self):
+        response = self.client.get('/managers/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['managers']), 25)
+        with self.assertNumQueries(1):
+            # Profiles come with the page query
+            [m.managerprofile.department for m in response.context['page_obj'].paginator.get_page(2)]
+
+    def test_search_by_name_and_department(self):
+        from .search import search_managers
+        users = User.objects.all()
+        self.assertEqual(search_managers(users, 'manager07').get().username, 'manager07')
+        self.assertEqual(search_managers(users, 'logist').count(), 15)
+        self.assertEqual(search_managers(users, 'vente manager1').count(), 5)
+        # Under three characters: icontains fallback
+        self.assertEqual(search_managers(users, 'm3').count(), 1)
+        response = self.client.get('/managers/', {'q': 'ventes'})
+        self.assertEqual(response.context['page_obj'].paginator.count, 15)
+
+    def test_bulk_actions(self):
+        ids = list(User.objects.filter(username__startswith='manager').values_list('id', flat=True)[:10])
+        backend = ManagerAuthenticationBackend()
+        self.assertIsNotNone(backend.get_user(ids[0]))  # cached snapshot
+
+        with CaptureQueriesContext(connection) as queries, self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/managers/bulk/', {'action': 'deactivate', 'selected': ids})
+        self.assertEqual([q['sql'].split()[0] for q in queries].count('UPDATE'), 1)
+        self.assertRedirects(response, '/managers/', fetch_redirect_response=False)
+        self.assertEqual(ManagerProfile.objects.filter(user_id__in=ids, is_active=False).count(), 10)
+        self.assertIsNone(backend.get_user(ids[0]))
+
+        response = self.client.post('/api/managers/bulk/', json.dumps({
+            'action': 'department', 'ids': ids[:3], 'department': 'Finance',
+        }), content_type='application/json')
+        self.assertEqual(response.json(), {'action': 'department', 'affected': 3})
+        self.assertEqual(User.objects.filter(managerprofile__department='Finance').count(), 3)
+
+        response = self.client.post('/api/managers/bulk/', json.dumps({
+            'action': 'delete', 'ids': ids + [self.admin.pk],
+        }), content_type='application/json')
+        self.assertEqual(response.json()['affected'], 10)
+        self.assertTrue(User.objects.filter(pk=self.admin.pk).exists())
+        self.assertEqual(self.client.post('/api/managers/bulk/', '{"action": "explode", "ids": [1]}',
+                                          content_type='application/json').status_code, 400)
+
+    def test_bulk_actions_spare_privileged_accounts_and_remove_files(self):
+        use_temp_media(self)
+
+        root = User.objects.create_superuser('root', 'root@example.com', 'rootpass123')
+        staff = User.objects.create_user(username='staff', is_staff=True)
+        manager = User.objects.get(username='manager00')
+        upload = UploadedExcel.objects.create(file=SimpleUploadedFile('pointage.xlsx', b'data'), uploaded_by=manager)
+        path = upload.file.path
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/managers/bulk/', {'action': 'delete', 'selected': [root.pk, staff.pk, manager.pk]})
+        self.assertRedirects(response, '/managers/', fetch_redirect_response=False)
+        self.assertEqual(set(User.objects.filter(pk__in=[root.pk, staff.pk, manager.pk]).values_list('username', flat=True)),
+                         {'root', 'staff'})
+        self.assertFalse(UploadedExcel.objects.filter(pk=upload.pk).exists())
+        self.assertFalse(os.path.exists(path))
+
+        # Un superutilisateur peut agir sur les comptes privilégiés
+        from .provisioning import bulk_manager_action
+        self.assertEqual(bulk_manager_action('deactivate', [staff.pk], root), 1)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class SessionCleanupTest(TestCase):
+    def test_cleanup_deletes_expired_sessions_in_batches(self):
+        from django.contrib.sessions.models import Session
+        from django.utils import timezone
+
+        now = timezone.now()
+        Session.objects.bulk_create(
+            [Session(session_key=f'old{i}', session_data='', expire_date=now - timedelta(days=1)) for i in range(5)]
+            + [Session(session_key='current', session_data='', expire_date=now + timedelta(days=1))]
+        )
+        out = StringIO()
+        call_command('cleanup_sessions', batch_size=2, stdout=out)
+        self.assertIn('5 expired session(s) deleted', out.getvalue())
+        self.assertEqual(list(Session.objects.values_list('session_key', flat=True)), ['current'])
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class SqliteTuningTest(TransactionTestCase):
+    # Certaines pragmas refusent de s'exécuter dans la transaction d'un TestCase
+    def test_pragmas_and_optimize_command(self):
+        from .sqlite import apply_pragmas
+
+        if connection.vendor != 'sqlite':
+            self.skipTest('SQLite only')
+        with self.settings(SQLITE_PRAGMAS={'synchronous': 'NORMAL', 'busy_timeout': 4321}):
+            apply_pragmas(sender=None, connection=connection)
+        with connection.cursor() as cursor:
+            self.assertEqual(cursor.execute('PRAGMA busy_timeout').fetchone()[0], 4321)
+            self.assertEqual(cursor.execute('PRAGMA synchronous').fetchone()[0], 1)
+        with self.settings(SQLITE_PRAGMAS={'foreign_keys': 'OFF'}):
+            with self.assertRaises(ValueError):
+                apply_pragmas(sender=None, connection=connection)
+
+        out = StringIO()
+        call_command('optimize_sqlite', stdout=out)
+        self.assertIn('ANALYZE', out.getvalue())
+
+
+class DatabaseConfigTest(TestCase):
+    def test_persistent_connections_and_pool(self):
+        from django.core.exceptions import ImproperlyConfigured
+        from gestion_heures.database import database_config
+
+        with mock.patch.dict(os.environ, {'DATABASE_URL': 'postgresql://u:p@db.example.com:5432/app', 'DB_CONN_MAX_AGE': '120'}):
+            database = database_config('sqlite:///unused.sqlite3')
+        self.assertEqual(database['CONN_MAX_AGE'], 120)
+        self.assertTrue(database['CONN_HEALTH_CHECKS'])
+
+        with mock.patch.dict(os.environ, {'DATABASE_URL': 'postgresql://u:p@db.example.com:5432/app', 'DB_POOL': 'True'}):
+            with mock.patch.dict('sys.modules', {'psycopg_pool': mock.Mock()}):
+                database = database_config('sqlite:///unused.sqlite3')
+            self.assertEqual(database['CONN_MAX_AGE'], 0)
+            self.assertEqual(database['OPTIONS']['pool']['max_size'], 10)
+            with mock.patch.dict('sys.modules', {'psycopg_pool': None}):
+                with self.assertRaises(ImproperlyConfigured):
+                    database_config('sqlite:///unused.sqlite3')
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ImportTimesheetsTest(TestCase):
+    def test_bulk_import_skips_known_content(self):
+        use_temp_media(self)
+        source = temp_dir(self)
+        os.makedirs(os.path.join(source, '2024'))
+        for month in (1, 2):
+            pd.DataFrame([
+                (datetime(2024, month, 5), 'DUPONT Jean', 'Admin', '08:00:00', '19:00:00'),
+                (datetime(2024, month, 6), 'MARTIN Paul', 'Ventes', '08:00:00', '17:00:00'),
+            ], columns=POINTAGE_COLUMNS).to_excel(
+                os.path.join(source, '2024', f'pointage-{month:02d}.xlsx'), index=False)
+        shutil.copy(os.path.join(source, '2024', 'pointage-01.xlsx'), os.path.join(source, 'copie.xlsx'))
+        pd.DataFrame({'Foo': [1]}).to_excel(os.path.join(source, 'autre.xlsx'), index=False)
+        with open(os.path.join(source, 'casse.xlsx'), 'wb') as f:
+            f.write(b'pas un classeur')
+        User.objects.create_superuser('root', 'root@example.com', 'rootpass123')
+
+        out, err = StringIO(), StringIO()
+        # Validés comme un upload, sans la limite de taille
+        with self.settings(MAX_UPLOAD_SIZE=1):
+            call_command('import_timesheets', source, workers=2, stdout=out, stderr=err)
+        self.assertIn('2 file(s), 4 row(s) imported', out.getvalue())
+        self.assertIn('casse.xlsx: Invalid Excel file format', err.getvalue())
+        self.assertIn('1 file(s) already imported or duplicated', out.getvalue())
+        self.assertIn('missing column(s)', err.getvalue())
+        self.assertEqual(UploadedExcel.objects.exclude(content_hash='').count(), 2)
+        self.assertEqual(TimeEntry.objects.count(), 4)
+
+        out = StringIO()
+        call_command('import_timesheets', os.path.join(source, '**', '*.xlsx'), stdout=out, stderr=StringIO())
+        self.assertIn('0 file(s), 0 row(s) imported', out.getvalue())
+
+    def test_vanished_files_and_failed_batches_leave_nothing_behind(self):
+        media_root = use_temp_media(self)
+        source = temp_dir(self)
+        path = os.path.join(source, 'pointage.xlsx')
+        raw = pd.DataFrame([
+            (datetime(2024, 3, 4), 'DUPONT Jean', 'Admin', '08:00:00', '19:00:00'),
+        ], columns=POINTAGE_COLUMNS)
+        raw.to_excel(path, index=False)
+        root = User.objects.create_superuser('root', 'root@example.com', 'rootpass123')
+
+        # Une erreur d'écriture annule le lot et supprime les copies déjà faites
+        with mock.patch('pointage.ingestion.ingest_frame', side_effect=RuntimeError('database is locked')):
+            with self.assertRaises(RuntimeError):
+                store_parsed([(path, 'abc', compute_overtime_frame(raw))], root)
+        self.assertFalse(UploadedExcel.objects.exists())
+        self.assertEqual(os.listdir(os.path.join(media_root, 'uploads')), [])
+
+        # Un fichier disparu après la découverte est signalé, les autres importés
+        missing = os.path.join(source, 'disparu.xlsx')
+        out, err = StringIO(), StringIO()
+        with mock.patch('pointage.management.commands.import_timesheets.discover_files', return_value=[missing, path]):
+            call_command('import_timesheets', source, workers=1, stdout=out, stderr=err)
+        self.assertIn(f'{missing}: unreadable file', err.getvalue())
+        self.assertIn('1 file(s), 1 row(s) imported', out.getvalue())
+        self.assertIn('1 unreadable', out.getvalue())
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class RebuildOvertimeTest(TransactionTestCase):
+    def test_rebuild_recomputes_entries_from_sources(self):
+        from .rebuild import SHADOW_TABLE
+
+        use_temp_media(self)
+        source = temp_dir(self)
+        for month in (1, 2):
+            pd.DataFrame([
+                (datetime(2024, month, 5), 'DUPONT Jean', 'Admin', '08:00:00', '19:00:00'),
+                (datetime(2024, month, 6), 'MARTIN Paul', 'Ventes', '08:00:00', '17:00:00'),
+            ], columns=POINTAGE_COLUMNS).to_excel(
+                os.path.join(source, f'pointage-{month:02d}.xlsx'), index=False)
+        User.objects.create_superuser('root', 'root@example.com', 'rootpass123')
+        call_command('import_timesheets', source, workers=1, stdout=StringIO(), stderr=StringIO())
+        first, second = UploadedExcel.objects.order_by('id')
+        expected = sorted(TimeEntry.objects.values_list('uploaded_file_id', 'date', 'heures_sup'))
+        TimeEntry.objects.update(heures_sup=99)
+        os.remove(second.file.path)
+        version = dataset_version()
+
+        out = StringIO()
+        call_command('rebuild_overtime', workers=1, stdout=out, stderr=StringIO())
+        self.assertIn('1 file(s), 2 row(s) rebuilt', out.getvalue())
+        self.assertIn('1 kept', out.getvalue())
+        self.assertIn('swap', out.getvalue())
+        self.assertEqual(
+            sorted(TimeEntry.objects.filter(uploaded_file=first).values_list('uploaded_file_id', 'date', 'heures_sup')),
+            [row for row in expected if row[0] == first.id],
+        )
+        self.assertEqual(set(TimeEntry.objects.filter(uploaded_file=second).values_list('heures_sup', flat=True)), {99})
+        self.assertNotEqual(dataset_version(), version)
+        self.assertNotIn(SHADOW_TABLE, connection.introspection.table_names())
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class WatchUploadsTest(TestCase):
+    def test_settle_tracker_waits_for_complete_files(self):
+        from .watcher import SettleTracker
+
+        now = [0.0]
+        tracker = SettleTracker(settle=2, clock=lambda: now[0])
+        path = os.path.join(temp_dir(self), 'export.xlsx')
+        with open(path, 'wb') as f:
+            f.write(b'PK')
+        tracker.add([path])
+        now[0] = 1
+        self.assertEqual(tracker.ready(), [])
+        with open(path, 'ab') as f:
+            f.write(b'encore')
+        now[0] = 2.5
+        self.assertEqual(tracker.ready(), [])  # modifié : le délai repart
+        now[0] = 5
+        self.assertEqual(tracker.ready(), [path])
+        tracker.add([path])
+        self.assertEqual(len(tracker), 0)  # déjà traité et inchangé
+
+    def test_watch_once_imports_dropped_files(self):
+        use_temp_media(self)
+        dropbox = temp_dir(self)
+        pd.DataFrame([
+            (datetime(2024, 3, 4), 'DUPONT Jean', 'Admin', '08:00:00', '19:00:00'),
+        ], columns=POINTAGE_COLUMNS).to_excel(os.path.join(dropbox, 'export.xlsx'), index=False)
+        shutil.copy(os.path.join(dropbox, 'export.xlsx'), os.path.join(dropbox, 'export-copie.xlsx'))
+        pd.DataFrame({'Foo': [1]}).to_excel(os.path.join(dropbox, 'autre.xlsx'), index=False)
+        with open(os.path.join(dropbox, '~$export.xlsx'), 'wb') as f:
+            f.write(b'verrou')
+        User.objects.create_superuser('root', 'root@example.com', 'rootpass123')
+
+        out, err = StringIO(), StringIO()
+        call_command('watch_uploads', dropbox, once=True, polling=True, settle=0, interval=0,
+                     workers=1, stdout=out, stderr=err)
+        self.assertIn('1 file(s), 1 row(s) imported', out.getvalue())
+        self.assertIn('1 already imported', out.getvalue())
+        self.assertIn('autre.xlsx: missing column(s)', err.getvalue())
+        self.assertEqual(TimeEntry.objects.count(), 1)
+
+    def test_failed_store_is_retried(self):
+        use_temp_media(self)
+        dropbox = temp_dir(self)
+        pd.DataFrame([
+            (datetime(2024, 3, 4), 'DUPONT Jean', 'Admin', '08:00:00', '19:00:00'),
+        ], columns=POINTAGE_COLUMNS).to_excel(os.path.join(dropbox, 'export.xlsx'), index=False)
+        User.objects.create_superuser('root', 'root@example.com', 'rootpass123')
+
+        out, err = StringIO(), StringIO()
+        def fail_once(batch, user):
+            if store.call_count == 1:
+                raise OSError('disque plein')
+            return store_parsed(batch, user)
+
+        with mock.patch('pointage.management.commands.watch_uploads.store_parsed', side_effect=fail_once) as store:
+            call_command('watch_uploads', dropbox, once=True, polling=True, settle=0, interval=0,
+                         workers=1, stdout=out, stderr=err)
+        self.assertIn('failed, will retry: disque plein', err.getvalue())
+        self.assertEqual(store.call_count, 2)
+        self.assertEqual(TimeEntry.objects.count(), 1)
+
+    def test_vanished_file_does_not_stop_the_watcher(self):
+        from concurrent.futures import ThreadPoolExecutor
+        from .management.commands.watch_uploads import Command
+
+        use_temp_media(self)
+        dropbox = temp_dir(self)
+        present = os.path.join(dropbox, 'export.xlsx')
+        pd.DataFrame([
+            (datetime(2024, 3, 4), 'DUPONT Jean', 'Admin', '08:00:00', '19:00:00'),
+        ], columns=POINTAGE_COLUMNS).to_excel(present, index=False)
+        user = User.objects.create_superuser('root', 'root@example.com', 'rootpass123')
+
+        out, err = StringIO(), StringIO()
+        command = Command(stdout=out, stderr=err)
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            command._ingest(pool, [os.path.join(dropbox, 'renomme.xlsx'), present], user, 1)
+        self.assertIn('renomme.xlsx: skipped', err.getvalue())
+        self.assertIn('1 file(s), 1 row(s) imported', out.getvalue())
+        self.assertEqual(TimeEntry.objects.count(), 1)
+
+
+class ReadersTest(TestCase):
+    def test_csv_and_parquet_give_the_same_overtime_as_excel(self):
+        directory = temp_dir(self)
+        source = pd.DataFrame([
+            (datetime(2024, 3, 4), 'Élodie MARTIN', 'Accueil', '08:00:00', '19:00:01'),
+            (datetime(2024, 3, 9), 'DUPONT Jean', None, '07:30', '12:15'),
+            (datetime(2024, 3, 5), 'DUPONT Jean', 'Admin', '22:00:00', '06:00:00'),
+            (datetime(2024, 3, 6), 'DUPONT Jean', 'Admin', 'absent', '17:00:00'),
+        ], columns=['Date', 'Name', 'Département', 'In', 'Out'])
+        paths = {ext: os.path.join(directory, f'pointage{ext}') for ext in ('.xlsx', '.csv', '.parquet')}
+        source.to_excel(paths['.xlsx'], index=False)
+        source.to_csv(paths['.csv'], index=False, sep=';', encoding='cp1252')
+        source.to_parquet(paths['.parquet'], index=False)
+
+        columns = ['nom', 'department', 'date', 'minute_in', 'minute_out', 'heures_sup']
+        expected = compute_overtime_frame(readers.read_table(paths['.xlsx']))[columns].reset_index(drop=True)
+        self.assertEqual(len(expected), 3)
+        for path in (paths['.csv'], paths['.parquet']):
+            frame = compute_overtime_frame(readers.read_table(path))[columns].reset_index(drop=True)
+            pd.testing.assert_frame_equal(frame, expected, check_dtype=False)
+        with mock.patch.object(readers, 'PYARROW_AVAILABLE', False):
+            frame = compute_overtime_frame(readers.read_table(paths['.csv']))[columns].reset_index(drop=True)
+        pd.testing.assert_frame_equal(frame, expected, check_dtype=False)
+
+        with open(paths['.csv'], 'rb') as f:
+            self.assertEqual(readers.csv_dialect(f), (';', 'cp1252'))
+        with self.assertRaises(ValueError):
+            readers.read_table(os.path.join(directory, 'pointage.ods'))
+
+    def test_calibration_records_the_fastest_reader(self):
+        directory = temp_dir(self)
+        path = os.path.join(directory, 'pointage.xlsx')
+        pd.DataFrame([
+            (datetime(2024, 3, 4), 'DUPONT Jean', '08:00:00', '19:00:00'),
+        ], columns=['Date', 'Name', 'In', 'Out']).to_excel(path, index=False)
+        calibration_file = os.path.join(directory, 'calibration.json')
+
+        with override_settings(EXCEL_READER_CALIBRATION_FILE=calibration_file):
+            self.assertEqual(readers.excel_backend('.xlsx'), 'openpyxl')
+            call_command('calibrate_readers', directory, repeat=1, stdout=StringIO())
+            with open(calibration_file) as f:
+                recorded = json.load(f)['formats']['.xlsx']
+            self.assertIn(recorded['backend'], readers.available_backends('.xlsx'))
+            self.assertEqual(readers.excel_backend('.xlsx'), recorded['backend'])
+            with mock.patch.object(readers, 'available_backends', return_value=['openpyxl']):
+                self.assertEqual(readers.excel_backend('.xlsx'), 'openpyxl')
+            with mock.patch.object(readers, 'excel_backend', return_value='calamine'), \
+                    mock.patch.object(readers.pd, 'read_excel', side_effect=[ValueError('calamine'), 'repli']) as read_excel:
+                self.assertEqual(readers.read_excel(path, '.xlsx'), 'repli')
+            self.assertEqual(read_excel.call_args.kwargs['engine'], 'openpyxl')
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class SchemaTest(TestCase):
+    def test_fingerprint_drives_conversion_and_is_stored(self):
+        from .schema import inspect_schema
+
+        df = pd.DataFrame({
+            'Date': [' 04/03/2024', '05/03/2024', '2024-03-06', '07/03/2024'],
+            'Name': ['DUPONT Jean'] * 4,
+            # Cellules heure d'openpyxl : la conversion depuis Excel laisse des microsecondes
+            'In': [time(8, 0, 0, 499999), time(8, 0), '08:00', None],
+            'Out': [time(19, 0, 1), time(17, 0), time(17, 0), time(17, 0)],
+        })
+        schema = inspect_schema(df)
+        self.assertEqual(schema['columns']['date'], 'Date')
+        self.assertEqual(schema['date'], {'kind': 'text', 'format': '%d/%m/%Y'})
+        self.assertEqual(schema['in']['kind'], 'mixed')
+        self.assertEqual(schema['out']['kind'], 'time')
+
+        frame = compute_overtime_frame(df)
+        self.assertEqual(frame['date'].dt.day.tolist(), [4, 5, 6])  # 2024-03-06 : format de repli
+        self.assertEqual(frame['minute_in'].tolist(), [480, 480, 480])
+        self.assertEqual(frame['heures_sup'].tolist(), [4, 1, 1])
+        self.assertEqual(frame.attrs['schema'], schema)
+
+        us = pd.DataFrame({'Date': ['03/04/2024', '03/25/2024'], 'Name': ['A', 'A'], 'In': ['08:00'] * 2, 'Out': ['17:00'] * 2})
+        self.assertEqual(inspect_schema(us)['date']['format'], '%m/%d/%Y')
+        self.assertEqual(compute_overtime_frame(us)['date'].tolist(), [datetime(2024, 3, 4), datetime(2024, 3, 25)])
+
+        user = User.objects.create_user('uploader', password='pass12345')
+        uploaded = UploadedExcel.objects.create(file='uploads/pointage.xlsx', uploaded_by=user)
+        ingest_frame(uploaded, frame)
+        uploaded.refresh_from_db()
+        self.assertEqual(uploaded.schema, schema)
+
+
+class ConsolidationTest(TestCase):
+    def test_overtime_is_computed_on_daily_totals(self):
+        df = pd.DataFrame([
+            # Journée en deux temps : 4 h + 5 h 30 = 9 h 30 -> 10 h -> 2 h sup
+            (datetime(2024, 3, 4), 'DUPONT Jean', '08:00', '12:00'),
+            (datetime(2024, 3, 4), 'Dupont  jean', '13:00', '18:30'),
+            # Chevauchement compté une fois : 08:00-14:00 = 6 h
+            (datetime(2024, 3, 5), 'DUPONT Jean', '08:00', '12:00'),
+            (datetime(2024, 3, 5), 'DUPONT Jean', '10:00', '14:00'),
+            # Poste de nuit du vendredi 8 poursuivi après minuit : 4 h + 4 h 30 -> 9 h -> 1 h sup le vendredi
+            (datetime(2024, 3, 8), 'MARTIN Paul', '20:00', '00:00'),
+            (datetime(2024, 3, 9), 'MARTIN Paul', '00:30', '05:00'),
+            # Samedi 9, nouveau poste (pause > 1 h) : tout en heures sup
+            (datetime(2024, 3, 9), 'MARTIN Paul', '14:00', '16:00'),
+        ], columns=['Date', 'Name', 'In', 'Out'])
+        frame = compute_overtime_frame(df)
+
+        self.assertEqual(frame['heures_sup'].tolist(), [0, 2, 0, 0, 0, 1, 2])
+        self.assertEqual(frame['heures_travaillees'].tolist(), [4, 5.5, 4, 2, 4, 4.5, 2])
+        self.assertEqual(frame['date'].dt.day.tolist(), [4, 4, 5, 5, 8, 8, 9])
+        self.assertEqual(frame['weekend'].tolist(), [False] * 6 + [True])
+
+    def test_next_day_shift_after_overnight_pair_is_its_own_day(self):
+        df = pd.DataFrame([
+            # Poste de nuit du mercredi 3 terminé à 8 h, puis poste du jeudi 4 une heure plus tard
+            (datetime(2024, 1, 3), 'DUPONT Jean', '22:00', '08:00'),
+            (datetime(2024, 1, 4), 'DUPONT Jean', '09:00', '17:00'),
+        ], columns=['Date', 'Name', 'In', 'Out'])
+        frame = compute_overtime_frame(df)
+
+        self.assertEqual(frame['date'].dt.day.tolist(), [3, 4])
+        self.assertEqual(frame['heures_sup'].tolist(), [2, 0])
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class QualityReportTest(TestCase):
+    def test_report_is_stored_and_listed(self):
+        df = pd.DataFrame([
+            (datetime(2024, 3, 4), 'DUPONT Jean', 'Admin', '08:00:00', '17:00:00'),
+            (datetime(2024, 3, 4), 'DUPONT Jean', 'Admin', '08:00:00', '17:00:00'),
+            (datetime(2024, 3, 5), 'DUPONT Jean', 'Admni', '22:00:00', '06:00:00'),
+            (datetime(2024, 3, 6), 'DUPONT Jean', None, '06:00:00', '23:30:00'),
+            (datetime(2024, 3, 7), 'DUPONT Jean', 'Admin', None, '17:00:00'),
+            (datetime(2024, 3, 8), 'DUPONT Jean', 'Admin', '8h', '17:00:00'),
+            ('bientôt', 'DUPONT Jean', 'Admin', '08:00:00', '17:00:00'),
+        ], columns=['Date', 'Name', 'Département', 'In', 'Out'])
+        user = User.objects.create_superuser('root', 'root@example.com', 'rootpass123')
+        uploaded = UploadedExcel.objects.create(file='uploads/pointage.xlsx', uploaded_by=user)
+        with self.settings(POINTAGE_DEPARTMENTS=['ADMIN']):
+            ingest_frame(uploaded, compute_overtime_frame(df))
+            uploaded.refresh_from_db()
+            first_report = uploaded.quality
+            # Même fichier, même rapport : les départements créés par l'import n'y changent rien
+            ingest_frame(uploaded, compute_overtime_frame(df))
+            uploaded.refresh_from_db()
+        self.assertEqual(uploaded.quality, first_report)
+        self.assertTrue(Department.objects.filter(key='admni').exists())
+
+        issues = {check: issue['lines'] for check, issue in uploaded.quality['issues'].items() if issue['count']}
+        self.assertEqual(issues, {
+            'missing_punch': [6],
+            'unparseable_time': [7],
+            'invalid_date': [8],
+            'out_before_in': [4],
+            'duplicate': [3],
+            'long_shift': [5],
+            'unknown_department': [4, 5],
+        })
+        self.assertEqual((uploaded.quality['rows'], uploaded.quality['valid']), (7, 4))
+
+        self.client.login(username='root', password='rootpass123')
+        response = self.client.get('/excels/')
+        self.assertContains(response, '7 anomalie(s) sur 7 ligne(s)')
+        self.assertContains(response, 'Ligne en double : 1 (ligne 3)')
+
+        # Sans liste de référence, seules les lignes sans département sont signalées
+        ingest_frame(uploaded, compute_overtime_frame(df))
+        uploaded.refresh_from_db()
+        self.assertEqual(uploaded.quality['issues']['unknown_department']['lines'], [5])
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class FileListTest(TestCase):
+    def test_summary_is_stored_and_sorted_without_parsing(self):
+        user = User.objects.create_superuser('root', 'root@example.com', 'rootpass123')
+        small = UploadedExcel.objects.create(file='uploads/petit.xlsx', uploaded_by=user)
+        large = UploadedExcel.objects.create(file='uploads/grand.xlsx', uploaded_by=user)
+        ingest_frame(small, compute_overtime_frame(pd.DataFrame([
+            (datetime(2024, 3, 4), 'DUPONT Jean', 'Admin', '08:00', '19:00'),
+        ], columns=POINTAGE_COLUMNS)))
+        ingest_frame(large, compute_overtime_frame(pd.DataFrame([
+            (datetime(2024, 2, 1), 'DUPONT Jean', 'Ventes', '08:00', '17:00'),
+            (datetime(2024, 2, 3), 'Dupont jean', 'admin', '08:00', '10:00'),
+            (datetime(2024, 2, 28), 'MARTIN Paul', None, '08:00', '17:00'),
+        ], columns=POINTAGE_COLUMNS)))
+        large.refresh_from_db()
+        self.assertEqual(
+            (large.row_count, large.employee_count, large.departments, large.date_min, large.date_max, large.overtime_total),
+            (3, 2, ['admin', 'Ventes'], date(2024, 2, 1), date(2024, 2, 28), 4),
+        )
+
+        self.client.login(username='root', password='rootpass123')
+        with mock.patch('pointage.overtime.read_table', side_effect=AssertionError('workbook parsed')):
+            response = self.client.get('/excels/?sort=-rows')
+        self.assertEqual([f.id for f in response.context['files']], [large.id, small.id])
+        self.assertContains(response, '01/02/2024 – 28/02/2024')
+        response = self.client.get('/excels/?sort=overtime')
+        self.assertEqual([f.id for f in response.context['files']], [small.id, large.id])
+        response = self.client.get('/excels/?sort=bogus')
+        self.assertEqual(response.context['sort'], '-date')
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class FilePreviewTest(TestCase):
+    def setUp(self):
+        from .ingestion import ingest_uploaded_file
+        use_temp_media(self)
+
+        self.user = User.objects.create_user(username='viewer', password='viewerpass123')
+        lines = ['Date,Name,In,Out,Note'] + [f'2024-03-04,Employé {i:03d},08:00,17:00,x' for i in range(250)]
+        self.uploaded = UploadedExcel.objects.create(
+            file=SimpleUploadedFile('mars.csv', '\n'.join(lines).encode('utf-8')),
+            uploaded_by=self.user,
+        )
+        ingest_uploaded_file(self.uploaded)
+        self.uploaded.refresh_from_db()
+        self.client.force_login(self.user)
+
+    def test_preview_is_stored_and_served_without_parsing(self):
+        preview = self.uploaded.preview
+        self.assertEqual(preview['columns'], ['Date', 'Name', 'In', 'Out'])
+        self.assertEqual((len(preview['rows']), preview['total']), (200, 250))
+        self.assertEqual(preview['rows'][0][:2], ['2024-03-04', 'Employé 000'])
+        self.assertIn('Note', preview['read_columns'])
+
+        with mock.patch('pointage.readers.read_table', side_effect=AssertionError('file parsed')):
+            response = self.client.get('/display/mars.csv/')
+            self.assertTrue(response.context['is_preview'])
+            self.assertEqual(len(response.context['rows']), 200)
+            data = self.client.get(f'/api/files/{self.uploaded.id}/preview/').json()
+        self.assertEqual((len(data['rows']), data['total']), (10, 250))
+        self.assertEqual(data['rows'][9][1], 'Employé 009')
+
+        other = User.objects.create_user(username='other', password='otherpass123')
+        self.client.force_login(other)
+        self.assertEqual(self.client.get(f'/api/files/{self.uploaded.id}/preview/').status_code, 403)
+
+    def test_full_viewer_is_windowed(self):
+        response = self.client.get('/display/mars.csv/', {'full': 1, 'page': 2})
+        self.assertEqual(response.context['total'], 250)
+        self.assertEqual([row[1] for row in response.context['rows']][:2], ['Employé 200', 'Employé 201'])
+        self.assertEqual(len(response.context['rows']), 50)
+
+        response = self.client.get('/display/mars.csv/', {'filter_col': 'Name', 'search': 'Employé 24'})
+        self.assertEqual(response.context['total'], 10)
+        self.assertIn('search=', response.context['query'])
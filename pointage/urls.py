@@ -12,10 +12,13 @@ urlpatterns = [
     path('heures-supplementaires/', views.heures_supplementaires, name='heures_supplementaires'),
     path('heures-supplementaires/<path:filename>/', views.heures_supplementaires_file, name='heures_supplementaires_file'),
     path('statistique/', views.statistique, name='statistique'),
+    path('alertes/', views.alertes_heures_sup, name='alertes_heures_sup'),
     
     # Manager management URLs
     path('managers/', views.manager_list, name='manager_list'),
     path('managers/add/', views.manager_create, name='manager_create'),
+    path('managers/import/', views.manager_import, name='manager_import'),
+    path('managers/bulk/', views.manager_bulk_action, name='manager_bulk_action'),
     path('managers/<int:pk>/edit/', views.manager_edit, name='manager_edit'),
     path('managers/<int:pk>/toggle-active/', views.manager_toggle_active, name='manager_toggle_active'),
     path('managers/<int:pk>/delete/', views.manager_delete, name='manager_delete'),
@@ -24,4 +27,7 @@ urlpatterns = [
     path('display/<path:filename>/', views.display_excel, name='display_excel'),
     path('api/person-hours/', views.get_person_hours_data, name='person_hours_data'),
     path('api/pie-chart/', views.pie_chart_data, name='pie_chart_data'),
+    path('api/employees/search/', views.employee_search, name='employee_search'),
+    path('api/managers/bulk/', views.manager_bulk_api, name='manager_bulk_api'),
+    path('api/files/<int:file_id>/preview/', views.file_preview, name='file_preview'),
 ]
\ No newline at end of file
@@ -1,7 +1,6 @@
 import os
 from django.core.exceptions import ValidationError
 from django.conf import settings
-import pandas as pd
 from io import BytesIO
 
 # Try to import magic, but make it optional
@@ -11,16 +10,18 @@ try:
 except ImportError:
     MAGIC_AVAILABLE = False
 
-def validate_excel_file(file):
+def validate_excel_file(file, check_size=True):
     """
     Validate uploaded Excel files for security and format
+
+    ``check_size=False`` waives the upload size limit (server-side bulk imports).
     """
     # Check file size
-    if file.size > getattr(settings, 'MAX_UPLOAD_SIZE', 10 * 1024 * 1024):  # 10MB default
+    if check_size and file.size > getattr(settings, 'MAX_UPLOAD_SIZE', 10 * 1024 * 1024):  # 10MB default
         raise ValidationError(f'File size must be under {getattr(settings, "MAX_UPLOAD_SIZE", 10 * 1024 * 1024) // (1024 * 1024)}MB.')
     
     # Check file extension
-    allowed_extensions = getattr(settings, 'ALLOWED_EXCEL_EXTENSIONS', ['.xlsx', '.xls'])
+    allowed_extensions = getattr(settings, 'ALLOWED_EXCEL_EXTENSIONS', ['.xlsx', '.xls', '.csv', '.parquet', '.arrow', '.feather'])
     file_extension = os.path.splitext(file.name)[1].lower()
     
     if file_extension not in allowed_extensions:
@@ -40,10 +41,13 @@ def validate_excel_file(file):
                 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',  # .xlsx
                 'application/vnd.ms-excel',  # .xls
                 'application/octet-stream',  # Some systems report this for Excel files
+                'text/csv',  # .csv
+                'text/plain',  # .csv (libmagic)
+                'application/vnd.apache.parquet',  # .parquet
             ]
             
             if mime_type not in allowed_mime_types:
-                raise ValidationError('Invalid file type. Only Excel files are allowed.')
+                raise ValidationError('Invalid file type. Only Excel, CSV or Parquet/Arrow files are allowed.')
                 
         except Exception as e:
             raise ValidationError(f'Error validating file: {str(e)}')
@@ -66,7 +70,9 @@ def validate_excel_file(file):
     # Validate Excel file structure
     try:
         # Try to read the Excel file to ensure it's valid
-        df = pd.read_excel(file, nrows=1)  # Read only first row to check structure
+        from .readers import read_table  # pandas chargé à la demande (démarrage rapide)
+        df = read_table(file, name=file.name, nrows=1)  # Read only first row to check structure
+        file.seek(0)
         
         # Check for required columns (case insensitive)
         required_columns = ['date', 'name', 'in', 'out']
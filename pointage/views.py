@@ -1,18 +1,15 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.core.files.storage import FileSystemStorage
-import pandas as pd
 import os
 import glob
 import json
-from datetime import datetime, timedelta
-import math
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required, permission_required
 from django.contrib.auth.models import User, Group
-from django.db.models import Q
-from .models import UploadedExcel, ManagerProfile
+from django.db.models import F
+from .models import UploadedExcel, ManagerProfile, Employee, Department, TimeEntry
 from .forms import ManagerCreationForm, ManagerEditForm, UserSettingsForm
-from urllib.parse import unquote
+from urllib.parse import unquote, urlencode
 from django.http import HttpResponseForbidden
 import calendar
 from django.core.paginator import Paginator
@@ -20,6 +17,11 @@ from django.contrib.auth.forms import PasswordChangeForm
 from django.contrib.auth import update_session_auth_hash
 from django.http import JsonResponse
 from .validators import validate_excel_file, sanitize_filename
+from .ingestion import content_hash, ensure_ingested, ingest_uploaded_file, normalize_key
+from .search import search_employees, search_managers
+from .provisioning import bulk_manager_action, provision_managers, read_manager_csv
+from .cache import fragment_key, fragment_timeout, user_scope
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
 from django.contrib.auth import authenticate, login
 from django.views.decorators.csrf import csrf_exempt
@@ -30,6 +32,19 @@ from django.conf import settings
 UPLOAD_DIR = settings.MEDIA_ROOT
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
+MANAGERS_PER_PAGE = 25
+FILES_PER_PAGE = 25
+# Tri de la liste des fichiers : paramètre ?sort= -> (libellé, champ)
+FILE_SORTS = {
+    'name': ('Fichier', 'file'),
+    'date': ('Importé le', 'uploaded_at'),
+    'period': ('Période', 'date_min'),
+    'rows': ('Lignes', 'row_count'),
+    'employees': ('Employés', 'employee_count'),
+    'overtime': ('Heures sup', 'overtime_total'),
+    'size': ('Taille', 'file_size'),
+}
+
 MONTH_NAMES_FR = {
     1: "Janvier", 2: "Février", 3: "Mars", 4: "Avril", 5: "Mai", 6: "Juin",
     7: "Juillet", 8: "Août", 9: "Septembre", 10: "Octobre", 11: "Novembre", 12: "Décembre"
@@ -73,8 +88,17 @@ def import_excel(request):
             # Save file to UploadedExcel model
             uploaded = UploadedExcel.objects.create(
                 file=excel_file,
-                uploaded_by=request.user
+                uploaded_by=request.user,
+                content_hash=content_hash(excel_file),
             )
+            try:
+                ingest_uploaded_file(uploaded)
+            except Exception as e:
+                # Fichier illisible : ne pas le conserver comme un import vide
+                uploaded.file.delete(save=False)
+                uploaded.delete()
+                messages.error(request, f'Error reading file: {str(e)}')
+                return render(request, 'pointage/import_excel.html')
             messages.success(request, f'File "{sanitized_filename}" uploaded successfully.')
             return redirect('pointage:display_excel', filename=uploaded.file.name.split('/')[-1])
             
@@ -103,40 +127,102 @@ def display_excel(request, filename):
                 messages.error(request, f'File "{filename}" not found.')
                 return redirect('pointage:list_excels')
     
-    # Use Django's file storage to open the file
+    filter_col = request.GET.get('filter_col', '')
+    search = request.GET.get('search', '')
+    filtering = bool(filter_col and search)
+    preview = uploaded_file.preview
+
+    # Aperçu stocké à l'ingestion : affichage immédiat, sans relire le classeur
+    if preview and not filtering and not request.GET.get('full'):
+        return render(request, 'pointage/display_excel.html', {
+            'filename': filename,
+            'file_id': uploaded_file.id,
+            'columns': preview['columns'],
+            'rows': preview['rows'],
+            'total': preview['total'],
+            'colonnes_lues': preview['read_columns'],
+            'message': '' if preview['columns'] else _missing_columns_message(preview['read_columns']),
+            'is_preview': True,
+        })
+
+    # Visionneuse complète, une fenêtre de VIEWER_ROWS lignes à la fois
+    from .preview import VIEWER_ROWS, detected_columns, table_rows  # pandas chargé à la demande (démarrage rapide)
+    from .readers import read_table
+    from .schema import inspect_schema, schema_columns
+
+    page_obj, nrows = None, None
+    if preview and not filtering:
+        # Nombre de lignes connu : inutile de lire le fichier au-delà de la fenêtre demandée
+        page_obj = Paginator(range(preview['total']), VIEWER_ROWS).get_page(request.GET.get('page', 1))
+        nrows = max(page_obj.object_list.stop, 1)
     try:
         with uploaded_file.file.open('rb') as file:
-            df = pd.read_excel(file)
+            df = read_table(file, name=uploaded_file.file.name, nrows=nrows)
     except Exception as e:
         messages.error(request, f'Error reading file: {str(e)}')
         return redirect('pointage:list_excels')
-    colonnes_voulues = ["date", "name", "in", "out"]
-    mapping = {col.lower(): col for col in df.columns}
-    colonnes_presentes = [mapping[c] for c in colonnes_voulues if c in mapping]
-    colonnes_lues = list(df.columns)
-    filter_col = request.GET.get('filter_col', '')
-    search = request.GET.get('search', '')
+    cols = schema_columns(df, uploaded_file.schema) or schema_columns(df, inspect_schema(df))
+    by_name = {str(col): col for col in df.columns}
+    colonnes_lues = list(by_name)
+    columns = detected_columns(cols)
+    if not columns:
+        return render(request, 'pointage/display_excel.html', {
+            'filename': filename, 'file_id': uploaded_file.id, 'colonnes_lues': colonnes_lues,
+            'message': _missing_columns_message(colonnes_lues),
+        })
 
     # Filtrage par colonne (sur la vraie casse)
-    if filter_col and filter_col in df.columns and search:
-        df = df[df[filter_col].astype(str).str.contains(search, case=False, na=False)]
-
-    # Affichage seulement des colonnes voulues si elles existent
-    if colonnes_presentes:
-        df = df[[col for col in colonnes_presentes if col in df.columns]]
-        message = ''
-    else:
-        message = "Aucune des colonnes 'date', 'name', 'in', 'out' n'a été trouvée dans le fichier importé.\nColonnes trouvées : " + ", ".join(colonnes_lues)
-        return render(request, 'pointage/display_excel.html', {'data': '', 'filename': filename, 'message': message, 'colonnes_lues': colonnes_lues, 'filter_col': filter_col, 'search': search})
-
-    data = df.to_html(classes=['table', 'table-striped', 'custom-table'], index=False)
+    if filtering and filter_col in by_name:
+        df = df[df[by_name[filter_col]].astype(str).str.contains(search, case=False, na=False)]
+    if page_obj is None:
+        page_obj = Paginator(range(len(df)), VIEWER_ROWS).get_page(request.GET.get('page', 1))
+    window = page_obj.object_list
+    query = {'full': 1}
+    if filtering:
+        query.update(filter_col=filter_col, search=search)
     return render(request, 'pointage/display_excel.html', {
-        'data': data,
         'filename': filename,
-        'message': message,
+        'file_id': uploaded_file.id,
+        'columns': [str(col) for col in columns],
+        'rows': table_rows(df.iloc[window.start:window.stop], columns),
+        'total': page_obj.paginator.count,
         'colonnes_lues': colonnes_lues,
         'filter_col': filter_col,
         'search': search,
+        'page_obj': page_obj,
+        'query': urlencode(query),
+    })
+
+def _missing_columns_message(colonnes_lues):
+    return (
+        "Aucune des colonnes 'date', 'name', 'in', 'out' n'a été trouvée dans le fichier importé.\n"
+        "Colonnes trouvées : " + ", ".join(colonnes_lues)
+    )
+
+@login_required
+def file_preview(request, file_id):
+    """
+    Stored preview of an uploaded file, for the hover previews of the file list
+
+    Query Parameters:
+    - rows: number of rows returned (default 10, max PREVIEW_ROWS)
+    """
+    from .preview import PREVIEW_ROWS
+    uploaded_file = get_object_or_404(UploadedExcel.objects.only('id', 'file', 'uploaded_by', 'preview'), id=file_id)
+    user = request.user
+    if user != uploaded_file.uploaded_by and not (user.is_superuser or user.groups.filter(name='Admin').exists()):
+        return HttpResponseForbidden("Vous n'avez pas accès à ce fichier.")
+    try:
+        rows = min(max(int(request.GET.get('rows', 10)), 1), PREVIEW_ROWS)
+    except ValueError:
+        rows = 10
+    # Fichier importé avant l'aperçu : la page du fichier reste disponible
+    preview = uploaded_file.preview or {'columns': [], 'rows': [], 'total': None}
+    return JsonResponse({
+        'filename': uploaded_file.file.name.replace('uploads/', '', 1),
+        'columns': preview['columns'],
+        'rows': preview['rows'][:rows],
+        'total': preview['total'],
     })
 
 @login_required
@@ -146,7 +232,25 @@ def list_excels(request):
         files = UploadedExcel.objects.all()
     else:
         files = UploadedExcel.objects.filter(uploaded_by=user)
-    return render(request, 'pointage/list_excels.html', {'files': files})
+
+    # Tout vient du résumé stocké à l'ingestion : aucun classeur n'est relu ici
+    sort = request.GET.get('sort', '-date')
+    key = sort.lstrip('-')
+    if key not in FILE_SORTS:
+        sort, key = '-date', 'date'
+    field = F(FILE_SORTS[key][1])
+    order = field.desc(nulls_last=True) if sort.startswith('-') else field.asc(nulls_last=True)
+    files = files.select_related('uploaded_by').defer('preview').order_by(order, '-id')
+    page_obj = Paginator(files, FILES_PER_PAGE).get_page(request.GET.get('page', 1))
+
+    columns = [
+        {'key': column, 'label': label, 'sort': column if sort != column else f'-{column}',
+         'active': '▲' if sort == column else '▼' if sort == f'-{column}' else ''}
+        for column, (label, _) in FILE_SORTS.items()
+    ]
+    return render(request, 'pointage/list_excels.html', {
+        'files': page_obj, 'page_obj': page_obj, 'sort': sort, 'columns': columns,
+    })
 
 @login_required
 def delete_excel(request, file_id):
@@ -171,16 +275,13 @@ def accueil(request):
 @login_required
 @permission_required('pointage.can_manage_managers', raise_exception=True)
 def manager_list(request):
-    query = request.GET.get('q', '')
-    managers = User.objects.filter(
-        Q(username__icontains=query) |
-        Q(first_name__icontains=query) |
-        Q(last_name__icontains=query) |
-        Q(email__icontains=query)
-    ).order_by('-date_joined')
-    
+    query = request.GET.get('q', '').strip()
+    managers = search_managers(User.objects.select_related('managerprofile'), query).order_by('-date_joined', '-id')
+    page_obj = Paginator(managers, MANAGERS_PER_PAGE).get_page(request.GET.get('page', 1))
+
     context = {
-        'managers': managers,
+        'managers': page_obj,
+        'page_obj': page_obj,
         'query': query
     }
     return render(request, 'pointage/manager_list.html', context)
@@ -202,6 +303,62 @@ def manager_create(request):
         'title': 'Add New Manager'
     })
 
+@login_required
+@permission_required('pointage.can_manage_managers', raise_exception=True)
+def manager_import(request):
+    """Bulk creation of managers from an uploaded CSV file."""
+    if request.method == 'POST' and request.FILES.get('managers_csv'):
+        try:
+            result = provision_managers(read_manager_csv(request.FILES['managers_csv']))
+        except (ValidationError, UnicodeDecodeError) as e:
+            messages.error(request, f'Import failed: {e}')
+            return redirect('pointage:manager_list')
+        messages.success(request, f'{len(result["created"])} manager(s) created.')
+        if result['skipped']:
+            messages.warning(request, f'{len(result["skipped"])} existing username(s) skipped.')
+        for line, message in result['errors'][:10]:
+            messages.error(request, f'Line {line}: {message}')
+    return redirect('pointage:manager_list')
+
+@login_required
+@permission_required('pointage.can_manage_managers', raise_exception=True)
+def manager_bulk_action(request):
+    """Apply one action to the managers ticked in the list."""
+    if request.method == 'POST':
+        action = request.POST.get('action', '')
+        try:
+            affected = bulk_manager_action(
+                action, request.POST.getlist('selected'), request.user, request.POST.get('department', ''),
+            )
+        except (ValidationError, ValueError) as e:
+            messages.error(request, f'Bulk action failed: {e}')
+        else:
+            messages.success(request, f'{affected} manager(s) updated ({action}).')
+    return redirect('pointage:manager_list')
+
+@login_required
+@permission_required('pointage.can_manage_managers', raise_exception=True)
+def manager_bulk_api(request):
+    """
+    JSON API for scripted bulk actions.
+
+    POST body: {"action": "activate" | "deactivate" | "delete" | "department",
+    "ids": [user ids], "department": "..."} -> {"action": ..., "affected": n}
+    """
+    if request.method != 'POST':
+        return JsonResponse({'error': 'POST required'}, status=405)
+    try:
+        payload = json.loads(request.body or b'{}')
+        ids = payload.get('ids', [])
+        if not isinstance(ids, list):
+            raise ValueError('"ids" must be a list')
+        affected = bulk_manager_action(payload.get('action', ''), ids, request.user, payload.get('department') or '')
+    except ValidationError as e:
+        return JsonResponse({'error': ' '.join(e.messages)}, status=400)
+    except (ValueError, TypeError, AttributeError) as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return JsonResponse({'action': payload['action'], 'affected': affected})
+
 @login_required
 @permission_required('pointage.can_manage_managers', raise_exception=True)
 def manager_edit(request, pk):
@@ -242,6 +399,54 @@ def manager_delete(request, pk):
         return redirect('pointage:manager_list')
     return render(request, 'pointage/manager_confirm_delete.html', {'manager': user})
 
+def _overtime_store(excel_files):
+    """Overtime rows of the given files, ingesting any file uploaded before ingestion existed."""
+    # NumPy/pandas ne sont importés qu'à la première page de données (démarrage rapide)
+    from .rowstore import OvertimeStore
+    ensure_ingested(excel_files)
+    return OvertimeStore.from_entries(TimeEntry.objects.filter(uploaded_file__in=excel_files))
+
+def _cached_payload(excel_files, key_parts, build):
+    """
+    Cached result of ``build(store)`` for the overtime store of ``excel_files``,
+    under ``fragment_key(*key_parts)``. A cache hit costs no file query.
+    """
+    cache_key = fragment_key(*key_parts)
+    payload = cache.get(cache_key)
+    if payload is None:
+        # Fichiers anciens ingérés sur un défaut de cache seulement : l'ingestion change la version
+        if ensure_ingested(excel_files):
+            cache_key = fragment_key(*key_parts)
+        payload = build(_overtime_store(excel_files))
+        cache.set(cache_key, payload, fragment_timeout())
+    return payload
+
+def _id_param(request, name):
+    """Integer id from the query string, or None when absent/invalid."""
+    try:
+        return int(request.GET.get(name, ''))
+    except ValueError:
+        return None
+
+def _employee_name(employee_id, excel_files):
+    """
+    Display name of the selected employee, to prefill the typeahead field;
+    empty when the employee does not appear in ``excel_files`` (the user's scope).
+    """
+    if employee_id is None:
+        return ''
+    return Employee.objects.filter(
+        pk=employee_id, entries__uploaded_file__in=excel_files,
+    ).values_list('name', flat=True).first() or ''
+
+def _month_filter(value):
+    """Parse a ``YYYY-M`` / ``YYYY-MM`` filter value into (year, month), or (None, None)."""
+    try:
+        year, month = map(int, value.split('-'))
+        return year, month
+    except (ValueError, AttributeError):
+        return None, None
+
 @login_required
 def heures_supplementaires(request):
     user = request.user
@@ -250,119 +455,24 @@ def heures_supplementaires(request):
     else:
         excel_files = UploadedExcel.objects.filter(uploaded_by=user)
 
-    resultats = []
-    for uploaded_file in excel_files:
-        try:
-            with uploaded_file.file.open('rb') as file:
-                df = pd.read_excel(file)
-            mapping = {col.lower().strip(): col for col in df.columns}
-
-            name_col = mapping.get('name')
-            in_col = mapping.get('in')
-            out_col = mapping.get('out')
-            date_col = mapping.get('date')
-            dept_col = mapping.get('département') or mapping.get('department')
-            
-            if not all([name_col, in_col, out_col, date_col]):
-                continue
-
-            processed_rows = 0
-            skipped_rows = 0
-            overtime_found = 0
-            
-            for idx, row in df.iterrows():
-                try:
-                    heure_in = str(row[in_col]).strip()
-                    heure_out = str(row[out_col]).strip()
-                    if not heure_in or not heure_out or heure_in.lower() == 'nan' or heure_out.lower() == 'nan' or heure_in == '-' or heure_out == '-':
-                        skipped_rows += 1
-                        continue
-                    try:
-                        t_in = datetime.strptime(heure_in, '%H:%M') if len(heure_in) <= 5 else datetime.strptime(heure_in, '%H:%M:%S')
-                        t_out = datetime.strptime(heure_out, '%H:%M') if len(heure_out) <= 5 else datetime.strptime(heure_out, '%H:%M:%S')
-                    except ValueError:
-                        skipped_rows += 1
-                        continue
-                    duree = (t_out - t_in)
-                    if duree < timedelta(0):
-                        duree += timedelta(days=1)
-                    heures_travaillees = duree.total_seconds() / 3600
-                    heures_travaillees_arr = math.ceil(heures_travaillees)
-                    # Déterminer le jour de la semaine
-                    date_val = row[date_col]
-                    date_obj = None
-                    if isinstance(date_val, datetime):
-                        date_obj = date_val
-                    else:
-                        date_str = str(date_val)
-                        for fmt in ("%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y", "%Y/%m/%d", "%m/%d/%Y"):
-                            try:
-                                date_obj = datetime.strptime(date_str, fmt)
-                                break
-                            except Exception:
-                                continue
-                        if not date_obj:
-                            skipped_rows += 1
-                            continue  # Si aucun format ne marche, ignorer la ligne
-                    if date_obj.weekday() in [5, 6]:  # 5=Samedi, 6=Dimanche
-                        heures_sup = heures_travaillees_arr
-                    else:
-                        heures_sup = max(0, heures_travaillees_arr - 8)
-                    if heures_sup > 0:
-                        overtime_found += 1
-                        employee_name_raw = str(row[name_col]).strip()
-                        department = str(row[dept_col]) if dept_col and pd.notna(row[dept_col]) else None
-                        resultats.append({
-                            'nom': employee_name_raw,
-                            'department': department,
-                            'date': row[date_col],
-                            'date_obj': date_obj, # Add datetime object for filtering
-                            'in': heure_in,
-                            'out': heure_out,
-                            'heures_sup': heures_sup,
-                            'weekend': date_obj.weekday() in [5, 6],
-                        })
-                    processed_rows += 1
-                except Exception as e:
-                    print(f"DEBUG: Error processing row {idx}: {e}")
-                    skipped_rows += 1
-                    continue
-                    
-            pass
-        except Exception as e:
-            continue
-    
-    all_names = sorted(list(set(str(r['nom']) for r in resultats)))
-    all_departments = sorted(list(set(r['department'] for r in resultats if r.get('department'))))
-    available_dates = {r['date_obj'] for r in resultats if r.get('date_obj')}
-    unique_year_months = sorted(list(set((d.year, d.month) for d in available_dates)), reverse=True)
-    available_months = [(f"{year}-{month}", f"{MONTH_NAMES_FR[month]} {year}") for year, month in unique_year_months]
+    store = _overtime_store(excel_files)
+    available_months = [(f"{year}-{month}", f"{MONTH_NAMES_FR[month]} {year}") for year, month in store.available_months()]
 
-    filter_nom = request.GET.get('filter_nom', '').strip()
+    filter_employee = _id_param(request, 'filter_employee')
     filter_month_year = request.GET.get('filter_month_year', '').strip()
-    filter_department = request.GET.get('filter_department', '').strip()
+    filter_department = _id_param(request, 'filter_department')
+    year, month = _month_filter(filter_month_year)
 
-    if filter_nom:
-        resultats = [r for r in resultats if str(r['nom']) == filter_nom]
-    if filter_department:
-        resultats = [r for r in resultats if r.get('department') == filter_department]
-    if filter_month_year:
-        try:
-            year, month = map(int, filter_month_year.split('-'))
-            resultats = [r for r in resultats if r.get('date_obj') and r['date_obj'].year == year and r['date_obj'].month == month]
-        except ValueError:
-            pass
-
-    total_heures_sup = sum(r['heures_sup'] for r in resultats)
+    resultats = store.filter(employee=filter_employee, department=filter_department, year=year, month=month)
     return render(request, 'pointage/heures_supplementaires.html', {
         'resultats': resultats,
-        'filter_nom': filter_nom,
+        'filter_employee': filter_employee,
+        'filter_employee_name': _employee_name(filter_employee, excel_files),
         'filter_month_year': filter_month_year,
         'filter_department': filter_department,
-        'total_heures_sup': total_heures_sup,
-        'all_names': all_names,
+        'total_heures_sup': resultats.total_heures_sup(),
         'available_months': available_months,
-        'all_departments': all_departments
+        'all_departments': store.department_choices()
     })
 
 @login_required
@@ -383,131 +493,55 @@ def heures_supplementaires_file(request, filename):
             except UploadedExcel.DoesNotExist:
                 messages.error(request, f'File "{filename}" not found.')
                 return redirect('pointage:list_excels')
-    
-    resultats = []
-    try:
-        # Use Django's file storage to open the file
-        with uploaded_file.file.open('rb') as file:
-            df = pd.read_excel(file)
-        mapping = {col.lower().strip(): col for col in df.columns}
-
-        name_col = mapping.get('name')
-        in_col = mapping.get('in')
-        out_col = mapping.get('out')
-        date_col = mapping.get('date')
-        dept_col = mapping.get('département') or mapping.get('department')
-        
-        if not all([name_col, in_col, out_col, date_col]):
-            return render(request, 'pointage/heures_supplementaires.html', {'resultats': [], 'error': 'Colonnes requises manquantes.'})
 
-        processed_rows = 0
-        skipped_rows = 0
-        overtime_found = 0
-        
-        for idx, row in df.iterrows():
-            try:
-                heure_in = str(row[in_col]).strip()
-                heure_out = str(row[out_col]).strip()
-                
-                if not heure_in or not heure_out or heure_in.lower() == 'nan' or heure_out.lower() == 'nan' or heure_in == '-' or heure_out == '-':
-                    skipped_rows += 1
-                    continue
-                    
-                try:
-                    t_in = datetime.strptime(heure_in, '%H:%M') if len(heure_in) <= 5 else datetime.strptime(heure_in, '%H:%M:%S')
-                    t_out = datetime.strptime(heure_out, '%H:%M') if len(heure_out) <= 5 else datetime.strptime(heure_out, '%H:%M:%S')
-                except ValueError:
-                    skipped_rows += 1
-                    continue
-                    
-                duree = (t_out - t_in)
-                if duree < timedelta(0):
-                    duree += timedelta(days=1)
-                heures_travaillees = duree.total_seconds() / 3600
-                heures_travaillees_arr = math.ceil(heures_travaillees)
-                
-                date_val = row[date_col]
-                date_obj = None
-                if isinstance(date_val, datetime):
-                    date_obj = date_val
-                else:
-                    date_str = str(date_val)
-                    for fmt in ("%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y", "%Y/%m/%d", "%m/%d/%Y"):
-                        try:
-                            date_obj = datetime.strptime(date_str, fmt)
-                            break
-                        except Exception:
-                            continue
-                    if not date_obj:
-                        skipped_rows += 1
-                        continue
-                        
-                if date_obj.weekday() in [5, 6]:
-                    heures_sup = heures_travaillees_arr
-                else:
-                    heures_sup = max(0, heures_travaillees_arr - 8)
-                    
-                if heures_sup > 0:
-                    overtime_found += 1
-                    employee_name_raw = str(row[name_col]).strip()
-                    department = str(row[dept_col]) if dept_col and pd.notna(row[dept_col]) else None
-                    resultats.append({
-                        'nom': employee_name_raw,
-                        'department': department,
-                        'date': row[date_col],
-                        'date_obj': date_obj,
-                        'in': heure_in,
-                        'out': heure_out,
-                        'heures_sup': heures_sup,
-                        'weekend': date_obj.weekday() in [5, 6],
-                    })
-                    
-                processed_rows += 1
-                
-            except Exception as e:
-                skipped_rows += 1
-                continue
-    except Exception as e:
-        pass
-        
-    all_names = sorted(list(set(str(r['nom']) for r in resultats)))
-    all_departments = sorted(list(set(r['department'] for r in resultats if r.get('department'))))
-    available_dates = {r['date_obj'] for r in resultats if r.get('date_obj')}
-    unique_year_months = sorted(list(set((d.year, d.month) for d in available_dates)), reverse=True)
-    available_months = [(f"{year}-{month}", f"{MONTH_NAMES_FR[month]} {year}") for year, month in unique_year_months]
-    
-    total_heures_sup_all = sum(r['heures_sup'] for r in resultats)
-    
-    filter_nom = request.GET.get('filter_nom', '').strip()
+    store = _overtime_store([uploaded_file])
+    available_months = [(f"{year}-{month}", f"{MONTH_NAMES_FR[month]} {year}") for year, month in store.available_months()]
+
+    filter_employee = _id_param(request, 'filter_employee')
     filter_month_year = request.GET.get('filter_month_year', '').strip()
-    filter_department = request.GET.get('filter_department', '').strip()
-    
-    filtered_resultats = resultats
-    
-    if filter_nom:
-        filtered_resultats = [r for r in filtered_resultats if str(r['nom']) == filter_nom]
-    if filter_department:
-        filtered_resultats = [r for r in filtered_resultats if r.get('department') == filter_department]
-    if filter_month_year:
-        try:
-            year, month = map(int, filter_month_year.split('-'))
-            filtered_resultats = [r for r in filtered_resultats if r.get('date_obj') and r['date_obj'].year == year and r['date_obj'].month == month]
-        except ValueError:
-            pass
+    filter_department = _id_param(request, 'filter_department')
+    year, month = _month_filter(filter_month_year)
+
+    filtered_resultats = store.filter(employee=filter_employee, department=filter_department, year=year, month=month)
 
-    total_heures_sup_filtered = sum(r['heures_sup'] for r in filtered_resultats)
-    
     return render(request, 'pointage/heures_supplementaires.html', {
         'resultats': filtered_resultats,
-        'total_heures_sup': total_heures_sup_filtered,
-        'total_heures_sup_all': total_heures_sup_all,
+        'total_heures_sup': filtered_resultats.total_heures_sup(),
+        'total_heures_sup_all': store.total_heures_sup(),
         'filename': filename,
-        'filter_nom': filter_nom,
+        'filter_employee': filter_employee,
+        'filter_employee_name': _employee_name(filter_employee, [uploaded_file]),
         'filter_month_year': filter_month_year,
         'filter_department': filter_department,
-        'all_names': all_names,
         'available_months': available_months,
-        'all_departments': all_departments
+        'all_departments': store.department_choices()
+    })
+
+@login_required
+def alertes_heures_sup(request):
+    """Employees whose weekly or rolling multi-week overtime exceeds the configured caps"""
+    user = request.user
+    if user.is_superuser or user.groups.filter(name='Admin').exists():
+        excel_files = UploadedExcel.objects.all()
+    else:
+        excel_files = UploadedExcel.objects.filter(uploaded_by=user)
+
+    from .overtime import overtime_cap_alerts, overtime_caps
+    weekly_cap, rolling_weeks, rolling_cap = overtime_caps()
+    try:
+        weekly_cap = int(request.GET.get('weekly_cap', weekly_cap))
+        rolling_cap = int(request.GET.get('rolling_cap', rolling_cap))
+        rolling_weeks = max(1, int(request.GET.get('rolling_weeks', rolling_weeks)))
+    except ValueError:
+        messages.error(request, 'Les plafonds doivent être des nombres entiers.')
+
+    frame = _overtime_store(excel_files).to_frame()
+    alertes = overtime_cap_alerts(frame, weekly_cap, rolling_cap, rolling_weeks)
+    return render(request, 'pointage/alertes_heures_sup.html', {
+        'alertes': alertes,
+        'weekly_cap': weekly_cap,
+        'rolling_cap': rolling_cap,
+        'rolling_weeks': rolling_weeks,
     })
 
 from django.contrib.auth.decorators import user_passes_test
@@ -557,14 +591,10 @@ def get_person_hours_data(request):
     API endpoint to get hours data for a specific person or department
     
     Query Parameters:
-    - person: Filter by person name
-    - department: Filter by department name
+    - employee: Filter by employee id (or person: by name, matched on the normalized key)
+    - department: Filter by department id or name
     - month: Filter by month in YYYY-MM format
     """
-    from django.http import JsonResponse
-    from .models import UploadedExcel
-    from collections import defaultdict
-    
     user = request.user
     if user.is_superuser or user.groups.filter(name='Admin').exists():
         files = UploadedExcel.objects.all()
@@ -575,209 +605,104 @@ def get_person_hours_data(request):
     department_filter = request.GET.get('department')
     month_filter = request.GET.get('month')
     
-    # Remove the restriction: if neither is present, return all data
     # Parse month filter if provided (format: YYYY-MM)
     filter_year = None
     filter_month = None
     if month_filter:
-        try:
-            filter_year, filter_month = map(int, month_filter.split('-'))
-        except (ValueError, AttributeError):
+        filter_year, filter_month = _month_filter(month_filter)
+        if filter_year is None:
             return JsonResponse({'error': 'Invalid month format. Use YYYY-MM'}, status=400)
-    
-    # Get all records matching the criteria
-    records = []
-    for uploaded_file in files:
-        try:
-            with uploaded_file.file.open('rb') as file:
-                df = pd.read_excel(file)
-            mapping = {col.lower().strip(): col for col in df.columns}
-            
-            # Check if required columns exist
-            required_cols = ['date', 'in', 'out']
-            if not all(col in mapping for col in required_cols):
-                continue
-                
-            # Filter for the specific person if specified
-            if person_name:
-                name_col = mapping.get('name')
-                if not name_col:
-                    continue
-                df = df[df[name_col].astype(str).str.strip().str.lower() == person_name.lower()]
-            
-            # Filter by department if specified
-            if department_filter:
-                dept_col = mapping.get('département') or mapping.get('department')
-                if not dept_col:
-                    continue
-                df = df[df[dept_col].astype(str).str.strip().str.lower() == department_filter.lower()]
-            
-            # Process each record
-            for _, row in df.iterrows():
-                try:
-                    date_val = row[mapping['date']]
-                    
-                    # Skip if date is not a valid datetime
-                    if not isinstance(date_val, (datetime, pd.Timestamp)) or pd.isna(date_val):
-                        continue
-                    
-                    # Filter by month if specified
-                    if filter_year is not None and filter_month is not None:
-                        if date_val.year != filter_year or date_val.month != filter_month:
-                            continue
-                    
-                    heure_in = str(row[mapping['in']]).strip()
-                    heure_out = str(row[mapping['out']]).strip()
-                    
-                    if not all([heure_in, heure_out, heure_in.lower() != 'nan', heure_out.lower() != 'nan']):
-                        continue
-                        
-                    t_in = datetime.strptime(heure_in, '%H:%M') if len(heure_in) <= 5 else datetime.strptime(heure_in, '%H:%M:%S')
-                    t_out = datetime.strptime(heure_out, '%H:%M') if len(heure_out) <= 5 else datetime.strptime(heure_out, '%H:%M:%S')
-                    
-                    duree = (t_out - t_in)
-                    if duree < timedelta(0):
-                        duree += timedelta(days=1)
-                    
-                    # Calculate overtime hours
-                    heures_travaillees = duree.total_seconds() / 3600
-                    heures_travaillees_arr = math.ceil(heures_travaillees)
-                    
-                    # Check if it's a weekend (5=Saturday, 6=Sunday)
-                    if date_val.weekday() in [5, 6]:
-                        heures_sup = heures_travaillees_arr
-                    else:
-                        heures_sup = max(0, heures_travaillees_arr - 8)
-                    
-                    # Only include days with overtime
-                    if heures_sup > 0:
-                        # Get the person's name if available
-                        name = row.get(mapping.get('name', ''), '')
-                        records.append({
-                            'date': date_val,
-                            'hours': heures_sup,  # Use overtime hours instead of total hours
-                            'name': str(name) if not pd.isna(name) else ''
-                        })
-                    
-                except (ValueError, KeyError) as e:
-                    continue
-                    
-        except Exception as e:
-            continue
-    
-    # If a specific person is filtered, return overtime per day (current behavior)
-    if person_name:
-        date_hours = defaultdict(float)
-        for record in records:
-            date_str = record['date'].strftime('%Y-%m-%d')
-            date_hours[date_str] += record['hours']
-        sorted_dates = sorted(date_hours.items())
+
+    # Unknown names resolve to id 0, which matches no row
+    employee_id = _id_param(request, 'employee')
+    if employee_id is None and person_name:
+        employee_id = Employee.objects.filter(key=normalize_key(person_name)).values_list('id', flat=True).first() or 0
+    department_id = None
+    if department_filter:
+        if department_filter.isdigit():
+            department_id = int(department_filter)
+        else:
+            department_id = Department.objects.filter(key=normalize_key(department_filter)).values_list('id', flat=True).first() or 0
+
+    response_data = _cached_payload(
+        files,
+        ('person-hours', user_scope(user), employee_id, person_name, department_id, filter_year, filter_month),
+        lambda store: _person_hours_payload(store, employee_id, person_name, department_id, filter_year, filter_month),
+    )
+    return JsonResponse(response_data)
+
+def _person_hours_payload(store, employee_id, person_name, department_id, filter_year, filter_month):
+    store = store.filter(
+        employee=employee_id, department=department_id, year=filter_year, month=filter_month,
+    )
+
+    # If a specific person is filtered, return overtime per day
+    if employee_id is not None:
+        if not person_name and len(store):
+            person_name = store.names[store.rows['emp'][0]]
+        sorted_dates = store.totals_by_day()
         response_data = {
             'dates': [item[0] for item in sorted_dates],
-                'hours': [round(item[1], 2) for item in sorted_dates],
+            'hours': [round(item[1], 2) for item in sorted_dates],
         }
-        # Add name information if available
-        if records:
+        if sorted_dates:
             response_data['names'] = [person_name] * len(sorted_dates)
-        return JsonResponse(response_data)
+        return response_data
     
     # Otherwise, aggregate by employee name (for department/month filter or no filter)
-    name_hours = defaultdict(float)
-    for record in records:
-        name = record.get('name', '').strip()
-        if name:
-            name_hours[name] += record['hours']
-    sorted_names = sorted(name_hours.items(), key=lambda x: x[1], reverse=True)
-    response_data = {
-        'names': [item[0] for item in sorted_names],
-        'hours': [round(item[1], 2) for item in sorted_names],
+    name_hours = sorted(
+        ((s['nom'], s['total_heures_sup']) for s in store.totals_by_employee() if s['nom']),
+        key=lambda x: x[1], reverse=True,
+    )
+    return {
+        'names': [item[0] for item in name_hours],
+        'hours': [round(item[1], 2) for item in name_hours],
     }
-    return JsonResponse(response_data)
 
-def get_available_months():
-    """Generate a list of available months from the database"""
-    from .models import UploadedExcel
-    import pandas as pd
-    from datetime import datetime
-    
-    months = set()
-    print("\n=== Starting get_available_months() ===")
-    
-    # Check if there are any files
-    all_files = list(UploadedExcel.objects.all())
-    print(f"Found {len(all_files)} Excel files to process")
-    
-    for uploaded_file in all_files:
-        try:
-            print(f"\nProcessing file: {uploaded_file.file.name}")
-            print(f"File path: {uploaded_file.file.path}")
-            
-            # Check if file exists
-            import os
-            if not os.path.exists(uploaded_file.file.path):
-                print(f"File does not exist: {uploaded_file.file.path}")
-                continue
-                
-            # Read the Excel file
-            try:
-                with uploaded_file.file.open('rb') as file:
-                    df = pd.read_excel(file)
-                print(f"Successfully read Excel file")
-                print(f"Columns in file: {df.columns.tolist()}")
-                print(f"First few rows of data:\n{df.head()}")
-            except Exception as e:
-                print(f"Error reading Excel file: {e}")
-                continue
-            
-            # Create mapping of lowercase column names to original names
-            mapping = {str(col).lower().strip(): str(col) for col in df.columns}
-            print(f"Column mapping: {mapping}")
-            
-            # Check for possible date columns (case insensitive)
-            possible_date_cols = [col for col in mapping.keys() if 'date' in col.lower()]
-            print(f"Possible date columns: {possible_date_cols}")
-            
-            for date_col in (possible_date_cols or [None]):
-                date_col_name = mapping.get(date_col) if date_col else None
-                print(f"\nTrying date column: {date_col_name}")
-                
-                if date_col_name is not None and date_col_name in df.columns:
-                    print(f"Processing dates from column: {date_col_name}")
-                    
-                    # Make a copy to avoid SettingWithCopyWarning
-                    temp_df = df[[date_col_name]].copy()
-                    
-                    # Convert to datetime and drop NaT values
-                    temp_df['date'] = pd.to_datetime(temp_df[date_col_name], errors='coerce')
-                    temp_df = temp_df.dropna(subset=['date'])
-                    
-                    print(f"Found {len(temp_df)} valid dates in column")
-                    if not temp_df.empty:
-                        print(f"Date range: {temp_df['date'].min()} to {temp_df['date'].max()}")
-                    
-                    # Extract unique year-month combinations
-                    for date_val in temp_df['date']:
-                        try:
-                            if pd.notna(date_val):
-                                # Format as YYYY-MM and Month YYYY (in French)
-                                month_key = date_val.strftime('%Y-%m')
-                                month_display = date_val.strftime('%B %Y').capitalize()
-                                months.add((month_key, month_display))
-                                print(f"Added month: {month_key} - {month_display}")
-                        except Exception as e:
-                            print(f"Error processing date {date_val}: {e}")
-                else:
-                    print(f"Column '{date_col_name}' not found in DataFrame")
-        except Exception as e:
-            print(f"Error processing file {getattr(uploaded_file, 'file', 'unknown')}: {e}")
-            import traceback
-            traceback.print_exc()
-    
-    print("\n=== get_available_months() complete ===")
-    # Convert to list and sort by date (newest first)
-    months_list = sorted(list(months), key=lambda x: x[0], reverse=True)
-    print(f"Final months list: {months_list}")
-    return months_list
+@login_required
+def employee_search(request):
+    """
+    Typeahead API over the employee dimension
+
+    Query Parameters:
+    - q: beginning of any word of the name (case and accents ignored)
+    - limit: maximum number of results (default 10, max 50)
+    """
+    user = request.user
+    try:
+        limit = min(max(int(request.GET.get('limit', 10)), 1), 50)
+    except ValueError:
+        limit = 10
+    if user.is_superuser or user.groups.filter(name='Admin').exists():
+        visible_files = None
+    else:
+        visible_files = UploadedExcel.objects.filter(uploaded_by=user)
+    results = search_employees(request.GET.get('q', ''), limit, visible_files)
+    return JsonResponse({'results': [{'id': employee_id, 'name': name} for employee_id, name in results]})
+
+def _statistique_payload(store, filter_employee, filter_department, year, month):
+    """Stats table rows, chart data and filter choices of the statistics page (cached per filter set)."""
+    filtered = store.filter(employee=filter_employee, department=filter_department, year=year, month=month)
+
+    # Aggregate stats from filtered records
+    stats_list = filtered.totals_by_employee()
+    dept_stats = filtered.totals_by_department()
+
+    # Préparer les données pour le graphique
+    chart_data = {
+        'labels': [s['nom'] for s in stats_list],
+        'heuresData': [s['total_heures_sup'] for s in stats_list],
+        'joursData': [s['nb_jours'] for s in stats_list],
+        'deptLabels': list(dept_stats.keys()),
+        'deptHeuresData': list(dept_stats.values())
+    }
+    return {
+        'stats_list': stats_list,
+        'chart_data': chart_data,
+        # Mois disponibles pour les filtres
+        'months': [(f"{y}-{m:02d}", f"{MONTH_NAMES_FR[m]} {y}") for y, m in store.available_months()],
+        'departments': store.department_choices(),
+    }
 
 def statistique(request):
     # Redirect unauthenticated users to login page
@@ -791,191 +716,39 @@ def statistique(request):
         excel_files = UploadedExcel.objects.all()
     else:
         excel_files = UploadedExcel.objects.filter(uploaded_by=user)
-        
-    # Get available months for the filter
-    months = get_available_months()
-    print(f"Available months: {months}")
-    selected_month = request.GET.get('filter_month_year', '')
-
-    all_records = []
-    for uploaded_file in excel_files:
-        try:
-            with uploaded_file.file.open('rb') as file:
-                df = pd.read_excel(file)
-            mapping = {col.lower().strip(): col for col in df.columns}
-            
-            name_col = mapping.get('name')
-            in_col = mapping.get('in')
-            out_col = mapping.get('out')
-            date_col = mapping.get('date')
-            dept_col = mapping.get('département') or mapping.get('department')
-            
-            if not all([name_col, in_col, out_col, date_col]):
-                continue
-
-            for _, row in df.iterrows():
-                try:
-                    heure_in = str(row[in_col]).strip()
-                    heure_out = str(row[out_col]).strip()
-                    if not heure_in or not heure_out or heure_in.lower() == 'nan' or heure_out.lower() == 'nan':
-                        continue
-                    t_in = datetime.strptime(heure_in, '%H:%M') if len(heure_in) <= 5 else datetime.strptime(heure_in, '%H:%M:%S')
-                    t_out = datetime.strptime(heure_out, '%H:%M') if len(heure_out) <= 5 else datetime.strptime(heure_out, '%H:%M:%S')
-                    duree = (t_out - t_in)
-                    if duree < timedelta(0):
-                        duree += timedelta(days=1)
-                    heures_travaillees = duree.total_seconds() / 3600
-                    heures_travaillees_arr = math.ceil(heures_travaillees)
-                    date_val = row[date_col]
-                    date_obj = None
-                    if isinstance(date_val, datetime):
-                        date_obj = date_val
-                    else:
-                        date_str = str(date_val)
-                        for fmt in ("%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y", "%Y/%m/%d", "%m/%d/%Y"):
-                            try:
-                                date_obj = datetime.strptime(date_str, fmt)
-                                break
-                            except Exception:
-                                continue
-                            if not date_obj:
-                                continue
-                    if date_obj.weekday() in [5, 6]:
-                        heures_sup = heures_travaillees_arr
-                    else:
-                        heures_sup = max(0, heures_travaillees_arr - 8)
-                    if heures_sup > 0:
-                        department = str(row[dept_col]) if dept_col and pd.notna(row[dept_col]) else None
-                        all_records.append({
-                            'nom': str(row[name_col]),
-                            'heures_sup': heures_sup,
-                            'date_obj': date_obj,
-                            'department': department
-                        })
-                except Exception:
-                    continue
-        except Exception:
-            continue
-    
-    # Create lists for filters before filtering records
-    all_names = sorted(list(set(r['nom'] for r in all_records)))
-    
-    # Debug: Afficher les enregistrements bruts
-    print("\n=== DEBUG: Enregistrements bruts ===")
-    for i, r in enumerate(all_records[:5]):  # Afficher les 5 premiers enregistrements
-        print(f"Enregistrement {i+1}: {r}")
-    
-    # Extraire les départements uniques
-    all_departments = []
-    departments_set = set()
-    for r in all_records:
-        dept = r.get('department')
-        if dept and dept not in departments_set:
-            departments_set.add(dept)
-            all_departments.append(dept)
-    
-    all_departments = sorted(all_departments)
-    
-    print(f"\n=== DEBUG: Départements extraits ===")
-    print(f"Nombre total d'enregistrements: {len(all_records)}")
-    print(f"Départements uniques ({len(all_departments)}): {all_departments}")
-    
-    # Préparer les mois disponibles
-    available_dates = {r['date_obj'] for r in all_records if r.get('date_obj')}
-    unique_year_months = sorted(list(set((d.year, d.month) for d in available_dates)), reverse=True)
-    available_months = [(f"{year}-{month:02d}", f"{MONTH_NAMES_FR[month]} {year}") for year, month in unique_year_months]
 
     # Apply filters
-    filter_nom = request.GET.get('filter_nom', '').strip()
+    filter_employee = _id_param(request, 'filter_employee')
     filter_month_year = request.GET.get('filter_month_year', '').strip()
-    filter_department = request.GET.get('filter_department', '').strip()
-
-    filtered_records = all_records
-    if filter_nom:
-        filtered_records = [r for r in filtered_records if r['nom'] == filter_nom]
-    if filter_department:
-        filtered_records = [r for r in filtered_records if r.get('department') == filter_department]
-    if filter_month_year:
-        try:
-            year, month = map(int, filter_month_year.split('-'))
-            filtered_records = [r for r in filtered_records if r.get('date_obj') and r['date_obj'].year == year and r['date_obj'].month == month]
-        except ValueError:
-            pass
-
-    # Aggregate stats from filtered records
-    stats = {}
-    dept_stats = {}
-    
-    for record in filtered_records:
-        nom = record['nom']
-        dept = record.get('department') or 'Non spécifié'
-        
-        # Stats par employé
-        if nom not in stats:
-            stats[nom] = {'total_heures_sup': 0, 'nb_jours': 0, 'department': dept}
-        stats[nom]['total_heures_sup'] += record['heures_sup']
-        stats[nom]['nb_jours'] += 1
-        
-        # Stats par département
-        if dept not in dept_stats:
-            dept_stats[dept] = 0
-        dept_stats[dept] += record['heures_sup']
-
-    # Convertir en listes pour le template
-    stats_list = [{'nom': nom, 'total_heures_sup': v['total_heures_sup'], 
-                  'nb_jours': v['nb_jours'], 'department': v['department']} 
-                 for nom, v in stats.items()]
-    
-    # Trier les départements par heures totales (décroissant)
-    dept_stats = dict(sorted(dept_stats.items(), key=lambda item: item[1], reverse=True))
+    filter_department = _id_param(request, 'filter_department')
+    year, month = _month_filter(filter_month_year)
+    selected_month = request.GET.get('filter_month_year', '')
 
-    # Préparer les données pour le graphique
-    chart_data = {
-        'labels': [s['nom'] for s in stats_list],
-        'heuresData': [s['total_heures_sup'] for s in stats_list],
-        'joursData': [s['nb_jours'] for s in stats_list],
-        'deptLabels': list(dept_stats.keys()),
-        'deptHeuresData': list(dept_stats.values())
-    }
+    payload = _cached_payload(
+        excel_files,
+        ('statistique', user_scope(user), filter_employee, filter_department, year, month),
+        lambda store: _statistique_payload(store, filter_employee, filter_department, year, month),
+    )
+    stats_list = payload['stats_list']
+    chart_data = payload['chart_data']
 
     # Pagination
     paginator = Paginator(stats_list, 20)  # 20 items per page
-    
-    # Get page number from request, default to 1
-    page_number = request.GET.get('page', 1)
-    
-    try:
-        page = paginator.page(page_number)
-        stats_page = page
-    except PageNotAnInteger:
-        page = paginator.page(1)
-    except EmptyPage:
-        page = paginator.page(paginator.num_pages)
-
-    page_obj = paginator.get_page(page_number)
+    page_obj = paginator.get_page(request.GET.get('page', 1))
 
-    # Préparer le contexte pour le template
-    departments_list = all_departments if 'all_departments' in locals() else []
-    
-    # Log pour débogage
-    print(f"\n=== DEBUG: Contexte transmis au template ===")
-    print(f"Nombre de départements: {len(departments_list)}")
-    print(f"Départements: {departments_list}")
-    print(f"Mois disponibles: {months}")
-    
     context = {
-        'stats': stats_page,
+        'stats': page_obj,
         'page_obj': page_obj,
-        'all_names': all_names,
         'chart_data': chart_data,
-        'dept_labels': json.dumps(list(dept_stats.keys())),
-        'dept_heures_data': json.dumps(list(dept_stats.values())),
-        'filter_nom': filter_nom,
+        'dept_labels': json.dumps(chart_data['deptLabels']),
+        'dept_heures_data': json.dumps(chart_data['deptHeuresData']),
+        'filter_employee': filter_employee,
+        'filter_employee_name': _employee_name(filter_employee, excel_files),
         'filter_department': filter_department,
         'filter_month_year': filter_month_year,
-        'months': months,
+        'months': payload['months'],
         'selected_month': selected_month,
-        'departments': departments_list,
+        'departments': payload['departments'],
         'included_files': excel_files,  # Pass the queryset of files to the template
     }
 
@@ -983,11 +756,6 @@ def statistique(request):
 
 @login_required
 def pie_chart_data(request):
-    from .models import UploadedExcel
-    import pandas as pd
-    from datetime import datetime
-    from collections import defaultdict
-
     user = request.user
     if user.is_superuser or user.groups.filter(name='Admin').exists():
         files = UploadedExcel.objects.all()
@@ -998,73 +766,20 @@ def pie_chart_data(request):
     filter_year = None
     filter_month = None
     if month_filter:
-        try:
-            year_str, month_str = month_filter.split('-')
-            filter_year = int(year_str)
-            filter_month = int(month_str.lstrip('0'))  # Remove leading zero if present
-        except (ValueError, AttributeError):
+        filter_year, filter_month = _month_filter(month_filter)
+        if filter_year is None:
             return JsonResponse({'labels': [], 'data': []})
 
-    dept_hours = defaultdict(float)
-    for uploaded_file in files:
-        try:
-            with uploaded_file.file.open('rb') as file:
-                df = pd.read_excel(file)
-            mapping = {col.lower().strip(): col for col in df.columns}
-
-            name_col = mapping.get('name')
-            in_col = mapping.get('in')
-            out_col = mapping.get('out')
-            date_col = mapping.get('date')
-            dept_col = mapping.get('département') or mapping.get('department')
-            
-            if not all([name_col, in_col, out_col, date_col]):
-                continue
-
-            for _, row in df.iterrows():
-                try:
-                    heure_in = str(row[in_col]).strip()
-                    heure_out = str(row[out_col]).strip()
-                    if not heure_in or not heure_out or heure_in.lower() == 'nan' or heure_out.lower() == 'nan':
-                        continue
-                    t_in = datetime.strptime(heure_in, '%H:%M') if len(heure_in) <= 5 else datetime.strptime(heure_in, '%H:%M:%S')
-                    t_out = datetime.strptime(heure_out, '%H:%M') if len(heure_out) <= 5 else datetime.strptime(heure_out, '%H:%M:%S')
-                    duree = (t_out - t_in)
-                    if duree < pd.Timedelta(0):
-                        duree += pd.Timedelta(days=1)
-                    heures_travaillees = duree.total_seconds() / 3600
-                    heures_travaillees_arr = math.ceil(heures_travaillees)
-                    date_val = row[date_col]
-                    date_obj = None
-                    if isinstance(date_val, datetime):
-                        date_obj = date_val
-                    else:
-                        date_str = str(date_val)
-                        for fmt in ("%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y", "%Y/%m/%d", "%m/%d/%Y"):
-                            try:
-                                date_obj = datetime.strptime(date_str, fmt)
-                                break
-                            except Exception:
-                                continue
-                        if not date_obj:
-                            continue
-                    if filter_year and filter_month:
-                        # Accept both int and str with/without leading zero
-                        if date_obj.year != filter_year or date_obj.month != filter_month:
-                            continue
-                    if date_obj.weekday() in [5, 6]:
-                        heures_sup = heures_travaillees_arr
-                    else:
-                        heures_sup = max(0, heures_travaillees_arr - 8)
-                    if heures_sup > 0:
-                        department = str(row[dept_col]) if dept_col and pd.notna(row[dept_col]) else 'Non spécifié'
-                        dept_hours[department] += heures_sup
-                except Exception:
-                    continue
-        except Exception:
-            continue
-    # Sort departments by hours descending
-    sorted_depts = sorted(dept_hours.items(), key=lambda x: x[1], reverse=True)
-    labels = [dept for dept, _ in sorted_depts]
-    data = [round(hours, 2) for _, hours in sorted_depts]
-    return JsonResponse({'labels': labels, 'data': data})
+    response_data = _cached_payload(
+        files, ('pie-chart', user_scope(user), filter_year, filter_month),
+        lambda store: _pie_chart_payload(store.filter(year=filter_year, month=filter_month)),
+    )
+    return JsonResponse(response_data)
+
+def _pie_chart_payload(store):
+    # Departments sorted by hours descending
+    dept_hours = store.totals_by_department()
+    return {
+        'labels': list(dept_hours.keys()),
+        'data': [round(hours, 2) for hours in dept_hours.values()],
+    }
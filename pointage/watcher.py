@@ -0,0 +1,144 @@
+"""
+Watch a drop-box directory for new pointage workbooks.
+
+Used by the ``watch_uploads`` command. ``InotifyWatcher`` relies on
+``inotify_simple`` (Linux, optional); ``PollingWatcher`` rescans the
+directory and works everywhere. Both report the workbooks that may have
+changed; ``SettleTracker`` then holds a file back until its size and
+modification time have stopped changing, so a workbook still being
+written by the clock export is never read half-way.
+"""
+import os
+import time
+
+from .bulk_import import import_extensions
+
+# Try to import inotify_simple, but make it optional
+try:
+    from inotify_simple import INotify, flags
+    INOTIFY_AVAILABLE = True
+except ImportError:
+    INOTIFY_AVAILABLE = False
+
+
+def is_candidate(name, extensions):
+    # "~$..." : fichiers verrou d'Excel ; ".tmp"/".part" exclus par l'extension
+    return os.path.splitext(name)[1].lower() in extensions and not name.startswith(('~$', '.'))
+
+
+def scan(directory, extensions):
+    """Workbooks directly inside ``directory`` (not walked recursively)."""
+    with os.scandir(directory) as entries:
+        return {
+            entry.path for entry in entries
+            if entry.is_file() and is_candidate(entry.name, extensions)
+        }
+
+
+class PollingWatcher:
+    """Reports every workbook of the directory at each scan."""
+    name = 'polling'
+
+    def __init__(self, directory, interval=2.0, extensions=None):
+        self.directory = directory
+        self.interval = interval
+        self.extensions = tuple(ext.lower() for ext in (extensions or import_extensions()))
+
+    def wait(self, timeout=None):
+        time.sleep(self.interval if timeout is None else min(timeout, self.interval))
+        return scan(self.directory, self.extensions)
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher:
+    """Reports the workbooks closed after writing or moved into the directory."""
+    name = 'inotify'
+
+    def __init__(self, directory, interval=2.0, extensions=None):
+        self.directory = directory
+        self.interval = interval
+        self.extensions = tuple(ext.lower() for ext in (extensions or import_extensions()))
+        self.inotify = INotify()
+        self.inotify.add_watch(directory, flags.CLOSE_WRITE | flags.MOVED_TO | flags.CREATE | flags.MODIFY)
+
+    def wait(self, timeout=None):
+        timeout = self.interval if timeout is None else min(timeout, self.interval)
+        events = self.inotify.read(timeout=int(timeout * 1000))
+        if any(event.mask & flags.Q_OVERFLOW for event in events):
+            # File d'événements du noyau saturée : rescanner le répertoire
+            return scan(self.directory, self.extensions)
+        return {
+            os.path.join(self.directory, event.name) for event in events
+            if event.name and is_candidate(event.name, self.extensions)
+        }
+
+    def close(self):
+        self.inotify.close()
+
+
+def make_watcher(directory, interval=2.0, polling=False):
+    """An ``InotifyWatcher`` when available (and not disabled), else a ``PollingWatcher``."""
+    if INOTIFY_AVAILABLE and not polling:
+        return InotifyWatcher(directory, interval)
+    return PollingWatcher(directory, interval)
+
+
+def _signature(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+class SettleTracker:
+    """
+    Candidate files waiting to be fully written. A file is ready once its
+    (size, mtime) has not changed for ``settle`` seconds; a file already
+    handled is only reconsidered when it is rewritten.
+    """
+
+    def __init__(self, settle=2.0, clock=time.monotonic):
+        self.settle = settle
+        self.clock = clock
+        self.pending = {}   # path -> (signature, depuis quand elle est stable)
+        self.handled = {}   # path -> signature au moment du traitement
+
+    def add(self, paths):
+        now = self.clock()
+        for path in paths:
+            signature = _signature(path)
+            if signature is None or self.handled.get(path) == signature:
+                continue
+            previous = self.pending.get(path)
+            if previous is None or previous[0] != signature:
+                self.pending[path] = (signature, now)
+
+    def ready(self, limit=None):
+        """Files stable for ``settle`` seconds, oldest first, at most ``limit``; they leave the queue."""
+        now = self.clock()
+        stable = []
+        for path, (signature, since) in list(self.pending.items()):
+            current = _signature(path)
+            if current is None:
+                del self.pending[path]
+            elif current != signature:
+                self.pending[path] = (current, now)
+            elif now - since >= self.settle and signature[0] > 0:
+                stable.append((since, path))
+        stable.sort()
+        paths = [path for _, path in stable[:limit]]
+        for path in paths:
+            self.handled[path] = self.pending.pop(path)[0]
+        return paths
+
+    def requeue(self, paths):
+        """Put back files whose handling failed, to be retried once stable again."""
+        for path in paths:
+            self.handled.pop(path, None)
+        self.add(paths)
+
+    def __len__(self):
+        return len(self.pending)
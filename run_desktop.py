@@ -6,12 +6,68 @@ This script starts the Django server with desktop-optimized settings.
 
 import os
 import sys
+import json
+import socket
+import hashlib
+import platform
 import django
 import threading
 import webbrowser
 import time
 from pathlib import Path
 
+HOST = '127.0.0.1'
+PORT = 8000
+# Seconds given to requests in progress when the app is stopped
+SHUTDOWN_TIMEOUT = 5
+
+# Bump to force migrate/collectstatic on the next launch of an installed build
+APP_VERSION = '1.0'
+
+# Fingerprint of the last successful setup: migrate/collectstatic are skipped
+# while the migrations, static sources and versions are unchanged
+STARTUP_MANIFEST = Path(__file__).resolve().parent / '.desktop_startup.json'
+
+# Seconds between two ANALYZE runs of the desktop SQLite database
+SQLITE_OPTIMIZE_INTERVAL = 7 * 24 * 3600
+
+
+def _tree_signature(paths, pattern):
+    """Hash of the name, size and mtime of the files matching ``pattern`` under ``paths``."""
+    digest = hashlib.sha1()
+    for root in sorted(str(path) for path in paths):
+        for file in sorted(Path(root).rglob(pattern)):
+            if file.is_file() and '__pycache__' not in file.parts:
+                stat = file.stat()
+                digest.update(f'{file}:{stat.st_size}:{stat.st_mtime_ns}'.encode())
+    return digest.hexdigest()
+
+
+def startup_fingerprint():
+    """Current migration graph, static files and versions, as stored in STARTUP_MANIFEST."""
+    from django.apps import apps
+    from django.conf import settings
+    from django.db import connection
+
+    migration_dirs = [Path(app.path) / 'migrations' for app in apps.get_app_configs()]
+    static_dirs = [Path(path) for path in settings.STATICFILES_DIRS]
+    static_dirs += [Path(app.path) / 'static' for app in apps.get_app_configs()]
+    return {
+        'app_version': APP_VERSION,
+        'django': django.get_version(),
+        'python': platform.python_version(),
+        'database': str(connection.settings_dict['NAME']),
+        'migrations': _tree_signature([path for path in migration_dirs if path.is_dir()], '*.py'),
+        'static': _tree_signature([path for path in static_dirs if path.is_dir()], '*'),
+    }
+
+
+def read_startup_manifest():
+    try:
+        return json.loads(STARTUP_MANIFEST.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return {}
+
 def setup_django():
     """Setup Django for desktop environment with WhiteNoise"""
     
@@ -21,7 +77,6 @@ def setup_django():
     
     # Load environment variables from .env file
     from decouple import config
-    from pathlib import Path
     
     # Set Django settings to desktop settings
     os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'gestion_heures.settings_desktop')
@@ -29,13 +84,39 @@ def setup_django():
     # Setup Django
     django.setup()
     
-    # Run migrations
+    from django.conf import settings
     from django.core.management import execute_from_command_line
-    execute_from_command_line(['manage.py', 'migrate'])
+    from django.db import connection
+
+    fingerprint = startup_fingerprint()
+    previous = read_startup_manifest()
+    database_file = connection.settings_dict['NAME'] if connection.vendor == 'sqlite' else None
+
+    # Run migrations
+    if (previous.get('migrations') != fingerprint['migrations'] or previous.get('database') != fingerprint['database']
+            or previous.get('app_version') != fingerprint['app_version']
+            or (database_file and not Path(database_file).exists())):
+        execute_from_command_line(['manage.py', 'migrate'])
+    else:
+        print("✅ Database up to date, migrate skipped")
     
     # Collect static files with WhiteNoise
-    print("Collecting static files...")
-    execute_from_command_line(['manage.py', 'collectstatic', '--noinput'])
+    static_root = Path(settings.STATIC_ROOT)
+    if (previous.get('static') != fingerprint['static'] or previous.get('django') != fingerprint['django']
+            or previous.get('app_version') != fingerprint['app_version']
+            or not static_root.is_dir() or not any(static_root.iterdir())):
+        print("Collecting static files...")
+        execute_from_command_line(['manage.py', 'collectstatic', '--noinput'])
+    else:
+        print("✅ Static files up to date, collectstatic skipped")
+
+    # Statistiques du planificateur SQLite rafraîchies une fois par semaine
+    fingerprint['sqlite_optimized_at'] = previous.get('sqlite_optimized_at', 0)
+    if connection.vendor == 'sqlite' and time.time() - fingerprint['sqlite_optimized_at'] > SQLITE_OPTIMIZE_INTERVAL:
+        execute_from_command_line(['manage.py', 'optimize_sqlite'])
+        fingerprint['sqlite_optimized_at'] = time.time()
+
+    STARTUP_MANIFEST.write_text(json.dumps(fingerprint, indent=2), encoding='utf-8')
     
     # Create superuser if none exists
     from django.contrib.auth.models import User
@@ -49,13 +130,59 @@ def run_django_server():
     """Run Django development server with desktop settings"""
     from django.core.management import execute_from_command_line
     print("🚀 Starting Django server with WhiteNoise...")
-    execute_from_command_line(['manage.py', 'runserver', '127.0.0.1:8000'])
+    # No autoreloader: it needs the main thread and polls every source file
+    execute_from_command_line(['manage.py', 'runserver', f'{HOST}:{PORT}', '--noreload'])
+
+def start_server():
+    """
+    Start the server selected by settings.DESKTOP_SERVER in a daemon thread.
+    Returns a callable that stops it gracefully: the listening socket is
+    closed and requests in progress get SHUTDOWN_TIMEOUT seconds to finish.
+    """
+    from django.conf import settings
+
+    if getattr(settings, 'DESKTOP_SERVER', 'runserver') == 'waitress':
+        try:
+            from waitress import create_server
+        except ImportError:
+            print("⚠️  waitress is not installed, falling back to runserver")
+        else:
+            from django.core.wsgi import get_wsgi_application
+            server = create_server(
+                get_wsgi_application(),
+                host=HOST,
+                port=PORT,
+                threads=settings.DESKTOP_SERVER_THREADS,
+                ident='gestion-heures',
+            )
+            print(f"🚀 Starting waitress ({settings.DESKTOP_SERVER_THREADS} threads) with WhiteNoise...")
+            threading.Thread(target=server.run, daemon=True).start()
+
+            def stop():
+                server.close()
+                server.task_dispatcher.shutdown(timeout=SHUTDOWN_TIMEOUT)
+            return stop
+
+    threading.Thread(target=run_django_server, daemon=True).start()
+    return lambda: None  # thread démon : s'arrête avec le processus
+
+def wait_until_ready(host=HOST, port=PORT, timeout=30.0):
+    """Block until the server socket accepts connections (True) or ``timeout`` expires (False)."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection((host, port), timeout=0.5):
+                return True
+        except OSError:
+            time.sleep(0.05)
+    return False
 
 def open_browser():
-    """Open browser after a short delay"""
-    time.sleep(3)  # Wait for server to start
+    """Open browser as soon as the server accepts connections"""
+    if not wait_until_ready():
+        print("⚠️  Server did not answer yet, opening the browser anyway")
     print("🌐 Opening browser...")
-    webbrowser.open('http://127.0.0.1:8000')
+    webbrowser.open(f'http://{HOST}:{PORT}')
 
 def create_directories():
     """Create necessary directories"""
@@ -90,8 +217,7 @@ def main():
         setup_django()
         
         # Start Django server in a thread
-        server_thread = threading.Thread(target=run_django_server, daemon=True)
-        server_thread.start()
+        stop_server = start_server()
         
         # Open browser
         browser_thread = threading.Thread(target=open_browser, daemon=True)
@@ -99,7 +225,7 @@ def main():
         
         print("\n" + "=" * 50)
         print("✅ Application started successfully!")
-        print("📱 Access your app at: http://127.0.0.1:8000")
+        print(f"📱 Access your app at: http://{HOST}:{PORT}")
         print("🔑 Admin login: admin/admin123")
         print("⏹️  Press Ctrl+C to stop the application")
         print("=" * 50)
@@ -110,6 +236,7 @@ def main():
                 time.sleep(1)
         except KeyboardInterrupt:
             print("\n🛑 Shutting down Gestion Heures Desktop App...")
+            stop_server()
             print("👋 Goodbye!")
             
     except Exception as e: